@@ -1,19 +1,24 @@
+import asyncio
+import contextlib
+import copy
 import datetime
 import json
 import logging
 import time
+import weakref
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
 from typing import List
 
 import pandas as pd
-import pygribjump as gj
 from conflator import Conflator
 from covjsonkit.api import Covjsonkit
-from covjsonkit.param_db import get_param_ids
-from covjsonkit.utils import merge_coverage_collections
 from polytope_feature import shapes
-from polytope_feature.polytope import Polytope, Request
+from polytope_feature.polytope import Request
 
-from .config import PolytopeMarsConfig
+from .config import CacheConfig, PolytopeMarsConfig
+from .engine import shared_engine_pool
 from .features.boundingbox import BoundingBox
 from .features.circle import Circle
 from .features.frame import Frame
@@ -23,13 +28,34 @@ from .features.position import Position
 from .features.shpfile import Shapefile
 from .features.timeseries import TimeSeries
 from .features.verticalprofile import VerticalProfile
+from .utils.cache import shared_cache
+from .utils.canonical import canonical_request, request_hash
+from .utils.cost import estimate_cost, get_grid_model
+from .utils.coverage import (
+    count_values,
+    iter_coverage_collection_json,
+    merge_coverages,
+    split_point_coverages,
+    stitch_coverages,
+)
 from .utils.datetimes import (
     convert_timestamp,
     find_step_intervals,
     from_range_to_list_date,
     from_range_to_list_num,
-    time_step_to_freq,
 )
+from .utils.inflight import InFlightRequests
+from .utils.metrics import ExtractMetrics
+from .utils.params import param_resolver
+from .utils.planner import group_subrequests, plan_subrequests
+from .utils.ranges import date_range, integer_range, parse_value, time_range
+from .utils.results import get_result_cache, time_to_live
+from .utils.tiles import TILED_FEATURES, tile_feature
+from .utils.tree import format_tree, summarise_tree
+
+# Compiled base shapes of the instances with the default cache size, keyed on the request item
+shape_cache = shared_cache("shapes", CacheConfig().shape_cache_size)
+
 
 features = {
     "timeseries": TimeSeries,
@@ -43,9 +69,18 @@ features = {
     "position": Position,
 }
 
+# Semaphores limiting the number of concurrent aextract calls, per event loop and limit
+_request_limiters = weakref.WeakKeyDictionary()
+
+# Extractions running in the process, shared by identical requests when execution.deduplicate is on
+in_flight = InFlightRequests()
+
+# Features made of a union of points, whose requests can be retrieved together by extract_many
+point_features = ("timeseries", "verticalprofile", "position")
+
 
 class PolytopeMars:
-    def __init__(self, config=None, log_context=None):
+    def __init__(self, config=None, log_context=None, engine_pool=None, metrics_hook=None):
         # Initialise polytope-mars configuration
         self.log_context = log_context
         self.id = log_context["id"] if log_context else "-1"
@@ -61,6 +96,36 @@ class PolytopeMars:
 
         self.coverage = {}
         self.split_request = False
+        self.tiles = []
+
+        # Compiled base shapes, shared with the instances configured with the same cache size
+        self.shape_cache = shared_cache("shapes", self.conf.cache.shape_cache_size)
+
+        # Coverages of whole extractions, keyed on the request and the parts of the config changing them
+        self.result_cache = get_result_cache(self.conf.results)
+        self._result_context = self.conf.model_dump_json(
+            include={"datacube", "options", "coverageconfig", "polygonrules"}
+        )
+
+        # Param names are resolved to ids with a table shared by all instances using this param_db
+        self.params = param_resolver(self.conf.coverageconfig.param_db)
+
+        # GribJump handles and Polytope engines are reused across requests,
+        # by default through a pool shared by every instance in the process
+        self.engine_pool = engine_pool if engine_pool is not None else shared_engine_pool()
+
+        # Timings and counters of the last extraction, passed to metrics_hook when it is done
+        self.metrics = ExtractMetrics()
+        self.metrics_hook = metrics_hook
+
+    def close(self):
+        """
+        Release the GribJump handles and Polytope engines held by the engine pool.
+
+        Note that unless an engine_pool was passed in, the pool is shared by every
+        PolytopeMars instance in the process.
+        """
+        self.engine_pool.close()
 
     def _has_subhourly_step_transform(self) -> bool:
         """Check if the step axis has a subhourly_step type_change transform configured."""
@@ -97,13 +162,419 @@ class PolytopeMars:
         minutes = (total_seconds % 3600) // 60
         return f"{hours}h{minutes}m"
 
+    def estimate(self, request):
+        """
+        Estimate the work of a request from the configured grid, without touching the datacube.
+
+        :param request: The request in JSON or as a python dictionary.
+        :return: A dictionary with the estimated number of spatial points, fields,
+            values, GribJump ranges and output bytes.
+        """
+        request = _parse_request(request)
+        if "feature" not in request:
+            raise KeyError("Request does not contain a 'feature' keyword")
+        return estimate_cost(request, self.conf.options, self.conf.cache)
+
     def extract(self, request):
-        # request expected in JSON or dict
-        if not isinstance(request, dict):
+        self.metrics = ExtractMetrics()
+        start = time.perf_counter()
+
+        request, key = self._request_key(request)
+        if key is None or not self.conf.execution.deduplicate:
+            return self._extract(request, key, start)
+
+        coverage, leader = in_flight.run(key, partial(self._extract, request, key, start))
+        if leader:
+            return coverage
+        return self._shared_result(coverage, "inflight", start)
+
+    def _extract(self, request, key, start):
+        """
+        Extract a request, answering it from the result cache if possible.
+
+        :param request: The request in JSON or as a python dictionary.
+        :param key: The hash of the canonical request returned by _request_key, or None.
+        :param start: The perf_counter time the extraction started.
+        :return: The coverage data in Covjson format.
+        """
+        ttl, coverage = self._lookup_result(request, key)
+        if coverage is not None:
+            return self._shared_result(coverage, "results", start)
+
+        with self.metrics.timer("prepare"):
+            request, feature_type, feature = self._prepare(request)
+
+        self.coverage = self._retrieve_prepared(request, feature_type, feature)
+
+        if ttl > 0:
+            self._store_result(key, self.coverage, ttl)
+
+        if self.conf.metrics.output_bytes:
+            self.metrics.output_bytes = len(json.dumps(self.coverage).encode())
+
+        self.metrics.add_duration("total", time.perf_counter() - start)
+        self._report_metrics()
+
+        return self.coverage
+
+    def extract_many(self, requests):
+        """
+        Extract a list of requests, retrieving point requests which only differ by their points together.
+
+        Timeseries, vertical profile and position requests with the same keys and
+        feature options are grouped, the union of their points is retrieved with a
+        single Polytope request and the result is split back per request. Other
+        requests are extracted one by one.
+
+        :param requests: A list of requests in JSON or as python dictionaries.
+        :return: A list of CoverageCollections, one per request, in the order of the requests.
+        """
+        self.metrics = ExtractMetrics()
+        start = time.perf_counter()
+
+        coverages = [None] * len(requests)
+        groups = {}
+        for i, request in enumerate(requests):
+            with self.metrics.timer("prepare"):
+                if isinstance(request, dict):
+                    request = copy.deepcopy(request)
+                request, feature_type, feature = self._prepare(request)
+
+            if feature_type not in point_features or self.split_request:
+                coverages[i] = self._retrieve_prepared(request, feature_type, feature)
+                continue
+
+            options = {k: v for k, v in vars(feature).items() if k != "points"}
+            key = (
+                feature_type,
+                canonical_request(request, self.params),
+                json.dumps(options, sort_keys=True, default=str),
+            )
+            groups.setdefault(key, []).append((i, request, feature_type, feature))
+
+        for group in groups.values():
+            _, request, feature_type, feature = group[0]
+            if len(group) == 1:
+                coverages[group[0][0]] = self.retrieve_data(request, feature_type, feature)
+                continue
+
+            points = {}
+            for _, _, _, member in group:
+                for point in member.points:
+                    points.setdefault(tuple(point), point)
+            combined = copy.copy(feature)
+            combined.points = list(points.values())
+            logging.debug(
+                f"{self.id}: Retrieving {len(group)} {feature_type} requests with {len(points)} points together"
+            )  # noqa: E501
+            coverage = self.retrieve_data(request, feature_type, combined)
+
+            with self.metrics.timer("split"):
+                latlon = [
+                    [p[::-1] if feature.axes[0] == "longitude" else p for p in member.points]
+                    for _, _, _, member in group
+                ]
+                members = split_point_coverages(coverage, latlon, self._point_spacing())
+                for (i, _, _, _), member_coverage in zip(group, members):
+                    coverages[i] = member_coverage
+
+        self.metrics.add_duration("total", time.perf_counter() - start)
+        self._report_metrics()
+
+        return coverages
+
+    def _point_spacing(self):
+        """
+        Find the grid spacing within which a retrieved position belongs to a requested point.
+
+        :return: The largest spacing of the configured grid in degrees, None if the grid is not known.
+        """
+        try:
+            return get_grid_model(self.conf.options).max_spacing()
+        except (ValueError, NotImplementedError):
+            return None
+
+    async def aextract(self, request, executor=None):
+        """
+        Extract a request without blocking the event loop.
+
+        Parsing, retrieval, encoding and merging run in an executor. The sub-requests
+        of a split request are started one window of execution.max_parallel_subrequests
+        at a time, so cancelling the call stops the remaining sub-requests from being
+        retrieved. At most execution.max_concurrent_requests calls run at the same
+        time in an event loop, others wait for their turn. Concurrent calls may share
+        one PolytopeMars, the metrics and coverage attributes then hold those of the
+        call which finished last.
+
+        :param request: The request in JSON or as a python dictionary.
+        :param executor: The concurrent.futures executor to run in, the default executor of the loop if None.
+        :return: The coverage data in Covjson format.
+        """
+        loop = asyncio.get_running_loop()
+        # Each call records into its own copy, sharing the config, caches and engines
+        extraction = copy.copy(self)
+        extraction.metrics = ExtractMetrics()
+        start = time.perf_counter()
+
+        request, key = await loop.run_in_executor(executor, extraction._request_key, request)
+        if key is None or not self.conf.execution.deduplicate:
+            coverage = await extraction._aextract(request, key, executor, start)
+        else:
+            coverage, leader = await in_flight.arun(key, partial(extraction._aextract, request, key, executor, start))
+            if not leader:
+                extraction._shared_result(coverage, "inflight", start)
+
+        self.coverage = coverage
+        self.metrics = extraction.metrics
+        self.split_request = extraction.split_request
+        self.tiles = extraction.tiles
+        return coverage
+
+    async def _aextract(self, request, key, executor, start):
+        """
+        Extract a request in an executor once the request limiter lets it run.
+
+        :param request: The request in JSON or as a python dictionary.
+        :param key: The hash of the canonical request returned by _request_key, or None.
+        :param executor: The concurrent.futures executor to run in, the default executor of the loop if None.
+        :param start: The perf_counter time the extraction started.
+        :return: The coverage data in Covjson format.
+        """
+        loop = asyncio.get_running_loop()
+        limit = self.conf.execution.max_concurrent_requests
+        if limit > 0:
+            limiter = _request_limiters.setdefault(loop, {}).setdefault(limit, asyncio.Semaphore(limit))
+        else:
+            limiter = contextlib.nullcontext()
+
+        async with limiter:
+            ttl, coverage = await loop.run_in_executor(executor, self._lookup_result, request, key)
+            if coverage is not None:
+                return self._shared_result(coverage, "results", start)
+
+            with self.metrics.timer("prepare"):
+                if isinstance(request, dict):
+                    request = copy.deepcopy(request)
+                request, feature_type, feature = await loop.run_in_executor(executor, self._prepare, request)
+
+            if self.split_request or len(self.tiles) > 1:
+                subrequests = self._split_subrequests(request, feature) if self.split_request else [request]
+                coverages = await self._aretrieve_subrequests(subrequests, feature_type, feature, executor, self.tiles)
+                with self.metrics.timer("merge"):
+                    coverage = await loop.run_in_executor(executor, merge_coverages, coverages)
+            else:
+                coverage = await loop.run_in_executor(executor, self.retrieve_data, request, feature_type, feature)
+
+            if ttl > 0:
+                await loop.run_in_executor(executor, self._store_result, key, coverage, ttl)
+
+            self.coverage = coverage
+            self.metrics.add_duration("total", time.perf_counter() - start)
+            self._report_metrics()
+        return coverage
+
+    async def _aretrieve_subrequests(self, subrequests, feature_type, feature, executor=None, tiles=None):
+        """
+        Retrieve sub-requests in an executor, at most execution.max_parallel_subrequests at a time.
+
+        :param subrequests: The list of request dictionaries to retrieve.
+        :param feature_type: The type of feature being requested.
+        :param feature: The feature object shared by all sub-requests.
+        :param executor: The concurrent.futures executor to run in, the default executor of the loop if None.
+        :param tiles: The spatial tiles of the feature retrieved for every sub-request, the feature itself if None.
+        :return: A list of coverages, one per sub-request.
+        """
+        loop = asyncio.get_running_loop()
+        workers = max(self.conf.execution.max_parallel_subrequests, 1)
+        retrieve = partial(self.retrieve_data, feature_type=feature_type)
+        tiles = tiles or [feature]
+
+        coverages = []
+        pending = deque()
+        try:
+            for subrequest in subrequests:
+                for tile in tiles:
+                    if len(pending) == workers:
+                        coverages.append(await pending.popleft())
+                    pending.append(loop.run_in_executor(executor, partial(retrieve, dict(subrequest), feature=tile)))
+            while pending:
+                coverages.append(await pending.popleft())
+        finally:
+            # Do not start the remaining sub-requests if the call was cancelled
+            for future in pending:
+                future.cancel()
+
+        if len(tiles) == 1:
+            return coverages
+        with self.metrics.timer("stitch"):
+            parts = iter(coverages)
+            groups = [[next(parts) for _ in tiles] for _ in subrequests]
+            return [await loop.run_in_executor(executor, stitch_coverages, group) for group in groups]
+
+    def extract_iter(self, request):
+        """
+        Extract a request, yielding a CoverageCollection per sub-request as soon as it is retrieved.
+
+        Unlike extract, the coverages of a split request are only merged within the
+        sub-requests split by param or level, so only those sub-requests are held in
+        memory. A request which is not split yields a single CoverageCollection.
+
+        :param request: The request in JSON or as a python dictionary.
+        :return: A generator of CoverageCollection dictionaries.
+        """
+        self.metrics = ExtractMetrics()
+        start = time.perf_counter()
+
+        yield from self._extract_iter(request)
+
+        self.metrics.add_duration("total", time.perf_counter() - start)
+        self._report_metrics()
+
+    def extract_json_iter(self, request):
+        """
+        Extract a request, yielding the serialised CoverageCollection in chunks.
+
+        The chunks join up to a single CoverageCollection holding the same coverages as
+        extract, each group of sub-requests of extract_iter is serialised as soon as it
+        is retrieved.
+
+        :param request: The request in JSON or as a python dictionary.
+        :return: A generator of JSON strings.
+        """
+        self.metrics = ExtractMetrics()
+        start = time.perf_counter()
+
+        output_bytes = 0
+        for chunk in iter_coverage_collection_json(self._extract_iter(request)):
+            output_bytes += len(chunk.encode())
+            yield chunk
+        self.metrics.output_bytes = output_bytes
+
+        self.metrics.add_duration("total", time.perf_counter() - start)
+        self._report_metrics()
+
+    def _extract_iter(self, request):
+        with self.metrics.timer("prepare"):
+            request, feature_type, feature = self._prepare(request)
+
+        if self.split_request or len(self.tiles) > 1:
+            subrequests = self._split_subrequests(request, feature) if self.split_request else [request]
+            coverages = self._iter_subrequests(subrequests, feature_type, feature, self.tiles)
             try:
-                request = json.loads(request)
-            except ValueError:
-                raise ValueError("Request not in JSON format or python dictionary")  # noqa: E501
+                # Sub-requests split by param or level hold parts of the same
+                # coverages, which are merged as in extract before they are streamed
+                for size in group_subrequests(subrequests):
+                    group = [next(coverages) for _ in range(size)]
+                    if size == 1:
+                        yield group[0]
+                        continue
+                    with self.metrics.timer("merge"):
+                        yield merge_coverages(group)
+            finally:
+                coverages.close()
+        else:
+            yield self.retrieve_data(request, feature_type, feature)
+
+    def _retrieve_prepared(self, request, feature_type, feature):
+        """
+        Retrieve a request returned by _prepare, splitting it into sub-requests and spatial tiles if needed.
+
+        :param request: The parsed request dictionary.
+        :param feature_type: The type of feature being requested.
+        :param feature: The feature object of the request.
+        :return: The CoverageCollection of the request.
+        """
+        if self.split_request or len(self.tiles) > 1:
+            # If the request is split, we need to handle it differently
+            subrequests = self._split_subrequests(request, feature) if self.split_request else [request]
+            coverages = self._retrieve_subrequests(subrequests, feature_type, feature, self.tiles)
+            with self.metrics.timer("merge"):
+                return merge_coverages(coverages)
+
+        return self.retrieve_data(request, feature_type, feature)  # noqa: E501
+
+    def _request_key(self, request):
+        """
+        Parse a request and hash its canonical form, if the result cache or deduplication needs it.
+
+        :param request: The request in JSON or as a python dictionary.
+        :return: The request, as a python dictionary if it is hashed, and its hash or None.
+        """
+        if self.result_cache is None and not self.conf.execution.deduplicate:
+            return request, None
+        request = _parse_request(request)
+        with self.metrics.timer("canonical"):
+            return request, request_hash(request, self.params, self._result_context)
+
+    def _lookup_result(self, request, key):
+        """
+        Look up the coverage of a request in the result cache.
+
+        :param request: The request as a python dictionary.
+        :param key: The hash of the canonical request returned by _request_key, or None.
+        :return: The time to live of the coverage of the request, 0 if it is not cached,
+            and its cached coverage or None.
+        """
+        if self.result_cache is None or key is None:
+            return 0.0, None
+        ttl = time_to_live(request, self.conf.results)
+        if ttl <= 0:
+            return 0.0, None
+        with self.metrics.timer("results"):
+            return ttl, self.result_cache.get(key)
+
+    def _store_result(self, key, coverage, ttl):
+        """
+        Store the coverage of a request in the result cache.
+
+        :param key: The hash of the canonical request returned by _request_key.
+        :param coverage: The coverage of the request.
+        :param ttl: The time to live of the coverage in seconds.
+        """
+        with self.metrics.timer("results"):
+            self.result_cache.put(key, coverage, ttl)
+
+    def _shared_result(self, coverage, source, start):
+        """
+        Finish an extraction answered from the result cache or by an identical extraction.
+
+        :param coverage: The shared coverage.
+        :param source: The name of the hit recorded in the metrics, "results" or "inflight".
+        :param start: The perf_counter time the extraction started.
+        :return: The coverage.
+        """
+        logging.debug(f"{self.id}: Request answered from {source}")  # noqa: E501
+        self.coverage = coverage
+        self.metrics.hit(source)
+        if self.conf.metrics.output_bytes:
+            self.metrics.output_bytes = len(json.dumps(coverage).encode())
+        self.metrics.add_duration("total", time.perf_counter() - start)
+        self._report_metrics()
+        return coverage
+
+    def _report_metrics(self):
+        """
+        Log the metrics of the last extraction and pass them to the metrics hook.
+
+        Errors raised by the hook are logged rather than failing the extraction.
+        """
+        logging.info(f"{self.id}: Extraction metrics: {self.metrics.as_dict()}")  # noqa: E501
+        if self.metrics_hook is None:
+            return
+        try:
+            self.metrics_hook(self.metrics)
+        except Exception as e:
+            logging.error(f"{self.id}: Metrics hook failed: {e}")  # noqa: E501
+
+    def _prepare(self, request):
+        """
+        Validate and parse a request and build its feature.
+
+        :param request: The request in JSON or as a python dictionary.
+        :return: The parsed request, the feature type and the feature object.
+        """
+        # request expected in JSON or dict
+        request = _parse_request(request)
 
         # expect a "feature" key in the request
         try:
@@ -158,44 +629,182 @@ class PolytopeMars:
 
         feature.validate(request, feature_config_copy)
 
+        # The estimated cost is only needed to reject or plan requests, it is estimated
+        # once the feature has validated the request
+        self.estimated_cost = None
+        cost_limits = (self.conf.cost.max_values, self.conf.cost.target_values)
+        if min(cost_limits) < float("inf"):
+            self.estimated_cost = estimate_cost(
+                dict(request, feature=feature_config_copy), self.conf.options, self.conf.cache
+            )
+            if self.estimated_cost["values"] > self.conf.cost.max_values:
+                raise ValueError(
+                    f"Estimated request size of {self.estimated_cost['values']} values exceeds the maximum of {self.conf.cost.max_values}, please reduce the size of the shape or the number of fields requested"  # noqa: E501
+                )
+
         logging.debug("Unparsed request: %s", request)
         logging.debug("Feature dictionary: %s", feature_config_copy)
 
         request = feature.parse(request, feature_config_copy)
 
-        self.split_request = feature.split_request()
+        if self.conf.cost.target_values < float("inf"):
+            self.split_request = self.estimated_cost["values"] > self.conf.cost.target_values
+        else:
+            self.split_request = feature.split_request()
+
+        self.tiles = self._tile_feature(feature_type, feature)
 
         logging.debug("Self split: %s", self.split_request)
         logging.debug("Parsed request: %s", request)
 
-        if self.split_request:
-            # If the request is split, we need to handle it differently
-            dates = from_range_to_list_date(request["date"])
-            for date in dates.split("/"):
-                if "number" in request:
-                    numbers = from_range_to_list_num(request["number"])
-                    if len(numbers) > 10:
-                        for number in from_range_to_list_num(request["number"]):
-                            copied_request = request.copy()
-                            copied_request["date"] = date
-                            copied_request["number"] = number
-                            coverage = self.retrieve_data(copied_request, feature_type, feature)  # noqa: E501
-                            self.coverage = merge_coverage_collections(self.coverage, coverage)  # noqa: E501
-                    else:
+        return request, feature_type, feature
+
+    def _split_subrequests(self, request, feature=None):
+        """
+        Split a request into sub-requests of roughly equal estimated cost below
+        cost.target_values if it is set, or else into one sub-request per date,
+        and per ensemble member when more than 10 members are requested.
+
+        :param request: The parsed request dictionary.
+        :param feature: The feature object of the request, whose domain axes are not split.
+        :return: A list of request dictionaries in the order they should be merged.
+        """
+        if self.conf.cost.target_values < float("inf"):
+            fixed_axes = feature.domain_axes() if feature is not None else []
+            subrequests = plan_subrequests(
+                request, self.estimated_cost["points"], self.conf.cost.target_values, fixed_axes
+            )
+            logging.debug(f"{self.id}: Planned {len(subrequests)} sub-requests")  # noqa: E501
+            return subrequests
+
+        subrequests = []
+        dates = from_range_to_list_date(request["date"])
+        for date in dates.split("/"):
+            if "number" in request:
+                numbers = from_range_to_list_num(request["number"])
+                if len(numbers) > 10:
+                    for number in from_range_to_list_num(request["number"]):
                         copied_request = request.copy()
                         copied_request["date"] = date
-                        coverage = self.retrieve_data(copied_request, feature_type, feature)
-                        self.coverage = merge_coverage_collections(self.coverage, coverage)
+                        copied_request["number"] = number
+                        subrequests.append(copied_request)
                 else:
                     copied_request = request.copy()
                     copied_request["date"] = date
-                    coverage = self.retrieve_data(copied_request, feature_type, feature)
-                    self.coverage = merge_coverage_collections(self.coverage, coverage)
+                    subrequests.append(copied_request)
+            else:
+                copied_request = request.copy()
+                copied_request["date"] = date
+                subrequests.append(copied_request)
+        return subrequests
+
+    def _retrieve_subrequests(self, subrequests, feature_type, feature, tiles=None):
+        """
+        Retrieve a list of sub-requests, concurrently if configured.
 
+        :param subrequests: The list of request dictionaries to retrieve.
+        :param feature_type: The type of feature being requested.
+        :param feature: The feature object shared by all sub-requests.
+        :param tiles: The spatial tiles of the feature retrieved for every sub-request, the feature itself if None.
+        :return: A list of coverages, one per sub-request.
+        """
+        return list(self._iter_subrequests(subrequests, feature_type, feature, tiles))
+
+    def _iter_subrequests(self, subrequests, feature_type, feature, tiles=None):
+        """
+        Retrieve sub-requests, yielding their coverages in the order of the sub-requests.
+
+        When the feature is cut into tiles, every tile of every sub-request is
+        retrieved on its own and the tiles of a sub-request are stitched back
+        into one coverage.
+
+        :param subrequests: The list of request dictionaries to retrieve.
+        :param feature_type: The type of feature being requested.
+        :param feature: The feature object shared by all sub-requests.
+        :param tiles: The spatial tiles of the feature retrieved for every sub-request, the feature itself if None.
+        :return: A generator of coverages, one per sub-request.
+        """
+        tiles = tiles or [feature]
+        # retrieve_data consumes some keys of the request, so every tile gets its own copy
+        jobs = [(dict(subrequest), tile) for subrequest in subrequests for tile in tiles]
+        coverages = self._iter_jobs(jobs, feature_type)
+        try:
+            if len(tiles) == 1:
+                yield from coverages
+                return
+            for _ in subrequests:
+                parts = [next(coverages) for _ in tiles]
+                with self.metrics.timer("stitch"):
+                    yield stitch_coverages(parts)
+        finally:
+            coverages.close()
+
+    def _iter_jobs(self, jobs, feature_type):
+        """
+        Retrieve pairs of a request and a feature, yielding their coverages in order.
+
+        Up to execution.max_parallel_subrequests jobs run at once, in a thread pool
+        or in a process pool depending on execution.executor. No more jobs are
+        started than can run at once, so finished coverages are not held back while
+        the caller is still consuming earlier ones.
+
+        :param jobs: The list of (request dictionary, feature object) pairs to retrieve.
+        :param feature_type: The type of feature being requested.
+        :return: A generator of coverages, one per job.
+        """
+        workers = min(self.conf.execution.max_parallel_subrequests, len(jobs))
+        if workers <= 1:
+            for subrequest, feature in jobs:
+                yield self.retrieve_data(subrequest, feature_type, feature)
+            return
+
+        logging.debug(f"{self.id}: Retrieving {len(jobs)} sub-requests with {workers} workers")  # noqa: E501
+        if self.conf.execution.executor == "process":
+            executor = ProcessPoolExecutor(max_workers=workers)
+            # Worker processes send their metrics back along with the coverage
+            retrieve = partial(
+                _retrieve_subrequest, self.conf.model_dump(), self.log_context, feature_type=feature_type
+            )
         else:
-            self.coverage = self.retrieve_data(request, feature_type, feature)  # noqa: E501
+            executor = ThreadPoolExecutor(max_workers=workers)
+            retrieve = partial(self.retrieve_data, feature_type=feature_type)
+
+        def result(future):
+            if self.conf.execution.executor != "process":
+                return future.result()
+            coverage, metrics = future.result()
+            self.metrics.update(metrics)
+            return coverage
+
+        pending = deque()
+        with executor:
+            try:
+                for subrequest, feature in jobs:
+                    if len(pending) == workers:
+                        yield result(pending.popleft())
+                    pending.append(executor.submit(retrieve, subrequest, feature=feature))
+                while pending:
+                    yield result(pending.popleft())
+            finally:
+                # Do not start the remaining sub-requests if the caller stopped early
+                for future in pending:
+                    future.cancel()
+
+    def _tile_feature(self, feature_type, feature):
+        """
+        Cut a large polygon or bounding box into latitude bands if tiling.tile_points is set.
 
-        return self.coverage
+        :param feature_type: The type of feature being requested.
+        :param feature: The feature object of the request.
+        :return: A list of tile features, the feature alone if it is not tiled.
+        """
+        if self.conf.tiling.tile_points <= 0 or feature_type not in TILED_FEATURES:
+            return [feature]
+        with self.metrics.timer("tiles"):
+            grid = get_grid_model(self.conf.options)
+            tiles = tile_feature(feature_type, feature, grid, self.conf.tiling.tile_points, self.conf.tiling.max_tiles)
+        logging.debug(f"{self.id}: Cut the {feature_type} into {len(tiles)} tiles")  # noqa: E501
+        return tiles
 
     def _create_base_shapes(self, request: dict, feature_type) -> List[shapes.Shape]:
         base_shapes = []
@@ -206,265 +815,314 @@ class PolytopeMars:
             and (feature_type == "timeseries" or feature_type == "polygon")  # noqa: W503
         ) or (request["class"] == "ng" and (feature_type == "timeseries" or feature_type == "polygon")):
             for k, v in request.items():
-                split = str(v).split("/")
-
-                if k == "param":
-                    try:
-                        int(split[0])
-                    except:  # noqa: E722
-                        new_split = []
-                        for s in split:
-                            new_split.append(get_param_ids(self.conf.coverageconfig)[s])  # noqa: E501
-                        split = new_split
-
-                # ALL -> All
-                if len(split) == 1 and split[0] == "ALL":
-                    base_shapes.append(shapes.All(k))
-
-                # month / year axes: values are always passed as integers
-                elif k in ("month", "year"):
-                    # Single integer value -> Select
-                    if len(split) == 1:
-                        base_shapes.append(shapes.Select(k, [int(split[0])]))
-
-                    # Range a/to/b -> Span with integer bounds
-                    elif len(split) == 3 and split[1] == "to":
-                        base_shapes.append(shapes.Span(k, lower=int(split[0]), upper=int(split[2])))
-
-                    # Range a/to/b/by/step -> Select of integers
-                    elif "by" in split:
-                        step = int(split[-1])
-                        expansion = list(range(int(split[0]), int(split[2]) + 1, step))
-                        base_shapes.append(shapes.Select(k, expansion))
-
-                    # List of individual integer values -> Select
-                    else:
-                        base_shapes.append(shapes.Select(k, [int(s) for s in split]))
-
-                # Single value -> Select
-                elif len(split) == 1:
-                    if k == "date":
-                        split[0] = pd.Timestamp(split[0])
-                    if k == "time":
-                        split[0] = convert_timestamp(split[0])
-                    if k == "step" and self._has_subhourly_step_transform():
-                        split = [self._format_step_as_subhourly(split[0])]
-                    base_shapes.append(shapes.Select(k, split))
-
-                # Range a/to/b, "by" not supported -> Span
-                elif len(split) == 3 and split[1] == "to":
-                    # if date then only get time of dates in span not
-                    # all in times within date
-                    if k == "date":
-                        start = pd.Timestamp(split[0])
-                        end = pd.Timestamp(split[2])
-                        base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                    elif k == "time":
-                        start = convert_timestamp(split[0])
-                        end = convert_timestamp(split[2])
-                        base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                    elif k == "step" and self._has_subhourly_step_transform():
-                        # Convert step range bounds to subhourly format
-                        lower = self._format_step_as_subhourly(split[0])
-                        upper = self._format_step_as_subhourly(split[2])
-                        base_shapes.append(shapes.Span(k, lower=lower, upper=upper))
-                    else:
-                        base_shapes.append(shapes.Span(k, lower=split[0], upper=split[2]))  # noqa: E501
-
-                elif "by" in split:
-                    if split[-1] == "1":
-                        if k == "date":
-                            start = pd.Timestamp(split[0])
-                            end = pd.Timestamp(split[2])
-                            base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                        elif k == "time":
-                            start = convert_timestamp(split[0])
-                            end = convert_timestamp(split[2])
-                            base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                        elif k == "step" and self._has_subhourly_step_transform():
-                            # Convert step range bounds to subhourly format
-                            lower = self._format_step_as_subhourly(split[0])
-                            upper = self._format_step_as_subhourly(split[2])
-                            base_shapes.append(shapes.Span(k, lower=lower, upper=upper))
-                        else:
-                            base_shapes.append(shapes.Span(k, lower=split[0], upper=split[2]))  # noqa: E501
-                    else:
-                        if k == "date":
-                            start = pd.Timestamp(split[0])
-                            end = pd.Timestamp(split[2])
-                            timestamps = pd.date_range(start=start, end=end, freq=f"{split[-1]}D")
-                            base_shapes.append(shapes.Select(k, timestamps.tolist()))
-                        elif k == "time":
-                            start = convert_timestamp(split[0])
-                            end = convert_timestamp(split[2])
-                            times = pd.date_range(start=start, end=end, freq=time_step_to_freq(split[-1]))
-                            base_shapes.append(shapes.Select(k, times.strftime("%H:%M:%S").tolist()))
-                            # base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                            # base_shapes.append(shapes.Span(k, lower=start, upper=end))
-                        # raise ValueError("Ranges with step-size specified with 'by' keyword is not supported")  # noqa: E501
-
-                # List of individual values -> Union of Selects
-                else:
-                    if k == "date":
-                        dates = []
-                        for s in split:
-                            dates.append(pd.Timestamp(s))
-                        split = dates
-                    if k == "time":
-                        times = []
-                        for s in split:
-                            times.append(convert_timestamp(s))
-                        split = times
-                    if k == "step" and self._has_subhourly_step_transform():
-                        split = [self._format_step_as_subhourly(s) for s in split]
-                    base_shapes.append(shapes.Select(k, split))
+                key = ("step", k, str(v))
+                base_shapes.append(self._cached_shape(key, partial(self._step_base_shape, k, v)))
         else:
             # When the time axis is month or year, there is no "date" key in
             # the request – "time" may also be absent.  Only pop "time" when it
             # is actually present so we don't break month/year requests.
-            time = []
+            time = ()
             if "time" in request:
-                time = request.pop("time").replace(":", "")
-                time = time.split("/")
-                if "to" in time:
-                    start = convert_timestamp(time[0])
-                    end = convert_timestamp(time[2])
-                    if "by" in time:
-                        times = pd.date_range(start=start, end=end, freq=time_step_to_freq(time[-1]))
-                    else:
-                        times = pd.date_range(start=start, end=end, freq="1h")
-                    time = times.strftime("%H:%M:%S").tolist()
+                time_value = request.pop("time")
+                time = self._cached_shape(("time", str(time_value)), partial(self._expand_times, time_value))
 
             # TODO: when has_hdate, "date" stays a plain string (not cast to pd.Timestamp).
             # Need to check if polytope can handle that or if we need a type_change config for date.
             has_hdate = "hdate" in request
 
             for k, v in request.items():
-                split = str(v).split("/")
-
-                if k == "param":
-                    try:
-                        int(split[0])
-                    except:  # noqa: E722
-                        new_split = []
-                        for s in split:
-                            new_split.append(get_param_ids(self.conf.coverageconfig)[s])  # noqa: E501
-                        split = new_split
-
-                # ALL -> All
-                if len(split) == 1 and split[0] == "ALL":
-                    base_shapes.append(shapes.All(k))
-
-                # month / year axes: values are always passed as integers
-                elif k in ("month", "year"):
-                    # Single integer value -> Select
-                    if len(split) == 1:
-                        base_shapes.append(shapes.Select(k, [int(split[0])]))
-
-                    # Range a/to/b -> Span with integer bounds
-                    elif len(split) == 3 and split[1] == "to":
-                        base_shapes.append(shapes.Span(k, lower=int(split[0]), upper=int(split[2])))
-
-                    # Range a/to/b/by/step -> Select of integers
-                    elif "by" in split:
-                        step = int(split[-1])
-                        expansion = list(range(int(split[0]), int(split[2]) + 1, step))
-                        base_shapes.append(shapes.Select(k, expansion))
-
-                    # List of individual integer values -> Select
-                    else:
-                        base_shapes.append(shapes.Select(k, [int(s) for s in split]))
-
-                # Single value -> Select
-                elif len(split) == 1:
-                    if k == "hdate" or (k == "date" and not has_hdate):
-                        if int(split[0]) < 0:
-                            split[0] = str(
-                                (
-                                    datetime.datetime.now() + datetime.timedelta(days=int(split[0]))
-                                ).strftime(  # noqa: E501
-                                    "%Y%m%d"
-                                )  # noqa: E501
-                            )
-                        new_split = []
-                        for t in time:
-                            new_split.append(pd.Timestamp(split[0] + "T" + t))
-                        split = new_split
-                    elif k == "step" and self._has_subhourly_step_transform():
-                        # Convert step to subhourly format if transform is configured
-                        split = [self._format_step_as_subhourly(split[0])]
-                    base_shapes.append(shapes.Select(k, split))
-
-                # Range a/to/b, "by" not supported -> Span
-                elif len(split) == 3 and split[1] == "to":
-                    # if date then only get time of dates in span not
-                    # all in times within date
-                    if k == "hdate" or (k == "date" and not has_hdate):
-                        start = pd.Timestamp(split[0] + "T" + time[0])
-                        end = pd.Timestamp(split[2] + "T" + time[-1])
-                        dates = []
-                        for s in pd.date_range(start, end):
-                            for t in time:
-                                dates.append(pd.Timestamp(s.strftime("%Y%m%d") + "T" + t))
-                        base_shapes.append(shapes.Select(k, dates))
-                    elif k == "step" and self._has_subhourly_step_transform():
-                        # Convert step range bounds to subhourly format
-                        lower = self._format_step_as_subhourly(split[0])
-                        upper = self._format_step_as_subhourly(split[2])
-                        base_shapes.append(shapes.Span(k, lower=lower, upper=upper))
-                    else:
-                        base_shapes.append(shapes.Span(k, lower=split[0], upper=split[2]))  # noqa: E501
-
-                elif "by" in split:
-                    if split[-1] == "1":
-                        if k == "hdate" or (k == "date" and not has_hdate):
-                            start = pd.Timestamp(split[0] + "T" + time[0])
-                            end = pd.Timestamp(split[2] + "T" + time[-1])
-                            dates = []
-                            for s in pd.date_range(start, end):
-                                for t in time:
-                                    dates.append(pd.Timestamp(s.strftime("%Y%m%d") + "T" + t))
-                            base_shapes.append(shapes.Select(k, dates))
-                        elif k == "step" and self._has_subhourly_step_transform():
-                            # Convert step range bounds to subhourly format
-                            lower = self._format_step_as_subhourly(split[0])
-                            upper = self._format_step_as_subhourly(split[2])
-                            base_shapes.append(shapes.Span(k, lower=lower, upper=upper))
-                        else:
-                            base_shapes.append(shapes.Span(k, lower=split[0], upper=split[2]))
-                    else:
-                        if k == "hdate" or (k == "date" and not has_hdate):
-                            start = pd.Timestamp(split[0] + "T" + time[0])
-                            end = pd.Timestamp(split[2] + "T" + time[-1])
-                            dates = []
-                            for s in pd.date_range(start, end, freq=f"{split[-1]}D"):
-                                for t in time:
-                                    dates.append(pd.Timestamp(s.strftime("%Y%m%d") + "T" + t))
-                            base_shapes.append(shapes.Select(k, dates))
-                        elif k == "step":
-                            steps = find_step_intervals(split[0], split[2], split[-1])
-                            # If subhourly_step transform is configured, ensure all steps are in subhourly format
-                            if self._has_subhourly_step_transform():
-                                steps = [self._format_step_as_subhourly(s) for s in steps]
-                            base_shapes.append(shapes.Select(k, steps))
-                        else:
-                            expansion = list(range(int(split[0]), int(split[2]), int(split[-1])))
-                            base_shapes.append(shapes.Select(k, expansion))
-
-                # List of individual values -> Union of Selects
+                compile_shape = partial(self._date_base_shape, k, v, time, has_hdate)
+                if k in ("date", "hdate") and str(v).startswith("-"):
+                    # Relative dates depend on the current day so are never cached
+                    base_shapes.append(compile_shape())
+                else:
+                    key = ("date", k, str(v), time, has_hdate)
+                    base_shapes.append(self._cached_shape(key, compile_shape))
+
+        return [shape for shape in base_shapes if shape is not None]
+
+    def _cached_shape(self, key, compile_shape):
+        """
+        Look up a compiled shape in the shape cache, compiling it on a miss.
+
+        Shapes only depend on a single request item and on the parts of the config
+        which change how it is parsed, so identical items of different requests
+        share one compiled shape.
+
+        :param key: A tuple identifying the request item.
+        :param compile_shape: A callable without arguments compiling the shape.
+        :return: The compiled shape.
+        """
+        context = (self.conf.coverageconfig.param_db, self._has_subhourly_step_transform())
+        missing = object()
+        shape = self.shape_cache.get(key + context, missing)
+        if shape is missing:
+            shape = compile_shape()
+            self.shape_cache.put(key + context, shape)
+        else:
+            self.metrics.hit("shapes")
+        return shape
+
+    def _expand_times(self, time):
+        """
+        Expand the time value of a request into a tuple of times.
+
+        :param time: The time value, e.g. "0000", "00:00:00/12:00:00" or "0000/to/1800/by/0600".
+        :return: A tuple of times, either as given or formatted as HH:MM:SS for ranges.
+        """
+        time = parse_value(time.replace(":", ""))
+        if time.is_range:
+            return tuple(time_range(time.start, time.end, time.by))
+        return time.elements
+
+    def _expand_dates(self, value, time):
+        """
+        Expand a date range into the timestamps of every date at every time.
+
+        As with a daily pandas date range from the first date at the first time to the
+        last date at the last time, the last date is left out if its last time is
+        before its first time.
+
+        :param value: The parsed date range.
+        :param time: The tuple of times of the request.
+        :return: A list of timestamps.
+        """
+        dates = list(date_range(value.start, value.end, value.by))
+        if dates and pd.Timestamp(dates[-1] + "T" + time[0]) > pd.Timestamp(value.end + "T" + time[-1]):
+            dates.pop()
+        return [pd.Timestamp(date + "T" + t) for date in dates for t in time]
+
+    def _step_base_shape(self, k, v):
+        """
+        Compile a request item for data encoded along the step axis, where date and time are separate axes.
+
+        :param k: The request key.
+        :param v: The request value.
+        :return: The polytope shape for the item, or None if the item does not constrain the request.
+        """
+        value = parse_value(v)
+        split = list(value.elements)
+
+        if k == "param":
+            split = self.params.resolve(split)
+
+        # ALL -> All
+        if len(split) == 1 and split[0] == "ALL":
+            return shapes.All(k)
+
+        # month / year axes: values are always passed as integers
+        elif k in ("month", "year"):
+            # Single integer value -> Select
+            if len(split) == 1:
+                return shapes.Select(k, [int(split[0])])
+
+            # Range a/to/b -> Span with integer bounds
+            elif value.is_range and value.by is None:
+                return shapes.Span(k, lower=int(value.start), upper=int(value.end))
+
+            # Range a/to/b/by/step -> Select of integers
+            elif value.by is not None:
+                return shapes.Select(k, list(integer_range(value.start, value.end, value.by).numbers()))
+
+            # List of individual integer values -> Select
+            else:
+                return shapes.Select(k, [int(s) for s in split])
+
+        # Single value -> Select
+        elif len(split) == 1:
+            if k == "date":
+                split[0] = pd.Timestamp(split[0])
+            if k == "time":
+                split[0] = convert_timestamp(split[0])
+            if k == "step" and self._has_subhourly_step_transform():
+                split = [self._format_step_as_subhourly(split[0])]
+            return shapes.Select(k, split)
+
+        # Range a/to/b, "by" not supported -> Span
+        elif value.is_range and value.by is None:
+            # if date then only get time of dates in span not
+            # all in times within date
+            if k == "date":
+                start = pd.Timestamp(value.start)
+                end = pd.Timestamp(value.end)
+                return shapes.Span(k, lower=start, upper=end)
+            elif k == "time":
+                start = convert_timestamp(value.start)
+                end = convert_timestamp(value.end)
+                return shapes.Span(k, lower=start, upper=end)
+            elif k == "step" and self._has_subhourly_step_transform():
+                # Convert step range bounds to subhourly format
+                lower = self._format_step_as_subhourly(value.start)
+                upper = self._format_step_as_subhourly(value.end)
+                return shapes.Span(k, lower=lower, upper=upper)
+            else:
+                return shapes.Span(k, lower=value.start, upper=value.end)  # noqa: E501
+
+        elif value.is_range:
+            if value.by == "1":
+                if k == "date":
+                    start = pd.Timestamp(value.start)
+                    end = pd.Timestamp(value.end)
+                    return shapes.Span(k, lower=start, upper=end)
+                elif k == "time":
+                    start = convert_timestamp(value.start)
+                    end = convert_timestamp(value.end)
+                    return shapes.Span(k, lower=start, upper=end)
+                elif k == "step" and self._has_subhourly_step_transform():
+                    # Convert step range bounds to subhourly format
+                    lower = self._format_step_as_subhourly(value.start)
+                    upper = self._format_step_as_subhourly(value.end)
+                    return shapes.Span(k, lower=lower, upper=upper)
+                else:
+                    return shapes.Span(k, lower=value.start, upper=value.end)  # noqa: E501
+            else:
+                if k == "date":
+                    dates = date_range(value.start, value.end, value.by)
+                    return shapes.Select(k, [pd.Timestamp(date) for date in dates])
+                elif k == "time":
+                    return shapes.Select(k, list(time_range(value.start, value.end, value.by)))
+                # raise ValueError("Ranges with step-size specified with 'by' keyword is not supported")  # noqa: E501
+
+        # List of individual values -> Union of Selects
+        else:
+            if k == "date":
+                dates = []
+                for s in split:
+                    dates.append(pd.Timestamp(s))
+                split = dates
+            if k == "time":
+                times = []
+                for s in split:
+                    times.append(convert_timestamp(s))
+                split = times
+            if k == "step" and self._has_subhourly_step_transform():
+                split = [self._format_step_as_subhourly(s) for s in split]
+            return shapes.Select(k, split)
+
+        return None
+
+    def _date_base_shape(self, k, v, time, has_hdate):
+        """
+        Compile a request item for data where the time is merged into the date axis.
+
+        :param k: The request key.
+        :param v: The request value.
+        :param time: The tuple of times of the request.
+        :param has_hdate: Whether the request has an hdate, in which case date is not a time axis.
+        :return: The polytope shape for the item, or None if the item does not constrain the request.
+        """
+        value = parse_value(v)
+        split = list(value.elements)
+
+        if k == "param":
+            split = self.params.resolve(split)
+
+        # ALL -> All
+        if len(split) == 1 and split[0] == "ALL":
+            return shapes.All(k)
+
+        # month / year axes: values are always passed as integers
+        elif k in ("month", "year"):
+            # Single integer value -> Select
+            if len(split) == 1:
+                return shapes.Select(k, [int(split[0])])
+
+            # Range a/to/b -> Span with integer bounds
+            elif value.is_range and value.by is None:
+                return shapes.Span(k, lower=int(value.start), upper=int(value.end))
+
+            # Range a/to/b/by/step -> Select of integers
+            elif value.by is not None:
+                return shapes.Select(k, list(integer_range(value.start, value.end, value.by).numbers()))
+
+            # List of individual integer values -> Select
+            else:
+                return shapes.Select(k, [int(s) for s in split])
+
+        # Single value -> Select
+        elif len(split) == 1:
+            if k == "hdate" or (k == "date" and not has_hdate):
+                if int(split[0]) < 0:
+                    split[0] = str(
+                        (datetime.datetime.now() + datetime.timedelta(days=int(split[0]))).strftime(  # noqa: E501
+                            "%Y%m%d"
+                        )  # noqa: E501
+                    )
+                new_split = []
+                for t in time:
+                    new_split.append(pd.Timestamp(split[0] + "T" + t))
+                split = new_split
+            elif k == "step" and self._has_subhourly_step_transform():
+                # Convert step to subhourly format if transform is configured
+                split = [self._format_step_as_subhourly(split[0])]
+            return shapes.Select(k, split)
+
+        # Range a/to/b, "by" not supported -> Span
+        elif value.is_range and value.by is None:
+            # if date then only get time of dates in span not
+            # all in times within date
+            if k == "hdate" or (k == "date" and not has_hdate):
+                return shapes.Select(k, self._expand_dates(value, time))
+            elif k == "step" and self._has_subhourly_step_transform():
+                # Convert step range bounds to subhourly format
+                lower = self._format_step_as_subhourly(value.start)
+                upper = self._format_step_as_subhourly(value.end)
+                return shapes.Span(k, lower=lower, upper=upper)
+            else:
+                return shapes.Span(k, lower=value.start, upper=value.end)  # noqa: E501
+
+        elif value.is_range:
+            if value.by == "1":
+                if k == "hdate" or (k == "date" and not has_hdate):
+                    return shapes.Select(k, self._expand_dates(value, time))
+                elif k == "step" and self._has_subhourly_step_transform():
+                    # Convert step range bounds to subhourly format
+                    lower = self._format_step_as_subhourly(value.start)
+                    upper = self._format_step_as_subhourly(value.end)
+                    return shapes.Span(k, lower=lower, upper=upper)
                 else:
-                    if k == "hdate" or (k == "date" and not has_hdate):
-                        dates = []
-                        for s in split:
-                            for t in time:
-                                dates.append(pd.Timestamp(s + "T" + t))
-                        split = dates
-                    elif k == "step" and self._has_subhourly_step_transform():
-                        # Convert each step value to subhourly format if transform is configured
-                        split = [self._format_step_as_subhourly(s) for s in split]
-                    base_shapes.append(shapes.Select(k, split))
-
-        return base_shapes
+                    return shapes.Span(k, lower=value.start, upper=value.end)
+            else:
+                if k == "hdate" or (k == "date" and not has_hdate):
+                    return shapes.Select(k, self._expand_dates(value, time))
+                elif k == "step":
+                    steps = find_step_intervals(value.start, value.end, value.by)
+                    # If subhourly_step transform is configured, ensure all steps are in subhourly format
+                    if self._has_subhourly_step_transform():
+                        steps = [self._format_step_as_subhourly(s) for s in steps]
+                    return shapes.Select(k, steps)
+                else:
+                    expansion = list(range(int(value.start), int(value.end), int(value.by)))
+                    return shapes.Select(k, expansion)
+
+        # List of individual values -> Union of Selects
+        else:
+            if k == "hdate" or (k == "date" and not has_hdate):
+                dates = []
+                for s in split:
+                    for t in time:
+                        dates.append(pd.Timestamp(s + "T" + t))
+                split = dates
+            elif k == "step" and self._has_subhourly_step_transform():
+                # Convert each step value to subhourly format if transform is configured
+                split = [self._format_step_as_subhourly(s) for s in split]
+            return shapes.Select(k, split)
+
+        return None
+
+    def _log_result_tree(self, result):
+        """
+        Log a summary of the Polytope result tree, and the tree itself up to max_tree_lines, if configured.
+
+        :param result: The TensorIndexTree returned by Polytope.
+        """
+        if self.conf.debug.result_tree == "off":
+            return
+        logging.info(f"{self.id}: Polytope result tree: {summarise_tree(result)}")  # noqa: E501
+        if self.conf.debug.result_tree == "dump":
+            logging.info(
+                f"{self.id}: Polytope result tree dump:\n{format_tree(result, self.conf.debug.max_tree_lines)}"
+            )  # noqa: E501
 
     def _feature_factory(self, feature_name, feature_config, config=None):
         feature_class = features.get(feature_name)
@@ -476,37 +1134,34 @@ class PolytopeMars:
     def retrieve_data(self, request, feature_type, feature):
         """
         Retrieves data from the Polytope engine based on the request and feature type.
-        This method sets up the Polytope engine, prepares the request, and encodes the
-        result into a Covjson format.
+        This method takes a Polytope engine from the engine pool, prepares the request,
+        and encodes the result into a Covjson format.
 
         :param request: The request dictionary containing parameters for data retrieval.
         :param feature_type: The type of feature being requested (e.g., 'timeseries', 'polygon').
         :param feature: The feature object that contains the logic for data retrieval.
         :return: The coverage data in Covjson format.
         """
-        shapes = self._create_base_shapes(request, feature_type)
+        self.metrics.count("subrequests")
+
+        with self.metrics.timer("shapes"):
+            shapes = self._create_base_shapes(request, feature_type)
 
-        shapes.extend(feature.get_shapes())
+            shapes.extend(feature.get_shapes())
 
-        preq = Request(*shapes)
+            preq = Request(*shapes)
+        self.metrics.count("shapes", len(shapes))
 
         start = time.time()
         logging.info(f"{self.id}: Gribjump/setup time start: {start}")  # noqa: E501
 
-        if self.conf.datacube.type == "gribjump":
-            fdbdatacube = gj.GribJump()
-        else:
-            raise NotImplementedError(f"Datacube type '{self.conf.datacube.type}' not found")  # noqa: E501
-
         logging.debug(f"Send log_context to polytope: {self.log_context}")
-        self.api = Polytope(
-            datacube=fdbdatacube,
-            options=self.conf.options.model_dump(),
-            context=self.log_context,
-        )
+        api = self.engine_pool.engine(self.conf, self.log_context, self.metrics)
+        self.api = api
 
         end = time.time()
         delta = end - start
+        self.metrics.add_duration("setup", delta)
         logging.debug(f"{self.id}: Gribjump/setup time end: {end}")  # noqa: E501
         logging.info(f"{self.id}: Gribjump/setup time taken: {delta}")  # noqa: E501
 
@@ -514,13 +1169,14 @@ class PolytopeMars:
         start = time.time()
         logging.info(f"{self.id}: Polytope time start: {start}")  # noqa: E501
 
-        result = self.api.retrieve(preq)
-        print(result.pprint())
+        result = api.retrieve(preq)
 
         end = time.time()
         delta = end - start
+        self.metrics.add_duration("polytope", delta)
         logging.debug(f"{self.id}: Polytope time end: {end}")  # noqa: E501
         logging.info(f"{self.id}: Polytope time taken: {delta}")  # noqa: E501
+        self._log_result_tree(result)
         start = time.time()
         logging.info(f"{self.id}: Covjson time start: {start}")  # noqa: E501
         encoder = Covjsonkit(self.conf.coverageconfig.model_dump()).encode(
@@ -549,7 +1205,26 @@ class PolytopeMars:
 
         end = time.time()
         delta = end - start
+        self.metrics.add_duration("covjson", delta)
+        self.metrics.count("points", count_values(coverage))
         logging.debug(f"{self.id}: Covjsonkit time end: {end}")  # noqa: E501
         logging.info(f"{self.id}: Covjsonkit time taken: {delta}")  # noqa: E501
 
         return coverage
+
+
+def _parse_request(request):
+    # Requests are given in JSON or as python dictionaries
+    if isinstance(request, dict):
+        return request
+    try:
+        return json.loads(request)
+    except ValueError:
+        raise ValueError("Request not in JSON format or python dictionary")  # noqa: E501
+
+
+def _retrieve_subrequest(config, log_context, request, feature_type, feature):
+    # Entry point for sub-requests retrieved in a process pool
+    polytope_mars = PolytopeMars(config, log_context)
+    coverage = polytope_mars.retrieve_data(request, feature_type, feature)
+    return coverage, polytope_mars.metrics.as_dict()
@@ -1,3 +1,5 @@
+from typing import Dict, Literal
+
 from conflator import ConfigModel
 from polytope_feature.options import Config
 
@@ -18,6 +20,78 @@ class PolygonRulesConfig(ConfigModel):
     # Max area is the max area of all polygons requested that is allowed.
     # Area is calculated in kilometers squared
     max_area: float = float("inf")
+    # Tolerance of the polygon simplification before slicing, as a fraction of the grid spacing.
+    # Simplified polygons are checked to select the same grid points, 0 disables simplification
+    simplify_tolerance: float = 0.0
+
+
+class CostConfig(ConfigModel):
+    # Max estimated number of values (grid points * fields) of a request, larger requests are
+    # rejected before the datacube is touched. The estimate needs a grid mapper in the options
+    max_values: float = float("inf")
+    # Target estimated number of values of a sub-request. Larger requests of any feature are
+    # split along date, number, step, param and levelist into sub-requests below it. Infinite
+    # keeps splitting large polygons and boxes by date and ensemble member
+    target_values: float = float("inf")
+
+
+class ExecutionConfig(ConfigModel):
+    # Max number of sub-requests of a split request retrieved at the same time
+    max_parallel_subrequests: int = 1
+    # Run the sub-requests in a pool of threads or of processes
+    executor: Literal["thread", "process"] = "thread"
+    # Max number of aextract calls running at the same time in an event loop, 0 for no limit
+    max_concurrent_requests: int = 8
+    # Let identical requests extracted at the same time share one extraction. Requests are compared by
+    # the hash of their canonical form, so equivalent ways of writing dates, times, steps and params match
+    deduplicate: bool = False
+
+
+class TilingConfig(ConfigModel):
+    # Target estimated number of grid points of a spatial tile. Larger polygons and bounding boxes are
+    # cut into latitude bands, retrieved like sub-requests and stitched back together, 0 disables tiling.
+    # Tiling needs a grid mapper in the options
+    tile_points: int = 0
+    # Max number of tiles a region is cut into
+    max_tiles: int = 64
+
+
+class CacheConfig(ConfigModel):
+    # Max number of compiled request items kept in the base shape cache, 0 disables it
+    shape_cache_size: int = 1024
+    # Max number of polygon areas kept in the area cache, 0 disables it
+    area_cache_size: int = 1024
+    # Max number of parsed shapefiles kept in the shapefile cache, 0 disables it
+    shapefile_cache_size: int = 16
+    # Max number of values of single grid points of single fields kept in the cell cache, so
+    # requests overlapping earlier ones only read the missing cells, 0 disables it
+    cell_cache_size: int = 0
+
+
+class ResultCacheConfig(ConfigModel):
+    # Keep the coverages of whole extractions in memory or in a sqlite database on disk, so
+    # repeated requests skip the datacube and the encoding
+    backend: Literal["off", "memory", "disk"] = "off"
+    # Max number of coverages kept
+    max_entries: int = 256
+    # Path of the sqlite database of the disk backend, shared by the processes using it
+    path: str = "polytope_mars_results.sqlite"
+    # Seconds a coverage is kept, 0 disables caching
+    default_ttl: float = 300.0
+    # Seconds coverages are kept per dataset or stream, e.g. {"climate-dt": 86400, "enfo": 600}
+    ttl: Dict[str, float] = {}
+
+
+class MetricsConfig(ConfigModel):
+    # Serialise the coverage returned by extract to record its size in output_bytes
+    output_bytes: bool = False
+
+
+class DebugConfig(ConfigModel):
+    # Log nothing, a summary of the nodes per axis, or the summary and the tree itself for every Polytope result
+    result_tree: Literal["off", "summary", "dump"] = "off"
+    # Max number of lines of a dumped result tree
+    max_tree_lines: int = 1000
 
 
 class PolytopeMarsConfig(ConfigModel):
@@ -25,3 +99,10 @@ class PolytopeMarsConfig(ConfigModel):
     options: Config = Config()
     coverageconfig: CovjsonKitConfig = CovjsonKitConfig()
     polygonrules: PolygonRulesConfig = PolygonRulesConfig()
+    cost: CostConfig = CostConfig()
+    execution: ExecutionConfig = ExecutionConfig()
+    tiling: TilingConfig = TilingConfig()
+    cache: CacheConfig = CacheConfig()
+    results: ResultCacheConfig = ResultCacheConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    debug: DebugConfig = DebugConfig()
@@ -0,0 +1,199 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from polytope_feature.polytope import Polytope
+
+from .utils import cells
+from .utils.cache import shared_cache
+
+
+def gribjump_handle():
+    """
+    Create a new GribJump handle.
+
+    pygribjump is imported here rather than at module level so that the
+    library is only required once a datacube is actually opened.
+    """
+    import pygribjump as gj
+
+    return gj.GribJump()
+
+
+def config_key(conf):
+    """
+    Hash the parts of a PolytopeMarsConfig which determine how a Polytope engine is built.
+
+    :param conf: The PolytopeMarsConfig of the caller.
+    :return: A hex digest identifying the datacube config and polytope options.
+    """
+    payload = json.dumps(
+        {
+            "datacube": conf.datacube.model_dump(),
+            "options": conf.options.model_dump(),
+            "cells": conf.cache.cell_cache_size > 0,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+class EnginePool:
+    """
+    Thread-safe pool of GribJump handles and Polytope engines.
+
+    Building a Polytope engine asks GribJump for the axes of the datacube and
+    sets up the grid mappers, which dominates the latency of small requests.
+    The pool builds one template engine per config hash and hands out deep
+    copies of it which share the GribJump handle, so this setup is only paid
+    once per process. Copies are needed because Polytope trims the datacube
+    axes while slicing a request.
+
+    The template never slices a request, so only what Polytope sets up when an
+    engine is built, such as the axes and the grid mapper tables, is shared by the
+    copies. Caches a mapper fills lazily while slicing start empty in every copy.
+    """
+
+    def __init__(self, handle_factory=None):
+        self.handle_factory = handle_factory if handle_factory is not None else gribjump_handle
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._handles = {}
+        self._templates = {}
+        self._stats = {
+            "handles_created": 0,
+            "engines_built": 0,
+            "engines_reused": 0,
+            "build_time": 0.0,
+            "copy_time": 0.0,
+        }
+
+    @contextmanager
+    def _key_lock(self, key):
+        # Locks of a key are counted by their users and dropped once unused,
+        # so the pool only holds the locks of the keys being built
+        with self._lock:
+            entry = self._key_locks.get(key)
+            if entry is None:
+                entry = self._key_locks[key] = [threading.Lock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def handle(self, conf):
+        """
+        Return the GribJump handle for a config, creating it on first use.
+
+        When the cell cache is enabled, the handle is wrapped to answer extractions
+        from the cells already read.
+
+        :param conf: The PolytopeMarsConfig of the caller.
+        :return: A GribJump handle shared by every engine built for this datacube config.
+        """
+        if conf.datacube.type != "gribjump":
+            raise NotImplementedError(f"Datacube type '{conf.datacube.type}' not found")  # noqa: E501
+        key = json.dumps(conf.datacube.model_dump(), sort_keys=True)
+        with self._key_lock(("handle", key)):
+            if key not in self._handles:
+                self._handles[key] = self.handle_factory()
+                self._count("handles_created")
+            handle = self._handles[key]
+        if conf.cache.cell_cache_size <= 0:
+            return handle
+        size = conf.cache.cell_cache_size
+        with self._key_lock(("cells", key, size)):
+            if ("cells", key, size) not in self._handles:
+                cache = shared_cache("cells", size, cells.CellCache)
+                self._handles[("cells", key, size)] = cells.GribJump(handle, cache)
+            return self._handles[("cells", key, size)]
+
+    def engine(self, conf, context=None, metrics=None):
+        """
+        Return a Polytope engine ready to retrieve a single request.
+
+        :param conf: The PolytopeMarsConfig of the caller.
+        :param context: The log context passed on to Polytope.
+        :param metrics: An optional ExtractMetrics, a reused engine is counted as an "engines" cache hit.
+        :return: A Polytope engine which is not shared with any other caller.
+        """
+        handle = self.handle(conf)
+        key = config_key(conf)
+        with self._key_lock(key):
+            template = self._templates.get(key)
+            if template is None:
+                start = time.time()
+                template = Polytope(
+                    datacube=handle,
+                    options=conf.options.model_dump(),
+                    context=context,
+                )
+                self._count("build_time", time.time() - start)
+                self._count("engines_built")
+                # The context of the caller building the template is set on its copy only
+                template.context = None
+                self._templates[key] = template
+                logging.debug("Built Polytope engine for config %s", key)
+            else:
+                self._count("engines_reused")
+                if metrics is not None:
+                    metrics.hit("engines")
+
+        start = time.time()
+        engine = copy.deepcopy(template, {id(handle): handle})
+        engine.context = context
+        self._count("copy_time", time.time() - start)
+        return engine
+
+    def stats(self):
+        """
+        Return the lifetime counters of the pool.
+
+        :return: A dictionary with the number of handles created, engines built and
+            reused, the cumulative build and copy times and the number of cached engines.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["engines_cached"] = len(self._templates)
+        return stats
+
+    def close(self):
+        """
+        Drop all cached engines and GribJump handles.
+
+        The pool can still be used afterwards, engines are rebuilt on demand. The
+        per config locks are left to the callers holding them, so that an engine is
+        never built twice at the same time.
+        """
+        with self._lock:
+            self._templates.clear()
+            self._handles.clear()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_engine_pool():
+    """
+    Return the process-wide engine pool used by PolytopeMars by default.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = EnginePool()
+        return _shared_pool
@@ -45,6 +45,14 @@ class Feature(ABC):
         # Otherwise, we do not split the request.
         return False
 
+    def domain_axes(self):
+        """
+        Request keys along which each coverage of the feature extends, e.g. the time axis
+        of a timeseries. Sub-requests split along them could not be merged back, so
+        the planner never splits them. This method can be overridden by subclasses.
+        """
+        return []
+
     def validate(self, request, feature_config):
         incompatible_keys = self.incompatible_keys()
         for key in incompatible_keys:
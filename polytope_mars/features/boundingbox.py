@@ -23,7 +23,7 @@ class BoundingBox(Feature):
 
         assert len(feature_config) == 0, f"Unexpected keys in config: {feature_config.keys()}"
 
-        self.area_bb = get_boundingbox_area(self.points)
+        self.area_bb = get_boundingbox_area(self.points, self.axes)
         logging.info(f"Area of bounding box: {self.area_bb} km\u00b2")
 
     def get_shapes(self):
@@ -100,6 +100,9 @@ class Path(Feature):
     def coverage_type(self):
         return "Trajectory"
 
+    def domain_axes(self):
+        return [axis for axis in self.axes if axis not in ("latitude", "longitude")]
+
     def name(self):
         return "Path"
 
@@ -2,6 +2,9 @@ from polytope_feature import shapes
 
 from ..feature import Feature
 from ..utils.areas import field_area, get_polygon_area
+from ..utils.cache import shared_cache
+from ..utils.cost import get_grid_model
+from ..utils.simplify import simplify_polygon
 
 
 class Polygons(Feature):
@@ -9,10 +12,13 @@ class Polygons(Feature):
         assert feature_config.pop("type") == "polygon"
         self.shape = feature_config.pop("shape")
         self.max_area = client_config.polygonrules.max_area
+        self.simplify_tolerance = client_config.polygonrules.simplify_tolerance
+        self.options = client_config.options
         self.area = 0
         self.field_area = 0
+        area_cache = shared_cache("areas", client_config.cache.area_cache_size)
         if type(self.shape[0][0]) is not list:
-            self.area = get_polygon_area(self.shape)
+            self.area = get_polygon_area(self.shape, area_cache)
             if len(self.shape) > client_config.polygonrules.max_points:
                 raise ValueError(
                     f"Number of points {len(self.shape)} exceeds the maximum of {client_config.polygonrules.max_points}"  # noqa: E501
@@ -27,7 +33,7 @@ class Polygons(Feature):
             area_polygons = 0
             for polygon in self.shape:
                 len_polygons += len(polygon)
-                area_polygons += get_polygon_area(polygon)
+                area_polygons += get_polygon_area(polygon, area_cache)
             self.area = area_polygons
             if len_polygons > client_config.polygonrules.max_points:
                 raise ValueError(
@@ -47,13 +53,28 @@ class Polygons(Feature):
 
     def get_shapes(self):
         polygons = []
-        for polygon in self.shape:
+        for polygon in self.simplified_shape():
             points = []
             for point in polygon:
                 points.append([point[0], point[1]])
             polygons.append(shapes.Polygon([self.axes[0], self.axes[1]], points))
         return [shapes.Union([self.axes[0], self.axes[1]], *polygons)]
 
+    def simplified_shape(self):
+        """
+        Simplify the polygons, keeping the grid points they select, if a simplification tolerance is configured.
+
+        :return: The list of polygons handed to Polytope.
+        """
+        if self.simplify_tolerance <= 0:
+            return self.shape
+        try:
+            grid = get_grid_model(self.options)
+        except (ValueError, NotImplementedError):
+            return self.shape
+        lat_index = self.axes.index("latitude") if "latitude" in self.axes else 0
+        return [simplify_polygon(polygon, grid, self.simplify_tolerance, lat_index) for polygon in self.shape]
+
     def incompatible_keys(self):
         return []
 
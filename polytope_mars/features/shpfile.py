@@ -1,7 +1,17 @@
+import os
+
 import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
 from polytope_feature import shapes
 
+from ..config import CacheConfig
 from ..feature import Feature
+from ..utils.cache import shared_cache
+
+# Parsed shapefiles, keyed on their absolute path and reloaded when the file changes
+shapefile_cache = shared_cache("shapefiles", CacheConfig().shapefile_cache_size)
 
 
 # Function to convert POLYGON and MULTIPOLYGON to points
@@ -21,22 +31,157 @@ def get_coords(geom):
     return coords
 
 
+class ShapefileData:
+    """
+    The geometries of a shapefile, with the exterior rings of their polygons as NumPy arrays.
+
+    The rings of all the geometries are extracted at once when the file is read, so
+    the shapes of a geometry are built without walking its coordinates in Python.
+    """
+
+    def __init__(self, df, stamp=None):
+        self.df = df
+        self.stamp = stamp
+
+        # Split multi-polygons into polygons, remembering the geometry each comes from
+        polygons, geometry_index = shapely.get_parts(np.asarray(df.geometry.values), return_index=True)
+        rings = shapely.get_exterior_ring(polygons)
+        coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+        ring_ends = np.searchsorted(ring_index, np.arange(1, len(rings)))
+        self.rings = np.split(coords, ring_ends)
+        self.ring_ends = np.searchsorted(geometry_index, np.arange(1, len(df) + 1))
+
+        # Indexes are built on first use and kept with the parsed file
+        self._attribute_indexes = {}
+        self._tree = None
+
+    def __len__(self):
+        return len(self.df)
+
+    def polygons(self, index):
+        """
+        Return the exterior rings of the polygons of a geometry.
+
+        :param index: The position of the geometry in the file.
+        :return: A list of (n, 2) arrays, one per polygon.
+        """
+        start = self.ring_ends[index - 1] if index > 0 else 0
+        return self.rings[start : self.ring_ends[index]]  # noqa: E203
+
+    def attribute_index(self, column):
+        """
+        Return the positions of the geometries for each value of an attribute.
+
+        Values are compared as strings, so 1 and "1" select the same geometries.
+
+        :param column: The name of the attribute.
+        :return: A dictionary from the values of the attribute to arrays of positions.
+        """
+        index = self._attribute_indexes.get(column)
+        if index is None:
+            if column not in self.df.columns or column == self.df.geometry.name:
+                raise ValueError(f"Shapefile has no attribute '{column}', available attributes are {self.columns()}")
+            codes, values = pd.factorize(self.df[column].astype(str), sort=False)
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+            index = {value: order[bounds[i] : bounds[i + 1]] for i, value in enumerate(values)}  # noqa: E203
+            self._attribute_indexes[column] = index
+        return index
+
+    def columns(self):
+        return [column for column in self.df.columns if column != self.df.geometry.name]
+
+    def select(self, filter=None, contains=None):
+        """
+        Find the geometries matching attribute values and containing a point.
+
+        :param filter: A dictionary of attribute names to a value or a list of values
+            the attribute must take, all attributes must match.
+        :param contains: A point [x, y] in the coordinates of the file the geometries must contain.
+        :return: The sorted positions of the matching geometries.
+        """
+        positions = None
+        for column, values in (filter or {}).items():
+            index = self.attribute_index(column)
+            values = values if isinstance(values, list) else [values]
+            matches = [index.get(str(value), np.empty(0, dtype=int)) for value in values]
+            matches = np.unique(np.concatenate(matches))
+            positions = matches if positions is None else np.intersect1d(positions, matches)
+        if contains is not None:
+            if self._tree is None:
+                self._tree = shapely.STRtree(np.asarray(self.df.geometry.values))
+            matches = np.unique(self._tree.query(shapely.Point(contains), predicate="intersects"))
+            positions = matches if positions is None else np.intersect1d(positions, matches)
+        if positions is None:
+            return np.arange(len(self))
+        return positions
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_shapefile(path, cache=None):
+    """
+    Read and parse a shapefile, or any file read by geopandas, reusing the cached parse.
+
+    Cached files are read again when their modification time or size changes.
+
+    :param path: The path of the file.
+    :param cache: The cache of parsed files, shapefile_cache if not given.
+    :return: The ShapefileData of the file.
+    """
+    cache = cache if cache is not None else shapefile_cache
+    key = os.path.abspath(path)
+    stamp = _file_stamp(key)
+    data = cache.get(key)
+    if data is None or data.stamp != stamp:
+        data = ShapefileData(gpd.read_file(key), stamp)
+        cache.put(key, data)
+    return data
+
+
+def select_geometries(data, filter=None, contains=None):
+    """
+    Select the geometries of a shapefile extracted by a shapefile feature.
+
+    :param data: The ShapefileData of the file.
+    :param filter: A dictionary of attribute names to a value or a list of values.
+    :param contains: A point the geometries must contain.
+    :return: The positions of the selected geometries, only the first geometry of
+        the file if neither filter nor contains is given.
+    """
+    if filter is None and contains is None:
+        return np.arange(min(len(data), 1))
+    positions = data.select(filter, contains)
+    if len(positions) == 0:
+        raise ValueError(f"No geometry of the shapefile matches filter {filter} and contains {contains}")
+    return positions
+
+
 class Shapefile(Feature):
     def __init__(self, feature_config, client_config):
         assert feature_config.pop("type") == "shapefile"
         self.file = feature_config.pop("file")
-        self.df = gpd.read_file(self.file)
+        self.filter = feature_config.pop("filter", None)
+        self.contains = feature_config.pop("contains", None)
+        if self.filter is not None and not isinstance(self.filter, dict):
+            raise ValueError("Shapefile filter must be a dictionary of attribute names to values")
+        if self.contains is not None and len(self.contains) != 2:
+            raise ValueError("Shapefile contains must be a point with two coordinates")
+        self.data = load_shapefile(self.file, shared_cache("shapefiles", client_config.cache.shapefile_cache_size))
+        self.df = self.data.df
+        self.positions = select_geometries(self.data, self.filter, self.contains)
 
         assert len(feature_config) == 0, f"Unexpected keys in config: {feature_config.keys()}"
 
     def get_shapes(self):
-        self.df = self.df.head(1)
-
-        coordinates = self.df.geometry.apply(get_coords)
+        # Only the selected geometries are handed to Polytope
         polygons = []
-        for coords in coordinates:
-            for coord in coords:
-                polygons.append(shapes.Polygon(["latitude", "longitude"], coord))  # noqa: E501
+        for position in self.positions:
+            for coords in self.data.polygons(position):
+                polygons.append(shapes.Polygon(["latitude", "longitude"], coords.tolist()))  # noqa: E501
         return [shapes.Union(["latitude", "longitude"], *polygons)]
 
     def incompatible_keys(self):
@@ -48,5 +193,11 @@ class Shapefile(Feature):
     def name(self):
         return "Shapefile"
 
+    def required_keys(self):
+        return ["type", "file"]
+
+    def required_axes(self):
+        return ["latitude", "longitude"]
+
     def parse(self, request, feature_config):
         return request
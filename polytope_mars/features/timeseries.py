@@ -54,6 +54,11 @@ class TimeSeries(Feature):
     def coverage_type(self):
         return "PointSeries"
 
+    def domain_axes(self):
+        if isinstance(self.time_axis, list):
+            return list(self.time_axis)
+        return [self.time_axis]
+
     def name(self):
         return "Time Series"
 
@@ -48,6 +48,9 @@ class VerticalProfile(Feature):
     def coverage_type(self):
         return "VerticalProfile"
 
+    def domain_axes(self):
+        return ["levelist"]
+
     def name(self):
         return "Vertical Profile"
 
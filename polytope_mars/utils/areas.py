@@ -1,12 +1,50 @@
+import hashlib
 import math
 
 import numpy as np
+import shapely
 from geographiclib.geodesic import Geodesic
-from geographiclib.polygonarea import PolygonArea
 from shapely.geometry import LineString, Polygon
 from shapely.ops import split
 
+from ..config import CacheConfig
+from .cache import shared_cache
 from .datetimes import count_steps, days_between_dates, hours_between_times
+from .ranges import integer_range, parse_value
+
+# Areas of polygons in km², keyed on their canonicalised coordinates
+area_cache = shared_cache("areas", CacheConfig().area_cache_size)
+
+
+def _canonical_ring(points):
+    # The same ring whatever its first vertex, orientation and closing vertex
+    ring = np.asarray(points, dtype=float)[:, :2]
+    if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+        ring = ring[:-1]
+    if len(ring) < 3:
+        return ring
+    ring = np.roll(ring, -np.lexsort((ring[:, 1], ring[:, 0]))[0], axis=0)
+    if tuple(ring[-1]) < tuple(ring[1]):
+        ring = np.concatenate([ring[:1], ring[:0:-1]])
+    return ring
+
+
+def geometry_key(kind, points):
+    """
+    Hash the coordinates of a shape for the area cache.
+
+    Polygon rings which only differ by their first vertex, their orientation or
+    whether they are closed get the same key, as they have the same area.
+
+    :param kind: The kind of shape, "polygon" or any other kind keyed on its points as given.
+    :param points: The coordinates of the shape.
+    :return: A tuple of the kind and a hex digest of the coordinates.
+    """
+    if kind == "polygon":
+        coords = _canonical_ring(points)
+    else:
+        coords = np.asarray([point[:2] for point in points], dtype=float)
+    return (kind, hashlib.sha1(np.round(coords, 9).tobytes()).hexdigest())
 
 
 def haversine_distance(lat1, lon1, lat2, lon2):
@@ -56,16 +94,30 @@ def get_circle_area_from_coords(lat_center, lon_center, lat_point, lon_point):
     return get_circle_area(radius_km)
 
 
-def split_polygon(polygon):
-    minx, miny, maxx, maxy = polygon.bounds
+def _authalic_q(phi):
+    # q(phi) of the authalic latitude for the WGS84 ellipsoid
+    sin_phi = np.sin(phi)
+    return (1 - _E2) * (sin_phi / (1 - _E2 * sin_phi**2) - np.log((1 - _E * sin_phi) / (1 + _E * sin_phi)) / (2 * _E))
 
-    # Determine all multiples of 90 degrees within the longitude range
-    # We extend the range slightly to include exact multiples if
-    # they coincide with minx or maxx
-    start_lon = int(np.floor(minx / 90.0)) * 90
-    end_lon = int(np.ceil(maxx / 90.0)) * 90
-    split_longitudes = list(range(start_lon, end_lon + 1, 90))
 
+_E2 = Geodesic.WGS84.f * (2 - Geodesic.WGS84.f)
+_E = math.sqrt(_E2)
+_QP = float(_authalic_q(math.pi / 2))
+# Squared radius of the sphere with the same surface area as the WGS84 ellipsoid
+_AUTHALIC_R2 = Geodesic.WGS84.a**2 * _QP / 2
+
+
+def authalic_latitude(lat):
+    """
+    Convert geodetic latitudes to authalic latitudes, which map the WGS84 ellipsoid onto a sphere of equal area.
+
+    :param lat: Geodetic latitudes in degrees, a number or an array.
+    :return: Authalic latitudes in radians.
+    """
+    return np.arcsin(np.clip(_authalic_q(np.radians(lat)) / _QP, -1.0, 1.0))
+
+
+def _split_polygon_by_meridian(polygon, split_longitudes):
     pieces = [polygon]
 
     # Split the polygon using the specified meridians
@@ -85,65 +137,130 @@ def split_polygon(polygon):
     return pieces
 
 
-def get_area_piece(piece):
-    geod = Geodesic.WGS84
-    polygon = PolygonArea(geod, False)
+def split_polygon(polygon):
+    """
+    Split a polygon at every multiple of 90 degrees of longitude it spans.
+
+    All pieces are cut out in one vectorised intersection with the 90 degree wide
+    longitude bands. Invalid polygons, which cannot be intersected, are split one
+    meridian at a time instead.
+
+    :param polygon: A shapely Polygon with (longitude, latitude) coordinates.
+    :return: A list of shapely Polygons.
+    """
+    minx, miny, maxx, maxy = polygon.bounds
+
+    # Determine all multiples of 90 degrees within the longitude range
+    # We extend the range slightly to include exact multiples if
+    # they coincide with minx or maxx
+    start_lon = int(np.floor(minx / 90.0)) * 90
+    end_lon = int(np.ceil(maxx / 90.0)) * 90
+    split_longitudes = np.arange(start_lon, end_lon + 1, 90)
+
+    if len(split_longitudes) <= 2:
+        return [polygon]
+    if not polygon.is_valid:
+        return _split_polygon_by_meridian(polygon, split_longitudes.tolist())
+
+    bands = shapely.box(split_longitudes[:-1], -90, split_longitudes[1:], 90)
+    pieces = shapely.get_parts(shapely.intersection(polygon, bands))
+    return [piece for piece in pieces if piece.geom_type == "Polygon" and not piece.is_empty]
+
+
+def get_pieces_area(pieces):
+    """
+    Calculate the total area of the exterior rings of a list of polygons on the WGS84 ellipsoid.
+
+    The rings are projected onto the authalic sphere and the spherical excess of
+    every edge is summed per ring in a single vectorised pass. This is within
+    0.02% of the geodesic area from geographiclib for polygons with edges up to 90
+    degrees of longitude, which split_polygon guarantees.
+
+    :param pieces: A list of shapely Polygons with (longitude, latitude) coordinates.
+    :return: The area in square meters.
+    """
+    if len(pieces) == 0:
+        return 0.0
+
+    rings = shapely.get_exterior_ring(np.asarray(pieces, dtype=object))
+    coords, ring_index = shapely.get_coordinates(rings, return_index=True)
+    if len(coords) == 0:
+        return 0.0
+
+    lon = np.radians(coords[:, 0])
+    tan_lat = np.tan(authalic_latitude(coords[:, 1]) / 2)
+
+    # Index of the next vertex of each edge, wrapping around at the end of each ring
+    ring_end = np.append(ring_index[1:] != ring_index[:-1], True)
+    ring_start = np.flatnonzero(np.insert(ring_end[:-1], 0, True))
+    next_vertex = np.arange(1, len(coords) + 1)
+    next_vertex[ring_end] = ring_start
+
+    delta_lon = np.remainder(lon[next_vertex] - lon + np.pi, 2 * np.pi) - np.pi
+    excess = 2 * np.arctan2(
+        np.tan(delta_lon / 2) * (tan_lat + tan_lat[next_vertex]), 1 + tan_lat * tan_lat[next_vertex]
+    )
+    ring_area = np.bincount(ring_index, weights=excess, minlength=len(pieces))
 
+    return float(np.abs(ring_area).sum() * _AUTHALIC_R2)
+
+
+def get_area_piece(piece):
     if piece.geom_type == "Polygon":
-        coords = list(piece.exterior.coords)
+        return get_pieces_area([piece])
     elif piece.geom_type == "MultiPolygon":
-        area = 0.0
-        for poly in piece:
-            area += get_area_piece(poly)
-        return area
+        return get_pieces_area(list(piece.geoms))
     else:
         return 0.0
 
-    for lon, lat in coords:
-        polygon.AddPoint(lat, lon)
-
-    num, perimeter, area = polygon.Compute(False, True)
-
-    area = abs(area)
 
-    return area  # area in square meters
+def get_polygon_area(points, cache=None):
+    cache = cache if cache is not None else area_cache
+    return cache.get_or_create(geometry_key("polygon", points), lambda: _get_polygon_area(points))
 
 
-def get_polygon_area(points):
+def _get_polygon_area(points):
     polygon = Polygon([(lon, lat) for lat, lon in points])
     pieces = split_polygon(polygon)
-    total_area = 0.0
-    for piece in pieces:
-        area = get_area_piece(piece)
-        total_area += area
+    total_area = get_pieces_area(pieces)
     return total_area / 1e6  # Convert area from square meters to square kilometers  # noqa: E501
 
 
-def get_boundingbox_area(points):
-    # Convert points to a Shapely Polygon
-    min_lon, min_lat = points[0][:2]
-    max_lon, max_lat = points[1][:2]
-    if min_lon + max_lon == 0:
-        min_lon += 0.1
-
-    # Define the polygon coordinates
-    polygon_coords = [
-        (min_lat, min_lon),  # Bottom-left corner
-        (min_lat, max_lon),  # Bottom-right corner
-        (max_lat, max_lon),  # Top-right corner
-        (max_lat, min_lon),  # Top-left corner
-        (
-            min_lat,
-            min_lon,
-        ),  # Closing the polygon by returning to the bottom-left corner
-    ]
-    polygon = Polygon(polygon_coords)
-    pieces = split_polygon(polygon)
-    total_area = 0.0
-    for piece in pieces:
-        area = get_area_piece(piece)
-        total_area += area
-    return total_area / 1e6  # Convert area from square meters to square kilometers  # noqa: E501
+def get_boundingbox_area(points, axes=None):
+    """
+    Calculate the area of a latitude/longitude box on the WGS84 ellipsoid in square kilometers.
+
+    The area between two parallels is proportional to the difference of q(phi) of
+    the authalic latitude, so the box area has a closed form. Latitudes are clamped
+    to the poles. Longitudes are not wrapped, as the cyclic longitude axis extracts
+    [170, 190] as a 20 degree wide box, and the width is capped at 360 degrees.
+
+    :param points: The lower and upper corners of the box.
+    :param axes: The axes of the corners, latitude then longitude if None.
+    :return: The area in square kilometers.
+    """
+    if axes is None:
+        lat_index, lon_index = 0, 1
+    else:
+        lat_index, lon_index = axes.index("latitude"), axes.index("longitude")
+    lat1, lat2 = np.clip([points[0][lat_index], points[1][lat_index]], -90.0, 90.0)
+    width = min(abs(points[1][lon_index] - points[0][lon_index]), 360.0)
+
+    q1, q2 = _authalic_q(np.radians([lat1, lat2]))
+    area = Geodesic.WGS84.a**2 / 2 * math.radians(width) * abs(q2 - q1)
+    return float(area) / 1e6  # Convert area from square meters to square kilometers  # noqa: E501
+
+
+def _count_values(value, count_range):
+    # Count the elements of a MARS value, ranges are counted by count_range(start, end) without expanding them
+    value = parse_value(value)
+    if value.is_range:
+        return count_range(value.start, value.end)
+    return len(value.elements)
+
+
+def _count_integers(start, end):
+    return len(integer_range(start, end))
 
 
 def field_area(request, area):
@@ -172,59 +289,34 @@ def field_area(request, area):
         step_len = count_steps(request["step"])
 
     if "number" in request:
-        number = str(request["number"]).split("/")
-        if "to" in number:
-            number_len = len(range(int(number[0]), int(number[2]) + 1))
-        else:
-            number_len = len(number)
+        number_len = _count_values(request["number"], _count_integers)
 
     if "levelist" in request:
-        levelist = str(request["levelist"]).split("/")
-        if "to" in levelist:
-            levelist_len = len(range(int(levelist[0]), int(levelist[2]) + 1))
-        else:
-            levelist_len = len(levelist)
+        levelist_len = _count_values(request["levelist"], _count_integers)
 
-    param = request["param"].split("/")
-    param_len = len(param)
+    param_len = len(parse_value(request["param"]).elements)
 
     # date / time lengths — not present when the time axis is month or year
     if "date" in request:
-        date = request["date"].split("/")
-        if "to" in date:
-            date_len = days_between_dates(date[0], date[2])
-        else:
-            date_len = len(date)
+        date_len = _count_values(request["date"], days_between_dates)
         if date_len == 0:
             date_len = 1
     else:
         date_len = 1
 
     if "time" in request:
-        time = request["time"].split("/")
-        if "to" in time:
-            time_len = hours_between_times(time[0], time[2])
-        else:
-            time_len = len(time)
+        time_len = _count_values(request["time"], hours_between_times)
     else:
         time_len = 1
 
     # month / year lengths — contribute to cost when the time axis is month or year
     month_len = 1
     if "month" in request:
-        month = str(request["month"]).split("/")
-        if "to" in month:
-            month_len = int(month[2]) - int(month[0]) + 1
-        else:
-            month_len = len(month)
+        month_len = _count_values(request["month"], _count_integers)
 
     year_len = 1
     if "year" in request:
-        year = str(request["year"]).split("/")
-        if "to" in year:
-            year_len = int(year[2]) - int(year[0]) + 1
-        else:
-            year_len = len(year)
+        year_len = _count_values(request["year"], _count_integers)
 
     shape_area = area
 
@@ -240,7 +332,7 @@ def request_cost(request):
     :return: The cost of the request.
     """
     if request["feature"]["type"] == "boundingbox":
-        area = get_boundingbox_area(request["feature"]["points"])
+        area = get_boundingbox_area(request["feature"]["points"], request["feature"].get("axes"))
     elif request["feature"]["type"] == "polygon":
         area = get_polygon_area(request["feature"]["shape"])
     else:
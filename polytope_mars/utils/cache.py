@@ -0,0 +1,138 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe least recently used cache with hit and miss counters.
+
+    A maxsize of 0 disables the cache, every lookup is then counted as a miss.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """
+        Look up a key, marking it as the most recently used.
+
+        :param key: A hashable key.
+        :param default: The value returned when the key is not cached.
+        :return: The cached value or default.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Store a value, evicting the least recently used entries beyond maxsize.
+
+        :param key: A hashable key.
+        :param value: The value to cache.
+        """
+        with self._lock:
+            if self.maxsize <= 0:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_create(self, key, factory):
+        """
+        Return the cached value for a key, calling factory to create it on a miss.
+
+        The factory is called outside the lock, so two threads missing the same
+        key at the same time may both create the value.
+
+        :param key: A hashable key.
+        :param factory: A callable without arguments returning the value.
+        :return: The cached or newly created value.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        """
+        Remove a key from the cache.
+
+        :param key: A hashable key.
+        :param default: The value returned when the key is not cached.
+        :return: The removed value or default.
+        """
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def resize(self, maxsize):
+        """
+        Change the maximum number of entries, evicting entries if needed.
+
+        :param maxsize: The new maximum number of entries.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > max(maxsize, 0):
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """
+        Remove all entries and reset the counters.
+        """
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: A dictionary with the hits, misses, current size and maxsize of the cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
+
+
+# Caches shared by the PolytopeMars instances of the process, per name and size
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def shared_cache(name, maxsize, factory=LRUCache):
+    """
+    Return the cache of a name and size, shared with the instances configured alike.
+
+    Instances configured with other sizes get caches of their own, so that no
+    instance resizes the caches of another.
+
+    :param name: The name of the cache, e.g. "shapes".
+    :param maxsize: The maximum size of the cache.
+    :param factory: The cache class, called with maxsize on first use.
+    :return: The shared cache.
+    """
+    key = (name, maxsize)
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = factory(maxsize=maxsize)
+            _shared_caches[key] = cache
+    return cache
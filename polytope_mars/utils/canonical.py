@@ -0,0 +1,170 @@
+import hashlib
+import json
+
+from .datetimes import convert_timestamp
+from .ranges import parse_value
+
+# Decimals kept of the coordinates and other floats of a feature
+COORDINATE_DECIMALS = 6
+
+# Keys whose values are case insensitive
+LOWER_CASE_KEYS = ("class", "stream", "type", "levtype", "domain")
+
+# Keys holding integers, written without leading zeros
+INTEGER_KEYS = ("number", "levelist")
+
+
+def _elements(value):
+    return [element.strip() for element in str(value).split("/")]
+
+
+def _join(elements):
+    # Parse elements with the range keywords lower cased
+    return parse_value(
+        "/".join(element.lower() if element.lower() in ("to", "by") else element for element in elements)
+    )
+
+
+def _integer(element):
+    return str(int(element)) if element.lstrip("-").isdigit() else element
+
+
+def _canonical_range(value, bound, by=None):
+    # Ranges keep their start/to/end[/by/interval] form, as the shapes built for a range
+    # do not always select the same values as the list it spells out, e.g. a Span or a
+    # step range leaving out its end
+    text = f"{bound(value.start)}/to/{bound(value.end)}"
+    if value.by is not None:
+        text += f"/by/{(by or bound)(value.by)}"
+    return text
+
+
+def _canonical_date(value):
+    value = _join(element.replace("-", "") if not element.startswith("-") else element for element in _elements(value))
+    if not value.is_range:
+        return "/".join(value.elements)
+    return _canonical_range(value, str, _integer)
+
+
+def _hhmm(element):
+    # MARS times are HHMM, HH or H, the seconds of HH:MM:SS times are dropped
+    element = element.replace(":", "")
+    if len(element) == 6:
+        return element[:4]
+    if len(element) <= 2:
+        return element.zfill(2) + "00"
+    return element.zfill(4)
+
+
+def _canonical_time(value):
+    value = _join(_elements(value))
+    if not value.is_range:
+        return "/".join(convert_timestamp(_hhmm(element)) for element in value.elements)
+    # The interval of a time range is HHMM, with leading zeros left out
+    return _canonical_range(value, _hhmm, lambda by: by.zfill(4))
+
+
+def _canonical_integers(value):
+    value = _join(_integer(element) for element in _elements(value))
+    if not value.is_range:
+        return "/".join(value.elements)
+    return _canonical_range(value, str)
+
+
+def _canonical_param(value, params):
+    elements = _elements(value)
+    if params is not None:
+        try:
+            elements = params.resolve(elements)
+        except KeyError:
+            pass
+    return "/".join(elements)
+
+
+def _canonical_feature(value):
+    if isinstance(value, float):
+        value = round(value, COORDINATE_DECIMALS)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, dict):
+        return {str(key): _canonical_feature(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_feature(item) for item in value]
+    return value
+
+
+def canonical_value(key, value, params=None):
+    """
+    Bring the value of a MARS key to a canonical form.
+
+    Dates are written YYYYMMDD, times HH:MM:SS, or HHMM as the bounds of a range,
+    integers without leading zeros and param names are resolved to ids. Ranges are
+    not expanded, as the values a range selects may differ from the list it spells
+    out. The order of the elements of a list is kept, as it is the order of the
+    output. Values which cannot be parsed are only trimmed.
+
+    :param key: The MARS key, e.g. "step".
+    :param value: The value of the key.
+    :param params: A ParamResolver used to resolve param names, names are kept if None.
+    :return: The canonical value as a string.
+    """
+    try:
+        if key in ("date", "hdate"):
+            return _canonical_date(value)
+        if key == "time":
+            return _canonical_time(value)
+        if key == "step" or key in INTEGER_KEYS:
+            return _canonical_integers(value)
+        if key == "param":
+            return _canonical_param(value, params)
+    except (ValueError, TypeError):
+        pass
+    value = "/".join(element.lower() if element.lower() in ("to", "by") else element for element in _elements(value))
+    return value.lower() if key in LOWER_CASE_KEYS else value
+
+
+def canonicalise(request, params=None):
+    """
+    Bring a request to a canonical form, so that equivalent requests compare equal.
+
+    Keys are sorted, MARS values are brought to the form of canonical_value and the
+    floats of the feature, e.g. its coordinates, are rounded to COORDINATE_DECIMALS
+    decimals with integral floats written as integers.
+
+    :param request: The request as a python dictionary, with or without its feature.
+    :param params: A ParamResolver used to resolve param names, names are kept if None.
+    :return: The canonical request as a new dictionary.
+    """
+    canonical = {}
+    for key in sorted(request, key=str):
+        if key == "feature":
+            canonical[key] = _canonical_feature(request[key])
+        elif isinstance(request[key], (dict, list)):
+            canonical[str(key)] = _canonical_feature(request[key])
+        else:
+            canonical[str(key)] = canonical_value(str(key), request[key], params)
+    return canonical
+
+
+def canonical_request(request, params=None):
+    """
+    Serialise the canonical form of a request.
+
+    :param request: The request as a python dictionary.
+    :param params: A ParamResolver used to resolve param names, names are kept if None.
+    :return: The canonical request as a compact JSON string with sorted keys.
+    """
+    return json.dumps(canonicalise(request, params), sort_keys=True, separators=(",", ":"), default=str)
+
+
+def request_hash(request, params=None, context=""):
+    """
+    Hash the canonical form of a request.
+
+    :param request: The request as a python dictionary.
+    :param params: A ParamResolver used to resolve param names, names are kept if None.
+    :param context: A string identifying the configuration the request is extracted with.
+    :return: A hex digest of the context and the canonical request.
+    """
+    return hashlib.sha256((context + canonical_request(request, params)).encode()).hexdigest()
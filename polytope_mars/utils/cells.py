@@ -0,0 +1,212 @@
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..config import CacheConfig
+from .cache import shared_cache
+
+
+def field_key(request, grid_hash=None):
+    """
+    Identify a field of the datacube from a GribJump extraction request.
+
+    :param request: The dictionary of MARS keys of the field, e.g. param, date and step.
+    :param grid_hash: The md5 hash of the grid the values are indexed on.
+    :return: A hashable key of the field.
+    """
+    return (json.dumps(request, sort_keys=True, default=str), grid_hash)
+
+
+def _runs(indices):
+    # Contiguous [start, end) runs of a sorted array of indices
+    if len(indices) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(indices) != 1) + 1
+    starts = np.concatenate([[0], breaks])
+    ends = np.concatenate([breaks, [len(indices)]])
+    return [(int(indices[start]), int(indices[end - 1]) + 1) for start, end in zip(starts, ends)]
+
+
+class CellCache:
+    """
+    Thread-safe cache of the values of single grid points of single fields.
+
+    The cells of a field are kept as sorted arrays of grid indices and values, and
+    whole fields are evicted, least recently used first, once more than maxsize
+    cells are held. A maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._fields = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self._size
+
+    def lookup(self, key, indices):
+        """
+        Look up the cells of a field.
+
+        :param key: The key of the field returned by field_key.
+        :param indices: A sorted array of grid indices.
+        :return: A boolean array telling which indices are cached and an array of their
+            values, undefined where they are not cached.
+        """
+        with self._lock:
+            field = self._fields.get(key)
+            if field is None:
+                self.misses += len(indices)
+                return np.zeros(len(indices), dtype=bool), np.empty(len(indices))
+            self._fields.move_to_end(key)
+            cached, values = field
+            positions = np.minimum(np.searchsorted(cached, indices), max(len(cached) - 1, 0))
+            found = cached[positions] == indices if len(cached) else np.zeros(len(indices), dtype=bool)
+            hits = int(np.count_nonzero(found))
+            self.hits += hits
+            self.misses += len(indices) - hits
+            return found, values[positions]
+
+    def store(self, key, indices, values):
+        """
+        Add cells to a field, evicting the least recently used fields beyond maxsize.
+
+        :param key: The key of the field returned by field_key.
+        :param indices: An array of grid indices.
+        :param values: The values of the field at these indices.
+        """
+        if self.maxsize <= 0 or len(indices) == 0:
+            return
+        indices = np.asarray(indices)
+        values = np.asarray(values)
+        with self._lock:
+            field = self._fields.pop(key, None)
+            if field is not None:
+                self._size -= len(field[0])
+                # New values come first so they replace the cached ones
+                indices = np.concatenate([indices, field[0]])
+                values = np.concatenate([values, field[1]])
+            indices, unique = np.unique(indices, return_index=True)
+            self._fields[key] = (indices, values[unique])
+            self._size += len(indices)
+            self._evict()
+
+    def _evict(self):
+        while self._size > max(self.maxsize, 0) and self._fields:
+            _, (indices, _) = self._fields.popitem(last=False)
+            self._size -= len(indices)
+
+    def resize(self, maxsize):
+        """
+        Change the maximum number of cells, evicting fields if needed.
+
+        :param maxsize: The new maximum number of cells.
+        """
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """
+        Remove all cells and reset the counters.
+        """
+        with self._lock:
+            self._fields.clear()
+            self._size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: A dictionary with the cell hits and misses, and the current number of fields and cells.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "fields": len(self._fields),
+                "cells": self._size,
+                "maxsize": self.maxsize,
+            }
+
+
+# Cells shared by the cached GribJump handles of the process with the default size
+cell_cache = shared_cache("cells", CacheConfig().cell_cache_size, CellCache)
+
+
+class ExtractionResult:
+    def __init__(self, values):
+        self.values = values
+
+
+class GribJump:
+    """
+    GribJump handle answering extractions from a CellCache, reading only the missing cells.
+
+    Every other call is passed on to the wrapped handle. The class is named GribJump
+    as Polytope picks its datacube backend by the class name of the handle.
+    """
+
+    def __init__(self, handle, cache=None):
+        self.handle = handle
+        self.cache = cache if cache is not None else cell_cache
+
+    def __getattr__(self, name):
+        return getattr(self.handle, name)
+
+    def extract(self, requests, ctx=None):
+        """
+        Extract ranges of grid points of fields, reading the cells which are not cached.
+
+        :param requests: A list of (request, ranges, grid_hash) tuples as taken by GribJump.extract.
+        :param ctx: The context passed on to GribJump.
+        :return: A list of results whose values hold an array per range, or no array if
+            the field is not in the datacube.
+        """
+        lookups = []
+        missing = []
+        for request, ranges, grid_hash in requests:
+            key = field_key(request, grid_hash)
+            indices = np.concatenate([np.arange(start, end) for start, end in ranges]) if ranges else np.empty(0, int)
+            order = np.argsort(indices, kind="stable")
+            found, values = self.cache.lookup(key, indices[order])
+            cells = np.empty(len(indices))
+            cells[order] = values
+            cached = np.zeros(len(indices), dtype=bool)
+            cached[order] = found
+            lookups.append((key, ranges, indices, cells, cached))
+            if not cached.all():
+                missing.append((len(lookups) - 1, _runs(np.unique(indices[~cached]))))
+
+        fetched = {}
+        if missing:
+            results = self.handle.extract(
+                [(requests[i][0], runs, requests[i][2]) for i, runs in missing],
+                ctx,
+            )
+            for (i, runs), result in zip(missing, results):
+                fetched[i] = (runs, result.values)
+
+        outputs = []
+        for i, (key, ranges, indices, cells, cached) in enumerate(lookups):
+            if i in fetched:
+                runs, values = fetched[i]
+                if len(values) == 0:
+                    # The field is not in the datacube
+                    outputs.append(ExtractionResult([]))
+                    continue
+                new_indices = np.concatenate([np.arange(start, end) for start, end in runs])
+                new_values = np.concatenate([np.asarray(value, dtype=float).ravel() for value in values])
+                self.cache.store(key, new_indices, new_values)
+                positions = np.searchsorted(new_indices, indices[~cached])
+                cells[~cached] = new_values[positions]
+            bounds = np.cumsum([end - start for start, end in ranges])[:-1]
+            outputs.append(ExtractionResult(np.split(cells, bounds) if ranges else []))
+        return outputs
@@ -0,0 +1,458 @@
+import math
+from importlib import import_module
+
+import numpy as np
+
+from ..config import CacheConfig
+from .areas import get_boundingbox_area, get_polygon_area
+from .cache import LRUCache, shared_cache
+from .ranges import (
+    date_range,
+    integer_range,
+    parse_value,
+    step_range,
+    time_range,
+)
+
+# Bytes of a covjson coverage collection and of each of its coverages, of every
+# value and of every domain position, fitted to the output of covjsonkit
+COLLECTION_BYTES = 800
+COVERAGE_BYTES = 350
+VALUE_BYTES = 16
+POSITION_BYTES = 32
+
+# Pressure levels in hPa, used to expand levelist ranges of pressure level requests
+PRESSURE_LEVELS = (
+    1,
+    2,
+    3,
+    5,
+    7,
+    10,
+    20,
+    30,
+    50,
+    70,
+    100,
+    150,
+    200,
+    250,
+    300,
+    400,
+    500,
+    600,
+    700,
+    800,
+    850,
+    900,
+    925,
+    950,
+    1000,
+)
+
+# Features retrieving the nearest grid point of each of their points
+POINT_FEATURES = ("timeseries", "verticalprofile", "position")
+
+# Features sliced row by row, every other feature is read point by point
+ROW_FEATURES = ("boundingbox", "circle", "frame")
+
+# Grid models keyed on the grid type, resolution and local area
+grid_cache = LRUCache(maxsize=16)
+
+
+class GridModel:
+    """
+    Latitudes of the rows of a grid and their number of points.
+
+    The points of a row are evenly spaced in longitude from the west edge of the
+    grid, over 360 degrees for global grids and over the local area otherwise.
+    The exact longitudes of a row are given by row_longitudes when the grid is
+    built from a mapper.
+    """
+
+    def __init__(self, latitudes, row_points, west=0.0, width=360.0, row_longitudes=None):
+        latitudes = np.asarray(latitudes, dtype=float)
+        row_points = np.asarray(row_points, dtype=float)
+        order = np.argsort(latitudes)
+        self.latitudes = latitudes[order]
+        self.row_points = row_points[order]
+        self.cumulative_points = np.concatenate([[0.0], np.cumsum(self.row_points)])
+        self.west = west
+        self.width = width
+        self.row_longitudes = row_longitudes
+
+    @property
+    def points(self):
+        return int(self.cumulative_points[-1])
+
+    def max_spacing(self):
+        """
+        Find the largest distance between neighbouring points of the grid.
+
+        :return: The largest spacing between rows or between the points of a row, in degrees of arc.
+        """
+        row_gaps = np.diff(self.latitudes)
+        point_gaps = self.width / np.maximum(self.row_points, 1) * np.cos(np.radians(self.latitudes))
+        return float(max(row_gaps.max(initial=0.0), point_gaps.max(initial=0.0)))
+
+    def row_indices(self, south, north):
+        """
+        Find the rows of the grid between two latitudes.
+
+        :param south: The lower latitude.
+        :param north: The upper latitude.
+        :return: The index of the first row and one past the index of the last row,
+            in order of increasing latitude.
+        """
+        south, north = min(south, north), max(south, north)
+        return np.searchsorted(self.latitudes, south, "left"), np.searchsorted(self.latitudes, north, "right")
+
+    def rows(self, south, north):
+        """
+        Count the rows of the grid between two latitudes.
+
+        :param south: The lower latitude.
+        :param north: The upper latitude.
+        :return: The number of rows, including rows on the bounds.
+        """
+        first, last = self.row_indices(south, north)
+        return int(last - first)
+
+    def box_points(self, south, north, west, east):
+        """
+        Estimate the number of grid points in a latitude/longitude box.
+
+        :param south: The lower latitude.
+        :param north: The upper latitude.
+        :param west: The lower longitude, longitudes are not wrapped.
+        :param east: The upper longitude.
+        :return: The number of points, including points on the bounds.
+        """
+        first, last = self.row_indices(south, north)
+        row_points = self.cumulative_points[last] - self.cumulative_points[first]
+        width = min(abs(east - west), 360.0)
+        if self.width < 360.0:
+            west, east = min(west, east), max(west, east)
+            width = max(min(east, self.west + self.width) - max(west, self.west), 0.0)
+        if width >= self.width:
+            return float(row_points)
+        return float(row_points * width / self.width + (last - first))
+
+    def _longitudes(self, index):
+        if self.row_longitudes is not None:
+            return np.asarray(self.row_longitudes(self.latitudes[index]), dtype=float)
+        points = int(self.row_points[index])
+        if self.width < 360.0:
+            return self.west + self.width * np.arange(points) / max(points - 1, 1)
+        return self.west + self.width * np.arange(points) / points
+
+    def box_coordinates(self, south, north, west, east):
+        """
+        List the grid points in a latitude/longitude box.
+
+        Longitudes of global grids are shifted by multiples of 360 degrees into the
+        box, so they can be compared with shapes given in the same longitudes.
+
+        :param south: The lower latitude.
+        :param north: The upper latitude.
+        :param west: The lower longitude.
+        :param east: The upper longitude.
+        :return: Two arrays, the latitudes and longitudes of the points, including points on the bounds.
+        """
+        west, east = min(west, east), max(west, east)
+        first, last = self.row_indices(south, north)
+        lats, lons = [], []
+        for index in range(first, last):
+            longitudes = self._longitudes(index)
+            if self.width >= 360.0:
+                longitudes = longitudes + 360.0 * np.ceil((west - longitudes) / 360.0)
+                longitudes = np.concatenate(
+                    [longitudes + 360.0 * turn for turn in range(int((east - west) // 360.0) + 1)]
+                )
+            longitudes = longitudes[(longitudes >= west) & (longitudes <= east)]
+            lats.append(np.full(len(longitudes), self.latitudes[index]))
+            lons.append(longitudes)
+        if not lats:
+            return np.empty(0), np.empty(0)
+        return np.concatenate(lats), np.concatenate(lons)
+
+
+def _octahedral_rows(mapper):
+    n = mapper._resolution
+    half = 4 * np.arange(1, n + 1) + 16
+    return np.concatenate([half, half[::-1]])
+
+
+def _row_points(grid_type, mapper):
+    if grid_type == "octahedral":
+        return _octahedral_rows(mapper)
+    if grid_type == "regular":
+        return np.full(2 * mapper._resolution, 4 * mapper._resolution)
+    if grid_type in ("reduced_gaussian", "reduced_ll"):
+        return np.asarray(mapper.lon_spacing())
+    if grid_type in ("healpix", "healpix_nested"):
+        return np.array([mapper.HEALPix_nj(i) for i in range(4 * mapper._resolution - 1)])
+    if grid_type == "local_regular":
+        return np.full(mapper.first_resolution + 1, mapper.second_resolution + 1)
+    raise NotImplementedError(f"Cost estimation is not supported for '{grid_type}' grids")
+
+
+def _build_grid(mapper_config):
+    from polytope_feature.datacube.transformations.datacube_mappers.datacube_mappers import (
+        _type_to_datacube_mapper_lookup,
+    )
+
+    grid_type = mapper_config.type
+    mapper_type = _type_to_datacube_mapper_lookup.get(grid_type)
+    if mapper_type is None or mapper_type == "IrregularGridMapper":
+        raise NotImplementedError(f"Cost estimation is not supported for '{grid_type}' grids")
+    module = import_module(
+        "polytope_feature.datacube.transformations.datacube_mappers.mapper_types." + grid_type  # noqa: E501
+    )
+    mapper = getattr(module, mapper_type)(
+        "values",
+        mapper_config.axes,
+        mapper_config.resolution,
+        mapper_config.md5_hash,
+        mapper_config.local or [],
+        mapper_config.axis_reversed,
+        mapper_config,
+    )
+
+    latitudes = mapper.first_axis_vals()
+    row_points = _row_points(grid_type, mapper)
+    if grid_type == "local_regular":
+        return GridModel(
+            latitudes,
+            row_points,
+            mapper._second_axis_min,
+            mapper._second_axis_max - mapper._second_axis_min,
+            lambda latitude: mapper.second_axis_vals((latitude,)),
+        )
+    return GridModel(latitudes, row_points, row_longitudes=lambda latitude: mapper.second_axis_vals((latitude,)))
+
+
+def get_grid_model(options):
+    """
+    Return the model of the grid mapped by the Polytope options, built on first use.
+
+    :param options: The Polytope options of the PolytopeMars config.
+    :return: A GridModel of the grid of the values axis.
+    """
+    for axis_config in options.axis_config:
+        for transformation in axis_config.transformations:
+            if transformation.name == "mapper":
+                resolution = transformation.resolution
+                key = (
+                    transformation.type,
+                    tuple(resolution) if isinstance(resolution, list) else resolution,
+                    tuple(transformation.local or []),
+                )
+                return grid_cache.get_or_create(key, lambda: _build_grid(transformation))
+    raise ValueError("No grid mapper found in the Polytope options")
+
+
+def _count_range(key, start, end, by, request):
+    if key == "step":
+        return len(step_range(start, end, by))
+    if key == "levelist" and by is None and request.get("levtype") == "pl":
+        low, high = sorted((float(start), float(end)))
+        return max(sum(low <= level <= high for level in PRESSURE_LEVELS), 1)
+    if key == "date":
+        values = date_range(start, end, by)
+    elif key == "time":
+        # The interval of a time range is in HHMM, as when the range is expanded for extraction
+        values = time_range(start, end, by)
+    else:
+        values = integer_range(start, end, by)
+    # Ranges from the end to the start are counted alike
+    return abs(values.end - values.start) // values.by + 1
+
+
+def axis_length(key, value, request=None):
+    """
+    Count the values of a MARS request key.
+
+    :param key: The name of the key, e.g. "step".
+    :param value: The MARS value, a list separated by "/" or a start/to/end[/by/interval] range.
+    :param request: The request, used to expand pressure level ranges.
+    :return: The number of values.
+    """
+    value = parse_value(value)
+    if value.is_range:
+        return _count_range(key, value.start, value.end, value.by, request or {})
+    return len(value.elements)
+
+
+def axis_lengths(request):
+    """
+    Count the values of the non-spatial keys of a request, their product is the number of fields touched.
+
+    The range of a timeseries or vertical profile feature expands over the time
+    axis or level axis of the feature.
+
+    :param request: The request dictionary containing fields and feature dictionary.
+    :return: A dictionary with the number of values of every key with more than one value.
+    """
+    feature = request.get("feature", {})
+    lengths = {}
+    for key, value in request.items():
+        if key == "feature":
+            continue
+        length = axis_length(key, value, request)
+        if length > 1:
+            lengths[key] = length
+
+    if isinstance(feature.get("range"), dict) and "start" in feature["range"] and "end" in feature["range"]:
+        if feature["type"] == "timeseries":
+            key = feature.get("time_axis", "step")
+        else:
+            key = feature["axes"] if isinstance(feature.get("axes"), str) else "levelist"
+        value = f"{feature['range']['start']}/to/{feature['range']['end']}"
+        if "interval" in feature["range"]:
+            value += f"/by/{feature['range']['interval']}"
+        lengths[key] = axis_length(key, value, request)
+    return lengths
+
+
+def _lat_lon(points, axes):
+    points = np.asarray(points, dtype=float)
+    if axes is not None and "latitude" in axes and "longitude" in axes:
+        return points[:, axes.index("latitude")], points[:, axes.index("longitude")]
+    return points[:, 0], points[:, 1]
+
+
+def _polygon_points(grid, polygon, area_cache):
+    lats, lons = _lat_lon(polygon, None)
+    corners = [[lats.min(), lons.min()], [lats.max(), lons.max()]]
+    box_area = get_boundingbox_area(corners)
+    if box_area == 0:
+        return 0.0
+    box_points = grid.box_points(lats.min(), lats.max(), lons.min(), lons.max())
+    return box_points * min(get_polygon_area(polygon, area_cache) / box_area, 1.0)
+
+
+def _path_points(grid, points, axes, inflation, inflate):
+    lats, lons = _lat_lon(points, axes)
+    if axes is not None and "latitude" in axes and "longitude" in axes:
+        lat_radius, lon_radius = inflation[axes.index("latitude")], inflation[axes.index("longitude")]
+    else:
+        lat_radius, lon_radius = inflation[0], inflation[1]
+
+    # The path sweeps a tube of the inflation radius, closed by half shapes at both ends
+    lengths = np.hypot(np.diff(lats) / max(lat_radius, 1e-12), np.diff(lons) / max(lon_radius, 1e-12))
+    swept = 2 * lengths.sum() * lat_radius * lon_radius
+    ends = (math.pi if inflate == "round" else 4.0) * lat_radius * lon_radius
+
+    # Points per square degree at the mean latitude of the path
+    lat = float(lats.mean())
+    density = grid.box_points(lat - lat_radius, lat + lat_radius, 0, 360) / (2 * lat_radius * 360)
+    return (swept + ends) * density
+
+
+def _spatial_points(grid, feature, cache):
+    feature_type = feature["type"]
+    if feature_type in POINT_FEATURES:
+        return float(len(feature["points"]))
+    if feature_type == "boundingbox":
+        lats, lons = _lat_lon(feature["points"], feature.get("axes"))
+        return grid.box_points(lats[0], lats[1], lons[0], lons[1])
+    if feature_type == "polygon":
+        shape = feature["shape"]
+        polygons = shape if isinstance(shape[0][0], list) else [shape]
+        area_cache = shared_cache("areas", cache.area_cache_size)
+        return sum(_polygon_points(grid, polygon, area_cache) for polygon in polygons)
+    if feature_type == "circle":
+        lat, lon = feature["center"][0][0], feature["center"][0][1]
+        radius = feature["radius"]
+        return grid.box_points(lat - radius, lat + radius, lon - radius, lon + radius) * math.pi / 4
+    if feature_type == "trajectory":
+        axes = feature.get("axes", ["latitude", "longitude", "levelist", "step"])
+        inflation = feature["inflation"]
+        if not isinstance(inflation, list):
+            inflation = [inflation] * len(axes)
+        return _path_points(grid, feature["points"], axes, inflation, feature.get("inflate", "round"))
+    if feature_type == "frame":
+        (south, west), (north, east) = feature["outer_box"]
+        (inner_south, inner_west), (inner_north, inner_east) = feature["inner_box"]
+        outer = grid.box_points(south, north, west, east)
+        return max(outer - grid.box_points(inner_south, inner_north, inner_west, inner_east), 0.0)
+    if feature_type == "shapefile":
+        from ..features.shpfile import load_shapefile, select_geometries
+
+        data = load_shapefile(feature["file"], shared_cache("shapefiles", cache.shapefile_cache_size))
+        positions = select_geometries(data, feature.get("filter"), feature.get("contains"))
+        area_cache = shared_cache("areas", cache.area_cache_size)
+        return sum(
+            _polygon_points(grid, polygon, area_cache) for position in positions for polygon in data.polygons(position)
+        )
+    raise NotImplementedError(f"Feature '{feature_type}' not found")
+
+
+def _reads(grid, feature, values, fields):
+    if feature["type"] not in ROW_FEATURES:
+        return values
+    if feature["type"] == "circle":
+        lat, lon = feature["center"][0][0], feature["center"][0][1]
+        boxes = [
+            [[lat - feature["radius"], lon - feature["radius"]], [lat + feature["radius"], lon + feature["radius"]]]
+        ]
+    elif feature["type"] == "frame":
+        boxes = [feature["outer_box"]]
+    else:
+        lats, lons = _lat_lon(feature["points"], feature.get("axes"))
+        boxes = [[[lats[0], lons[0]], [lats[1], lons[1]]]]
+
+    reads = 0
+    for (south, west), (north, east) in boxes:
+        west, east = min(west, east), max(west, east)
+        # A row is read in two ranges when the box crosses the start of the grid rows
+        ranges = 1 if east - west >= 360 else 1 + min(math.floor(east / 360) - math.floor(west / 360), 1)
+        reads += grid.rows(south, north) * ranges
+    return reads * fields
+
+
+def estimate_cost(request, options, cache=None):
+    """
+    Estimate the work of a request from the grid of the datacube, without touching the datacube.
+
+    Spatial points are counted on the rows of the configured grid, scaled by the
+    area of the feature for shapes other than boxes. The number of GribJump
+    ranges assumes one range per row for features sliced row by row, boxes and
+    circles, and one range per point otherwise. The output bytes are a fit of the
+    covjson size, typically within 20% of the actual size.
+
+    :param request: The request dictionary containing fields and feature dictionary.
+    :param options: The Polytope options of the PolytopeMars config, holding the grid mapper.
+    :param cache: The CacheConfig sizing the area and shapefile caches used, the default sizes if not given.
+    :return: A dictionary with the number of spatial points, fields, values,
+        GribJump ranges and output bytes.
+    """
+    feature = request["feature"]
+    grid = get_grid_model(options)
+    lengths = axis_lengths(request)
+    fields = math.prod(lengths.values())
+    points = _spatial_points(grid, feature, cache if cache is not None else CacheConfig())
+    values = points * fields
+
+    params = lengths.get("param", 1)
+    if feature["type"] == "timeseries":
+        coverages = len(feature["points"]) * fields / params / lengths.get(feature.get("time_axis", "step"), 1)
+    elif feature["type"] == "verticalprofile":
+        level_axis = feature["axes"] if isinstance(feature.get("axes"), str) else "levelist"
+        coverages = len(feature["points"]) * fields / params / lengths.get(level_axis, 1)
+    elif feature["type"] == "position":
+        coverages = len(feature["points"]) * fields / params
+    else:
+        coverages = fields / params
+    output_bytes = (
+        COLLECTION_BYTES + coverages * COVERAGE_BYTES + values * VALUE_BYTES + values / params * POSITION_BYTES
+    )
+
+    return {
+        "points": int(round(points)),
+        "fields": fields,
+        "values": int(round(values)),
+        "reads": int(round(_reads(grid, feature, values, fields))),
+        "bytes": int(round(output_bytes)),
+    }
@@ -0,0 +1,247 @@
+import json
+
+import numpy as np
+
+
+def _metadata_key(coverage):
+    """
+    Build a hashable key from the mars metadata of a coverage.
+
+    :param coverage: A coverage dictionary from a CoverageCollection.
+    :return: The sorted metadata items, or the serialised metadata if a value is not hashable.
+    """
+    metadata = coverage["mars:metadata"]
+    try:
+        key = tuple(sorted(metadata.items()))
+        hash(key)
+        return key
+    except TypeError:
+        return json.dumps(metadata, sort_keys=True, default=str)
+
+
+def _same_domain(coverage1, coverage2):
+    axes1 = coverage1["domain"]["axes"]
+    axes2 = coverage2["domain"]["axes"]
+    # Point coverages of different points may share their metadata and times, so
+    # the latitude, longitude and levelist axes are compared along with t and composite.
+    # Trajectories carry their time in the composite axis rather than in a t axis
+    for axis in ("t", "latitude", "longitude", "levelist"):
+        if axes1.get(axis) != axes2.get(axis):
+            return False
+    return axes1.get("composite", {}).get("values") == axes2.get("composite", {}).get("values")
+
+
+def count_values(collection):
+    """
+    Count the values held in the ranges of a CoverageCollection.
+
+    :param collection: A CoverageCollection dictionary.
+    :return: The number of values over all coverages and parameters.
+    """
+    count = 0
+    for coverage in collection.get("coverages", []):
+        for param_range in coverage.get("ranges", {}).values():
+            count += len(param_range.get("values", []))
+    return count
+
+
+def merge_coverages(collections):
+    """
+    Merge a list of CoverageCollections into one in a single pass.
+
+    This gives the same result as folding covjsonkit's merge_coverage_collections
+    over the list, but indexes the coverages already merged by their mars metadata instead of comparing
+    every new coverage with all of them, so the cost grows linearly with the
+    number of collections. Unlike merge_coverage_collections, a point coverage only
+    gains the ranges of the coverage of the same point, so collections of several
+    points split by param merge back correctly. As with merge_coverage_collections,
+    coverages are not copied and may gain ranges from later collections.
+
+    :param collections: A list of CoverageCollection dictionaries, empty ones are skipped.
+    :return: The merged CoverageCollection, or an empty dictionary if there was nothing to merge.
+    """
+    merged = {}
+    index = {}
+
+    for collection in collections:
+        if not isinstance(collection, dict):
+            raise ValueError("Both collections must be dictionaries.")
+        if collection == {}:
+            continue
+
+        if merged == {}:
+            merged = collection.copy()
+            merged["parameters"] = dict(collection.get("parameters", {}))
+            merged["coverages"] = list(collection.get("coverages", []))
+            for coverage in merged["coverages"]:
+                index.setdefault(_metadata_key(coverage), []).append(coverage)
+            continue
+
+        if merged.get("type") != collection.get("type"):
+            raise ValueError("Both coverageJSONs must be CoverageCollections.")
+        if merged.get("domainType") != collection.get("domainType"):
+            raise ValueError("Both coverageJSONs must be have the same domainType.")
+
+        for parameter, value in collection.get("parameters", {}).items():
+            if parameter not in merged["parameters"]:
+                merged["parameters"][parameter] = value
+
+        for coverage in collection.get("coverages", []):
+            key = _metadata_key(coverage)
+            matched = False
+            for existing in index.get(key, []):
+                if not _same_domain(coverage, existing):
+                    continue
+                for param in coverage["ranges"].keys():
+                    if param not in existing["ranges"]:
+                        existing["ranges"][param] = coverage["ranges"][param]
+                        matched = True
+            if not matched:
+                merged["coverages"].append(coverage)
+                index.setdefault(key, []).append(coverage)
+
+    return merged
+
+
+def stitch_coverages(collections):
+    """
+    Join the CoverageCollections of the spatial tiles of a region into one.
+
+    Coverages of the tiles with the same mars metadata and times are joined into
+    one coverage whose composite domain and ranges hold the points of every tile,
+    in the order of the collections. The collections are not modified.
+
+    :param collections: A list of MultiPoint CoverageCollection dictionaries, empty ones are skipped.
+    :return: The stitched CoverageCollection, or an empty dictionary if there was nothing to stitch.
+    """
+    stitched = {}
+    index = {}
+
+    for collection in collections:
+        if not isinstance(collection, dict):
+            raise ValueError("Both collections must be dictionaries.")
+        if collection == {}:
+            continue
+        if stitched == {}:
+            stitched = dict(collection, parameters=dict(collection.get("parameters", {})), coverages=[])
+        elif stitched.get("domainType") != collection.get("domainType"):
+            raise ValueError("Both coverageJSONs must be have the same domainType.")
+
+        for parameter, value in collection.get("parameters", {}).items():
+            stitched["parameters"].setdefault(parameter, value)
+
+        for coverage in collection.get("coverages", []):
+            axes = coverage["domain"]["axes"]
+            key = (_metadata_key(coverage), json.dumps(axes.get("t"), default=str))
+            existing = index.get(key)
+            if existing is None:
+                # Copy the lists which are extended by later tiles
+                composite = dict(axes["composite"], values=list(axes["composite"]["values"]))
+                domain = dict(coverage["domain"], axes=dict(axes, composite=composite))
+                ranges = {param: dict(r, values=list(r["values"])) for param, r in coverage["ranges"].items()}
+                existing = dict(coverage, domain=domain, ranges=ranges)
+                stitched["coverages"].append(existing)
+                index[key] = existing
+                continue
+
+            existing["domain"]["axes"]["composite"]["values"].extend(axes["composite"]["values"])
+            for param, r in coverage["ranges"].items():
+                if param in existing["ranges"]:
+                    existing["ranges"][param]["values"].extend(r["values"])
+                else:
+                    existing["ranges"][param] = dict(r, values=list(r["values"]))
+                existing["ranges"][param]["shape"] = [len(existing["ranges"][param]["values"])]
+
+    return stitched
+
+
+def iter_coverage_collection_json(collections):
+    """
+    Serialise a stream of CoverageCollections as a single CoverageCollection, chunk by chunk.
+
+    The header is taken from the first non-empty collection and each coverage is
+    written out as soon as its collection arrives. Parameters are collected along
+    the way and written at the end. Unlike merge_coverages, coverages with the same
+    metadata and domain are not combined, so collections which need merging, e.g.
+    of sub-requests split by param, must be merged before they are streamed.
+
+    :param collections: An iterable of CoverageCollection dictionaries.
+    :return: A generator of JSON strings which together form one CoverageCollection.
+    """
+    header = None
+    parameters = {}
+    first = True
+
+    for collection in collections:
+        if collection == {}:
+            continue
+        if header is None:
+            header = {
+                key: value for key, value in collection.items() if key not in ("coverages", "parameters", "referencing")
+            }
+            referencing = collection.get("referencing", [])
+            prefix = json.dumps(header)[:-1]
+            yield prefix + (", " if header else "") + '"coverages": ['
+        elif header.get("domainType") != collection.get("domainType"):
+            raise ValueError("Both coverageJSONs must be have the same domainType.")
+
+        for parameter, value in collection.get("parameters", {}).items():
+            parameters.setdefault(parameter, value)
+
+        for coverage in collection.get("coverages", []):
+            yield json.dumps(coverage) if first else ", " + json.dumps(coverage)
+            first = False
+
+    if header is None:
+        yield "{}"
+        return
+
+    yield '], "referencing": ' + json.dumps(referencing) + ', "parameters": ' + json.dumps(parameters) + "}"
+
+
+def _coverage_position(coverage):
+    axes = coverage["domain"]["axes"]
+    return (axes["latitude"]["values"][0], axes["longitude"]["values"][0])
+
+
+def split_point_coverages(collection, points, max_distance=None):
+    """
+    Split a CoverageCollection of point coverages between the requests whose points were retrieved together.
+
+    Each requested point is assigned the coverages at the nearest position in the
+    collection, which is the grid point Polytope picked for it. A point farther than
+    max_distance from every position, e.g. one Polytope returned no data for, gets no
+    coverages rather than those of another point. Coverages keep the order they have
+    in the collection and are not copied, so requests sharing a point share its coverages.
+
+    :param collection: A CoverageCollection whose coverages have latitude and longitude axes.
+    :param points: A list holding the [latitude, longitude] points of each request.
+    :param max_distance: The largest distance in degrees of arc between a point and its
+        position, typically the grid spacing, positions are not limited if None.
+    :return: A list of CoverageCollections, one per entry of points.
+    """
+    header = {key: value for key, value in collection.items() if key != "coverages"}
+    coverages = collection.get("coverages", [])
+    if not coverages:
+        return [dict(header, coverages=[]) for _ in points]
+
+    positions = {}
+    position_index = []
+    for coverage in coverages:
+        position_index.append(positions.setdefault(_coverage_position(coverage), len(positions)))
+
+    # Nearest position on the sphere, comparing the cosines of the angular distances
+    position_lat, position_lon = np.radians(np.array(list(positions), dtype=float)).T
+    collections = []
+    for request_points in points:
+        lat, lon = np.radians(np.array(request_points, dtype=float).reshape(-1, 2)).T
+        cos_distance = np.sin(lat[:, None]) * np.sin(position_lat) + np.cos(lat[:, None]) * np.cos(
+            position_lat
+        ) * np.cos(lon[:, None] - position_lon)
+        nearest = np.argmax(cos_distance, axis=1)
+        if max_distance is not None:
+            within = cos_distance[np.arange(len(nearest)), nearest] >= np.cos(np.radians(max_distance))
+            nearest = nearest[within]
+        nearest = set(nearest.tolist())
+        collections.append(dict(header, coverages=[c for c, i in zip(coverages, position_index) if i in nearest]))
+    return collections
@@ -0,0 +1,94 @@
+import asyncio
+import copy
+import threading
+import weakref
+from concurrent.futures import Future
+
+
+class InFlightRequests:
+    """
+    Share one extraction between identical requests running at the same time.
+
+    The first caller of a key runs the extraction, callers arriving while it runs
+    wait for it and get a deep copy of its result, or its exception. Threads and
+    the coroutines of each event loop are tracked apart.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = weakref.WeakKeyDictionary()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+
+    def run(self, key, function):
+        """
+        Run a function unless an identical call is already running, then wait for its result.
+
+        :param key: A hashable key identifying the call, e.g. the hash of the canonical request.
+        :param function: A callable without arguments.
+        :return: The result and True if this caller ran the function, False if it shared
+            the result of another caller.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return copy.deepcopy(future.result()), False
+
+        try:
+            result = function()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def arun(self, key, function):
+        """
+        Await a coroutine function unless an identical call is already awaited in this event loop.
+
+        :param key: A hashable key identifying the call.
+        :param function: A coroutine function without arguments.
+        :return: The result and True if this caller awaited the function, False if it
+            shared the result of another caller.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.setdefault(loop, {})
+            future = calls.get(key)
+            leader = future is None
+            if leader:
+                future = loop.create_future()
+                calls[key] = future
+
+        if not leader:
+            # Shield the shared call, so a cancelled follower does not cancel the others
+            return copy.deepcopy(await asyncio.shield(future)), False
+
+        try:
+            result = await function()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when no follower awaits it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            with self._lock:
+                calls.pop(key, None)
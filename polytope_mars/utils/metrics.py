@@ -0,0 +1,199 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds of the duration histogram buckets kept by MetricsRegistry
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class ExtractMetrics:
+    """
+    Timings and counters of a single extraction.
+
+    Durations are in seconds and summed over the sub-requests of a split request,
+    so with parallel sub-requests they can add up to more than the total time.
+    Sub-requests retrieved in threads record into the same object, so all updates
+    go through a lock.
+    """
+
+    COUNTERS = ("subrequests", "shapes", "points")
+
+    def __init__(self):
+        self.durations = {}
+        self.subrequests = 0
+        self.shapes = 0
+        self.points = 0
+        self.output_bytes = None
+        self.cache_hits = {}
+        self._lock = threading.Lock()
+
+    def add_duration(self, stage, seconds):
+        """
+        Add time spent in a stage.
+
+        :param stage: The name of the stage, e.g. "polytope".
+        :param seconds: The time spent in seconds.
+        """
+        with self._lock:
+            self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Time the body of a with statement as a stage.
+
+        :param stage: The name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_duration(stage, time.perf_counter() - start)
+
+    def count(self, name, value=1):
+        """
+        Increment one of the counters listed in COUNTERS.
+
+        :param name: The name of the counter.
+        :param value: The amount to add.
+        """
+        if name not in self.COUNTERS:
+            raise KeyError(f"Unknown metrics counter '{name}'")
+        with self._lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def hit(self, cache, value=1):
+        """
+        Count cache hits.
+
+        :param cache: The name of the cache, e.g. "shapes".
+        :param value: The number of hits.
+        """
+        with self._lock:
+            self.cache_hits[cache] = self.cache_hits.get(cache, 0) + value
+
+    def update(self, other):
+        """
+        Add the durations and counters of another record, e.g. one sent back by a worker process.
+
+        :param other: An ExtractMetrics or a dictionary as returned by as_dict.
+        """
+        if isinstance(other, ExtractMetrics):
+            other = other.as_dict()
+        for stage, seconds in other.get("durations", {}).items():
+            self.add_duration(stage, seconds)
+        for name in self.COUNTERS:
+            self.count(name, other.get(name, 0))
+        for cache, hits in other.get("cache_hits", {}).items():
+            self.hit(cache, hits)
+
+    def as_dict(self):
+        """
+        Return the metrics as plain python types.
+
+        :return: A dictionary with the durations, counters, output bytes and cache hits.
+        """
+        with self._lock:
+            metrics = {"durations": dict(self.durations)}
+            for name in self.COUNTERS:
+                metrics[name] = getattr(self, name)
+            metrics["output_bytes"] = self.output_bytes
+            metrics["cache_hits"] = dict(self.cache_hits)
+        return metrics
+
+    def __repr__(self):
+        return f"ExtractMetrics({self.as_dict()})"
+
+
+class MetricsRegistry:
+    """
+    Aggregates ExtractMetrics into Prometheus-style counters and histograms.
+
+    A registry is itself a valid metrics hook, so it can be passed to PolytopeMars
+    as metrics_hook. The aggregated values are available with collect or in the
+    Prometheus text exposition format with render.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix="polytope_mars"):
+        self.buckets = tuple(sorted(buckets))
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def __call__(self, metrics):
+        self.observe(metrics)
+
+    def _observe_duration(self, stage, seconds):
+        histogram = self._histograms.setdefault(stage, {"buckets": [0] * len(self.buckets), "count": 0, "sum": 0.0})
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                histogram["buckets"][i] += 1
+        histogram["count"] += 1
+        histogram["sum"] += seconds
+
+    def _increment(self, name, value, labels=()):
+        key = (name, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, metrics):
+        """
+        Add the metrics of one extraction.
+
+        :param metrics: An ExtractMetrics or a dictionary as returned by ExtractMetrics.as_dict.
+        """
+        if isinstance(metrics, ExtractMetrics):
+            metrics = metrics.as_dict()
+        with self._lock:
+            for stage, seconds in metrics.get("durations", {}).items():
+                self._observe_duration(stage, seconds)
+            self._increment("extractions", 1)
+            for name in ExtractMetrics.COUNTERS:
+                self._increment(name, metrics.get(name, 0))
+            if metrics.get("output_bytes") is not None:
+                self._increment("output_bytes", metrics["output_bytes"])
+            for cache, hits in metrics.get("cache_hits", {}).items():
+                self._increment("cache_hits", hits, (("cache", cache),))
+
+    def collect(self):
+        """
+        Return a snapshot of the aggregated metrics.
+
+        :return: A dictionary with the duration histograms per stage, keyed on the stage,
+            and the counter totals, keyed on the counter name and its labels.
+        """
+        with self._lock:
+            histograms = {
+                stage: {"buckets": dict(zip(self.buckets, h["buckets"])), "count": h["count"], "sum": h["sum"]}
+                for stage, h in self._histograms.items()
+            }
+            return {"histograms": histograms, "counters": dict(self._counters)}
+
+    def render(self):
+        """
+        Render the aggregated metrics in the Prometheus text exposition format.
+
+        :return: The metrics as a string.
+        """
+        snapshot = self.collect()
+        lines = []
+
+        name = f"{self.prefix}_stage_duration_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stage, histogram in sorted(snapshot["histograms"].items()):
+            for bound, count in histogram["buckets"].items():
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram["count"]}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {histogram["sum"]}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {histogram["count"]}')
+
+        typed = set()
+        for (counter, labels), value in sorted(snapshot["counters"].items()):
+            name = f"{self.prefix}_{counter}_total"
+            if name not in typed:
+                lines.append(f"# TYPE {name} counter")
+                typed.add(name)
+            label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+            lines.append(f"{name}{{{label_text}}} {value}" if labels else f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
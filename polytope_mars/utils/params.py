@@ -0,0 +1,64 @@
+import threading
+
+from covjsonkit.param_db import get_param_ids
+
+from ..config import CovjsonKitConfig
+
+
+class ParamResolver:
+    """
+    Resolve parameter short names to parameter ids using a covjsonkit param database.
+
+    The database is only read the first time a name has to be resolved, and one
+    resolver is shared by every PolytopeMars instance using the same param_db.
+    """
+
+    def __init__(self, param_db):
+        self.param_db = param_db
+        self._ids = None
+        self._lock = threading.Lock()
+
+    @property
+    def ids(self):
+        """
+        The param name -> id table, loaded on first use.
+        """
+        if self._ids is None:
+            with self._lock:
+                if self._ids is None:
+                    self._ids = get_param_ids(CovjsonKitConfig(param_db=self.param_db))
+        return self._ids
+
+    def resolve(self, params):
+        """
+        Resolve a list of parameters to ids.
+
+        Values which are already ids, and the MARS keyword ALL, are returned unchanged.
+
+        :param params: A list of parameter short names or ids, e.g. ["2t", "165"].
+        :return: The list of parameter ids as strings, e.g. ["167", "165"].
+        """
+        if all(param.isdigit() or param == "ALL" for param in params):
+            return list(params)
+        ids = self.ids
+        try:
+            return [param if param.isdigit() or param == "ALL" else ids[param] for param in params]
+        except KeyError as e:
+            raise KeyError(f"Parameter {e} not found in param database '{self.param_db}'")
+
+
+_resolvers = {}
+_resolvers_lock = threading.Lock()
+
+
+def param_resolver(param_db):
+    """
+    Return the shared ParamResolver of a param database.
+
+    :param param_db: The name of the covjsonkit param database, e.g. "ecmwf".
+    :return: The ParamResolver for this database.
+    """
+    with _resolvers_lock:
+        if param_db not in _resolvers:
+            _resolvers[param_db] = ParamResolver(param_db)
+        return _resolvers[param_db]
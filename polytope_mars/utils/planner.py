@@ -0,0 +1,158 @@
+import math
+from itertools import product
+
+from .cost import PRESSURE_LEVELS, axis_length
+from .ranges import date_range, format_date, integer_range, parse_value
+
+# Request keys split by the planner, in the order they are split
+SPLIT_AXES = ("date", "number", "step", "param", "levelist")
+
+# Request keys whose sub-requests give parts of the same coverages, their parameters and levels.
+# Steps outside the domain of a feature, like dates and members, give coverages of their own
+MERGED_AXES = ("param", "levelist")
+
+
+def _groups(elements, parts):
+    # Contiguous groups of elements whose sizes differ by at most one
+    parts = max(min(parts, len(elements)), 1)
+    size, extra = divmod(len(elements), parts)
+    groups = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(elements[start:end])
+        start = end
+    return groups
+
+
+def _split_date_range(start, end, parts):
+    try:
+        days = date_range(start, end)
+    except ValueError:
+        return None
+    if len(days) == 0:
+        return None
+    values = []
+    # The groups are slices of a python range, so no day is expanded
+    for group in _groups(days.numbers(), parts):
+        lower, upper = format_date(group[0]), format_date(group[-1])
+        values.append(lower if lower == upper else f"{lower}/to/{upper}")
+    return values
+
+
+def _split_int_range(key, start, end, parts, request):
+    try:
+        numbers = integer_range(start, end)
+    except ValueError:
+        return None
+    if len(numbers) == 0:
+        return None
+    start, end = numbers.start, numbers.end
+    if key == "levelist" and request.get("levtype") == "pl":
+        elements = [level for level in PRESSURE_LEVELS if start <= level <= end]
+    else:
+        elements = numbers.numbers()
+    groups = _groups(elements, parts)
+    if len(groups) <= 1:
+        return None
+
+    # The sub-ranges cover the whole range, so values missing from elements are still retrieved
+    lowers = [start] + [group[0] for group in groups[1:]]
+    uppers = [lower - 1 for lower in lowers[1:]] + [end]
+    return [str(lower) if lower == upper else f"{lower}/to/{upper}" for lower, upper in zip(lowers, uppers)]
+
+
+def split_value(key, value, parts, request=None):
+    """
+    Split a MARS value into contiguous values holding roughly the same number of elements.
+
+    Lists are split into shorter lists, and start/to/end ranges of dates or integers
+    into shorter ranges covering the whole range. Ranges with a by interval and
+    values which are not dates or integers are not split.
+
+    :param key: The name of the key, e.g. "step".
+    :param value: The MARS value.
+    :param parts: The number of values wanted, fewer are returned if there are not enough elements.
+    :param request: The request, used to split pressure level ranges on the pressure levels.
+    :return: A list of MARS values, the value itself if it cannot be split.
+    """
+    parsed = parse_value(value)
+    if parsed.is_range and parsed.by is None:
+        if key == "date":
+            split = _split_date_range(parsed.start, parsed.end, parts)
+        else:
+            split = _split_int_range(key, parsed.start, parsed.end, parts, request or {})
+    elif parsed.is_range or "to" in parsed.elements or "by" in parsed.elements or "ALL" in parsed.elements:
+        split = None
+    else:
+        split = ["/".join(group) for group in _groups(parsed.elements, parts)]
+    if not split or len(split) == 1:
+        return [str(value)]
+    return split
+
+
+def request_values(request, points):
+    """
+    Estimate the number of values of a parsed request.
+
+    :param request: The parsed request dictionary, without its feature.
+    :param points: The estimated number of spatial points of the feature.
+    :return: The number of points times the number of fields of the request.
+    """
+    return points * math.prod(axis_length(key, value, request) for key, value in request.items())
+
+
+def plan_subrequests(request, points, target, fixed_axes=()):
+    """
+    Split a parsed request into sub-requests of roughly equal estimated cost below a target.
+
+    The request is split along date, number, step, param and levelist in that order,
+    each axis into as many parts as are needed for the sub-requests to fit in the
+    target, until they fit. Axes making up the domain of the coverages, e.g. the
+    time axis of a timeseries, are not split, as their coverages could not be merged.
+
+    :param request: The parsed request dictionary, without its feature.
+    :param points: The estimated number of spatial points of the feature.
+    :param target: The target number of values of a sub-request.
+    :param fixed_axes: Request keys which must not be split.
+    :return: A list of request dictionaries in the order they should be merged, the
+        request alone if it fits in the target or cannot be split.
+    """
+    cost = request_values(request, points)
+    splits = {}
+    for key in SPLIT_AXES:
+        if cost <= target:
+            break
+        if key not in request or key in fixed_axes:
+            continue
+        values = split_value(key, request[key], math.ceil(cost / target), request)
+        if len(values) > 1:
+            splits[key] = values
+            length = axis_length(key, request[key], request)
+            cost = cost * max(axis_length(key, value, request) for value in values) / length
+
+    return [dict(request, **dict(zip(splits, combination))) for combination in product(*splits.values())]
+
+
+def group_subrequests(subrequests):
+    """
+    Group consecutive sub-requests which only differ along the axes of MERGED_AXES.
+
+    The coverages of the sub-requests of a group must be merged to give those of the
+    whole request, while coverages of different groups, e.g. of different dates,
+    ensemble members or steps, are never merged. As plan_subrequests splits these axes last,
+    the sub-requests of a group follow each other.
+
+    :param subrequests: The list of request dictionaries returned by plan_subrequests.
+    :return: A list with the number of sub-requests of each group, in order.
+    """
+    sizes = []
+    previous = None
+    for subrequest in subrequests:
+        key = {k: v for k, v in subrequest.items() if k not in MERGED_AXES}
+        if sizes and key == previous:
+            sizes[-1] += 1
+        else:
+            sizes.append(1)
+        previous = key
+    return sizes
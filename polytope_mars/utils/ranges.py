@@ -0,0 +1,180 @@
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from typing import NamedTuple, Optional, Tuple
+
+# Seconds of the units of MARS steps, plain numbers are hours
+STEP_UNITS = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+
+_STEP_PART = re.compile(r"(\d+)([dhms])")
+
+
+class MarsValue(NamedTuple):
+    """
+    A MARS value split into its elements, with the bounds of a start/to/end[/by/interval] range.
+    """
+
+    elements: Tuple[str, ...]
+    start: Optional[str] = None
+    end: Optional[str] = None
+    by: Optional[str] = None
+
+    @property
+    def is_range(self):
+        return self.start is not None
+
+
+@lru_cache(maxsize=4096)
+def _parse_value(value):
+    elements = tuple(value.split("/"))
+    if len(elements) in (3, 5) and elements[1] == "to" and (len(elements) == 3 or elements[3] == "by"):
+        return MarsValue(elements, elements[0], elements[2], elements[4] if len(elements) == 5 else None)
+    return MarsValue(elements)
+
+
+def parse_value(value):
+    """
+    Parse a MARS value, a list separated by "/" or a start/to/end[/by/interval] range.
+
+    Parsed values are cached, so the same strings found in every request are only split once.
+
+    :param value: The MARS value, e.g. "0/to/240/by/6".
+    :return: A MarsValue, whose bounds are None for a list.
+    """
+    return _parse_value(str(value))
+
+
+class ValueRange:
+    """
+    An inclusive range of MARS values from start to end every by, expanded lazily.
+
+    The bounds are integers in the unit of the values, e.g. days for dates or
+    seconds for steps, so the range is counted without expanding it. format turns
+    the integers back into MARS values when it is iterated.
+    """
+
+    __slots__ = ("start", "end", "by", "format")
+
+    def __init__(self, start, end, by=1, format=str):
+        if by <= 0:
+            raise ValueError(f"The interval of a range must be positive, got {by}")
+        self.start = start
+        self.end = end
+        self.by = by
+        self.format = format
+
+    def numbers(self):
+        """
+        Return the integers of the range.
+
+        :return: A python range, which is itself lazy and can be sliced.
+        """
+        return range(self.start, self.end + 1, self.by)
+
+    def __len__(self):
+        return max((self.end - self.start) // self.by + 1, 0)
+
+    def __iter__(self):
+        return map(self.format, self.numbers())
+
+    def __getitem__(self, index):
+        return self.format(self.numbers()[index])
+
+    def __repr__(self):
+        return f"ValueRange({self.start}, {self.end}, {self.by})"
+
+
+def integer_range(start, end, by=None):
+    """
+    Build the range of a start/to/end[/by/interval] value of integers, e.g. numbers or levels.
+
+    :return: A ValueRange of integers, formatted as strings without leading zeros.
+    """
+    return ValueRange(int(start), int(end), int(by or 1))
+
+
+def date_ordinal(value):
+    """
+    Convert a date in the format YYYYMMDD or YYYY-MM-DD to its proleptic Gregorian ordinal.
+    """
+    return datetime.strptime(str(value).replace("-", ""), "%Y%m%d").toordinal()
+
+
+def format_date(ordinal):
+    return date.fromordinal(ordinal).strftime("%Y%m%d")
+
+
+def date_range(start, end, by=None):
+    """
+    Build the range of a start/to/end[/by/days] value of dates.
+
+    :return: A ValueRange of days, formatted as YYYYMMDD.
+    """
+    return ValueRange(date_ordinal(start), date_ordinal(end), int(by or 1), format_date)
+
+
+def time_minutes(value):
+    """
+    Convert a MARS time, HHMM, H, HH:MM or HH:MM:SS, to minutes since midnight.
+
+    As in time_step_to_freq, a time step such as "0130" is 90 minutes.
+    """
+    value = str(value).replace(":", "")
+    if len(value) == 6:
+        value = value[:4]
+    if not value.isdigit():
+        raise ValueError(f"Invalid time {value}")
+    value = value.zfill(4)
+    return int(value[:-2]) * 60 + int(value[-2:])
+
+
+def format_time(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def time_range(start, end, by=None):
+    """
+    Build the range of a start/to/end[/by/HHMM] value of times, every hour if by is not given.
+
+    :return: A ValueRange of minutes, formatted as HH:MM:SS.
+    """
+    return ValueRange(time_minutes(start), time_minutes(end), time_minutes(by) if by else 60, format_time)
+
+
+def step_seconds(value):
+    """
+    Convert a MARS step to seconds, e.g. "6", "30m", "1h30m" or "1d12h".
+
+    Plain numbers are hours.
+    """
+    value = str(value)
+    if value.isdigit():
+        return int(value) * STEP_UNITS["h"]
+    parts = _STEP_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        raise ValueError(f"Invalid step {value}")
+    return sum(int(number) * STEP_UNITS[unit] for number, unit in parts)
+
+
+def format_hours(seconds):
+    return str(seconds // STEP_UNITS["h"])
+
+
+def format_subhourly_step(seconds):
+    return f"{seconds // 3600}h{(seconds % 3600) // 60}m"
+
+
+def step_range(start, end, by=None):
+    """
+    Build the range of a start/to/end[/by/interval] value of steps, every hour if by is not given.
+
+    :return: A ValueRange of seconds, formatted as hours if all bounds are plain
+        numbers, else in the XhYm format of sub-hourly steps.
+    """
+    hours = all(str(bound).isdigit() for bound in (start, end, by) if bound is not None)
+    return ValueRange(
+        step_seconds(start),
+        step_seconds(end),
+        step_seconds(by) if by else STEP_UNITS["h"],
+        format_hours if hours else format_subhourly_step,
+    )
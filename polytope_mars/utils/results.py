@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from .cache import LRUCache
+
+
+def is_relative(request):
+    """
+    Check if a request depends on the current day, through relative dates such as "-1".
+
+    :param request: The request as a python dictionary.
+    :return: True if the request has a relative date.
+    """
+    return any(str(request.get(key, "")).lstrip().startswith("-") for key in ("date", "hdate"))
+
+
+def time_to_live(request, config):
+    """
+    Find how long the result of a request is kept.
+
+    :param request: The request as a python dictionary.
+    :param config: The ResultCacheConfig of the PolytopeMars config.
+    :return: The time to live in seconds of the dataset of the request if configured,
+        else of its stream, else the default, 0 if it must not be cached.
+    """
+    if is_relative(request):
+        return 0.0
+    for key in ("dataset", "stream"):
+        if key in request and str(request[key]) in config.ttl:
+            return config.ttl[str(request[key])]
+    return config.default_ttl
+
+
+class MemoryResultStore:
+    """
+    Serialised coverages kept in memory, evicting the least recently used ones.
+    """
+
+    def __init__(self, maxsize):
+        self._cache = LRUCache(maxsize=maxsize)
+
+    def get(self, key):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.time():
+            self._cache.pop(key)
+            return None
+        return value
+
+    def put(self, key, value, expires):
+        self._cache.put(key, (expires, value))
+
+    def resize(self, maxsize):
+        self._cache.resize(maxsize)
+
+    def clear(self):
+        self._cache.clear()
+
+    def __len__(self):
+        return len(self._cache)
+
+
+class DiskResultStore:
+    """
+    Serialised coverages kept in a sqlite database, evicting the least recently used ones.
+
+    The database can be shared by several processes, each connection is only used by
+    the thread which opened it.
+    """
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, expires REAL, used REAL, value BLOB)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS results_used ON results (used)")
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute("SELECT expires, value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[0] <= now:
+                connection.execute("DELETE FROM results WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE results SET used = ? WHERE key = ?", (now, key))
+        return row[1].decode() if isinstance(row[1], bytes) else row[1]
+
+    def put(self, key, value, expires):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO results (key, expires, used, value) VALUES (?, ?, ?, ?)",
+                (key, expires, now, value.encode()),
+            )
+            connection.execute("DELETE FROM results WHERE expires <= ?", (now,))
+            connection.execute(
+                "DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used DESC LIMIT ?)",
+                (max(self.maxsize, 0),),
+            )
+
+    def resize(self, maxsize):
+        self.maxsize = maxsize
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute("DELETE FROM results")
+
+    def __len__(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Coverages of whole extractions keyed by the hash of their canonical request.
+
+    Coverages are stored as JSON, so every hit returns a new copy, until their time
+    to live is over.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key):
+        """
+        Look up the coverage of a request.
+
+        :param key: The hash of the request returned by canonical.request_hash.
+        :return: A copy of the cached coverage, or None.
+        """
+        value = self.store.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key, coverage, ttl):
+        """
+        Store the coverage of a request.
+
+        :param key: The hash of the request returned by canonical.request_hash.
+        :param coverage: The CoverageCollection extracted for the request.
+        :param ttl: The time to live in seconds, nothing is stored if it is not positive.
+        """
+        if ttl <= 0:
+            return
+        self.store.put(key, json.dumps(coverage), time.time() + ttl)
+        with self._lock:
+            self.stores += 1
+
+    def clear(self):
+        """
+        Remove all results and reset the counters.
+        """
+        self.store.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.stores = 0
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        :return: A dictionary with the hits, misses, stores and current size of the cache.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "stores": self.stores, "size": len(self.store)}
+
+
+# Result caches shared by the PolytopeMars instances of the process, per backend and path
+_result_caches = {}
+_result_caches_lock = threading.Lock()
+
+
+def get_result_cache(config):
+    """
+    Return the result cache of a configuration, shared with the instances configured alike.
+
+    :param config: The ResultCacheConfig of the PolytopeMars config.
+    :return: A ResultCache, or None if the backend is "off".
+    """
+    if config.backend == "off":
+        return None
+    key = (config.backend, os.path.abspath(config.path) if config.backend == "disk" else None)
+    with _result_caches_lock:
+        cache = _result_caches.get(key)
+        if cache is None:
+            if config.backend == "disk":
+                store = DiskResultStore(config.path, config.max_entries)
+            else:
+                store = MemoryResultStore(config.max_entries)
+            cache = ResultCache(store)
+            _result_caches[key] = cache
+        cache.store.resize(config.max_entries)
+    return cache
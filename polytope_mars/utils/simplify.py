@@ -0,0 +1,106 @@
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+
+def grid_spacing(grid, south, north, west, east):
+    """
+    Find the smallest distance between two neighbouring grid points in a box.
+
+    :param grid: The GridModel of the datacube.
+    :param south: The lower latitude of the box.
+    :param north: The upper latitude of the box.
+    :param west: The lower longitude of the box.
+    :param east: The upper longitude of the box.
+    :return: The smallest latitude or longitude spacing in degrees, 0 if the box holds no row.
+    """
+    first, last = grid.row_indices(south, north)
+    first, last = max(first - 1, 0), min(last + 1, len(grid.latitudes))
+    if last - first < 2:
+        return 0.0
+    rows = grid.latitudes[first:last]
+    lon_spacing = grid.width / np.max(grid.row_points[first:last])
+    return float(min(np.min(np.diff(rows)), lon_spacing))
+
+
+def _chord_distances(coords, start, end):
+    # Distances of the vertices strictly between start and end to the chord joining them
+    chord = coords[end] - coords[start]
+    offsets = coords[start + 1 : end] - coords[start]  # noqa: E203
+    length = np.hypot(*chord)
+    if length == 0:
+        return np.hypot(offsets[:, 0], offsets[:, 1])
+    return np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+
+
+def _simplify_ring(coords, tolerance, tree):
+    # Greedily stretch each chord over as many vertices as possible. A chord from start
+    # to end replaces the chain between them, and the region swept between the two is
+    # covered by the fan of triangles (start, k, k + 1). Each chord is only stretched
+    # while no fan triangle holds a grid point, so no grid point changes side.
+    keep = [0]
+    start = 0
+    while start < len(coords) - 1:
+        end = start + 1
+        while end + 1 < len(coords):
+            candidate = end + 1
+            if np.max(_chord_distances(coords, start, candidate)) > tolerance:
+                break
+            triangle = Polygon([coords[start], coords[end], coords[candidate]])
+            if len(tree.query(triangle, predicate="intersects")):
+                break
+            end = candidate
+        keep.append(end)
+        start = end
+    return coords[keep]
+
+
+def simplify_polygon(points, grid, tolerance, lat_index=0):
+    """
+    Simplify a polygon without changing the grid points it selects.
+
+    Vertices are removed as long as the boundary moves by less than a fraction of
+    the grid spacing around the polygon and sweeps over no grid point. The grid
+    points in the bounding box of the polygon are then tested against the original
+    and the simplified polygon, which is only returned if both select the same
+    points and it is still a valid polygon.
+
+    :param points: The vertices of the polygon, the first vertex repeated at the end.
+    :param grid: The GridModel of the datacube.
+    :param tolerance: The tolerance as a fraction of the grid spacing.
+    :param lat_index: The position of the latitude in the vertices.
+    :return: The vertices of the simplified polygon, or points itself.
+    """
+    coords = np.asarray(points, dtype=float)[:, :2]
+    if lat_index == 1:
+        coords = coords[:, ::-1]
+    if len(coords) <= 4 or not np.array_equal(coords[0], coords[-1]):
+        return points
+    polygon = Polygon(coords)
+    if not polygon.is_valid:
+        return points
+
+    south, west, north, east = polygon.bounds
+    tolerance = tolerance * grid_spacing(grid, south, north, west, east)
+    if tolerance <= 0:
+        return points
+
+    lats, lons = grid.box_coordinates(south, north, west, east)
+    grid_points = shapely.points(lats, lons)
+    simplified = _simplify_ring(coords, tolerance, shapely.STRtree(grid_points))
+    if len(simplified) < 4 or len(simplified) >= len(coords):
+        return points
+    simplified = Polygon(simplified)
+    if not simplified.is_valid:
+        return points
+
+    # Check every grid point around the polygon rather than trusting the construction
+    shapely.prepare(polygon)
+    shapely.prepare(simplified)
+    if not np.array_equal(shapely.intersects_xy(polygon, lats, lons), shapely.intersects_xy(simplified, lats, lons)):
+        return points
+
+    vertices = np.asarray(simplified.exterior.coords)
+    if lat_index == 1:
+        vertices = vertices[:, ::-1]
+    return vertices.tolist()
@@ -0,0 +1,114 @@
+import copy
+import math
+
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+
+# Features cut into tiles, the other features are always retrieved whole
+TILED_FEATURES = ("boundingbox", "polygon")
+
+
+def band_edges(grid, south, north, west, east, tile_points, max_tiles):
+    """
+    Cut the rows of a grid between two latitudes into bands of roughly equal numbers of points.
+
+    The edges between bands lie halfway between two rows of the grid, so no grid
+    point is on the edge of a band and every point falls in exactly one band.
+
+    :param grid: The GridModel of the datacube.
+    :param south: The lower latitude of the region.
+    :param north: The upper latitude of the region.
+    :param west: The lower longitude of the region.
+    :param east: The upper longitude of the region.
+    :param tile_points: The target number of points of a band.
+    :param max_tiles: The maximum number of bands.
+    :return: The latitudes of the edges from south to north, including south and
+        north, or an empty list if the region fits in a single band.
+    """
+    south, north = min(south, north), max(south, north)
+    points = grid.box_points(south, north, west, east)
+    first, last = grid.row_indices(south, north)
+    tiles = min(math.ceil(points / tile_points), max_tiles, last - first)
+    if tiles <= 1:
+        return []
+
+    # Split the cumulative points of the rows in the region in equal shares
+    cumulative = grid.cumulative_points[first:] - grid.cumulative_points[first]
+    cumulative = cumulative[: last - first + 1]
+    targets = cumulative[-1] * np.arange(1, tiles) / tiles
+    splits = np.unique(np.clip(np.searchsorted(cumulative, targets), 1, last - first - 1))
+    rows = grid.latitudes[first:last]
+    edges = (rows[splits - 1] + rows[splits]) / 2
+    return [south] + [float(edge) for edge in edges] + [north]
+
+
+def _polygon_pieces(geometry):
+    if isinstance(geometry, Polygon):
+        geometries = [geometry]
+    else:
+        geometries = getattr(geometry, "geoms", [])
+    pieces = []
+    for piece in geometries:
+        if isinstance(piece, Polygon) and piece.area > 0:
+            pieces.append([list(point) for point in piece.exterior.coords])
+        elif hasattr(piece, "geoms"):
+            pieces.extend(_polygon_pieces(piece))
+    return pieces
+
+
+def tile_feature(feature_type, feature, grid, tile_points, max_tiles=64):
+    """
+    Cut a bounding box or polygon feature into latitude bands.
+
+    Longitudes are never cut, so boxes and polygons crossing the edge of the cyclic
+    longitude axis keep being extracted as configured. Each band is a copy of the
+    feature, a box over the band or the pieces of the polygons within the band.
+
+    :param feature_type: The type of the feature, only "boundingbox" and "polygon" are tiled.
+    :param feature: The feature object.
+    :param grid: The GridModel of the datacube.
+    :param tile_points: The target number of grid points of a tile.
+    :param max_tiles: The maximum number of tiles.
+    :return: A list of features from south to north, the feature alone if it is not tiled.
+    """
+    if feature_type not in TILED_FEATURES or tile_points <= 0:
+        return [feature]
+    if feature_type == "boundingbox" and len(feature.points[0]) != 2:
+        return [feature]
+
+    lat_index = feature.axes.index("latitude")
+    lon_index = feature.axes.index("longitude")
+    if feature_type == "boundingbox":
+        coordinates = np.asarray(feature.points, dtype=float)
+    else:
+        coordinates = np.concatenate([np.asarray(polygon, dtype=float)[:, :2] for polygon in feature.shape])
+    south, north = coordinates[:, lat_index].min(), coordinates[:, lat_index].max()
+    west, east = coordinates[:, lon_index].min(), coordinates[:, lon_index].max()
+
+    edges = band_edges(grid, south, north, west, east, tile_points, max_tiles)
+    if not edges:
+        return [feature]
+
+    tiles = []
+    if feature_type == "boundingbox":
+        for lower, upper in zip(edges[:-1], edges[1:]):
+            tile = copy.copy(feature)
+            tile.points = [list(point) for point in feature.points]
+            tile.points[0][lat_index], tile.points[1][lat_index] = lower, upper
+            tiles.append(tile)
+        return tiles
+
+    polygons = [Polygon(np.asarray(polygon, dtype=float)[:, :2]) for polygon in feature.shape]
+    polygons = [polygon if polygon.is_valid else shapely.make_valid(polygon) for polygon in polygons]
+    for lower, upper in zip(edges[:-1], edges[1:]):
+        bounds = [west - 1, west - 1, east + 1, east + 1]
+        bounds[lat_index], bounds[lat_index + 2] = lower, upper
+        pieces = []
+        for polygon in polygons:
+            pieces.extend(_polygon_pieces(shapely.clip_by_rect(polygon, *bounds)))
+        if pieces:
+            tile = copy.copy(feature)
+            tile.shape = pieces
+            tiles.append(tile)
+    return tiles
@@ -0,0 +1,58 @@
+def _visible_children(node):
+    return [child for child in node.children if not child.hidden]
+
+
+def summarise_tree(tree):
+    """
+    Summarise a Polytope result tree without formatting it.
+
+    :param tree: The TensorIndexTree returned by Polytope.retrieve.
+    :return: A dictionary with the number of nodes per axis, the number of leaves
+        and the number of values held by the leaves.
+    """
+    nodes = {}
+    leaves = 0
+    values = 0
+
+    stack = _visible_children(tree)
+    while stack:
+        node = stack.pop()
+        nodes[node.axis.name] = nodes.get(node.axis.name, 0) + 1
+        children = _visible_children(node)
+        if children:
+            stack.extend(children)
+        else:
+            leaves += 1
+            values += len(node.values)
+
+    return {"nodes": nodes, "leaves": leaves, "values": values}
+
+
+def format_tree(tree, max_lines=1000):
+    """
+    Format a Polytope result tree in the layout of TensorIndexTree.pprint, up to a number of lines.
+
+    :param tree: The TensorIndexTree returned by Polytope.retrieve.
+    :param max_lines: The maximum number of lines, the nodes left out are counted on a final line.
+    :return: The formatted tree as a string.
+    """
+    lines = []
+    skipped = 0
+
+    stack = [(tree, 0)]
+    while stack:
+        node, level = stack.pop()
+        if len(lines) >= max_lines:
+            skipped += 1
+            stack.extend((child, level + 1) for child in _visible_children(node))
+            continue
+        lines.append("\t" * level + "↳" + str(node))
+        children = _visible_children(node)
+        if children:
+            stack.extend((child, level + 1) for child in reversed(children))
+        elif len(lines) < max_lines:
+            lines.append("\t" * (level + 1) + "↳" + str(node.result))
+
+    if skipped:
+        lines.append(f"... {skipped} more nodes")
+    return "\n".join(lines)
@@ -0,0 +1,31 @@
+import pytest
+from fake_gribjump import AXES, GribJump, make_options
+
+from polytope_mars.api import PolytopeMars
+from polytope_mars.engine import EnginePool
+
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmarks", action="store_true", help="run the tests marked as benchmark")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--run-benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="benchmark, run with --run-benchmarks or `make benchmark`")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture
+def fake_polytope_mars():
+    """Build a PolytopeMars extracting from an in-memory GribJump, returned along with the GribJump."""
+
+    def build(levtype="sfc", config=None):
+        gribjump = GribJump(AXES[levtype])
+        config = dict(config or {}, options=make_options(levtype))
+        polytope_mars = PolytopeMars(config, engine_pool=EnginePool(handle_factory=lambda: gribjump))
+        return polytope_mars, gribjump
+
+    return build
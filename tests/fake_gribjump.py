@@ -0,0 +1,107 @@
+import numpy as np
+
+# Number of points of an octahedral O1280 grid, 4N(N + 9)
+O1280_POINTS = 4 * 1280 * (1280 + 9)
+
+
+class ExtractionResult:
+    def __init__(self, values):
+        self.values = values
+
+
+class GribJump:
+    """
+    In-memory stand-in for pygribjump.GribJump serving synthetic O1280 fields.
+
+    Every combination of the given axes is available. Field values are computed
+    from the grid index and the request, so no field is ever held in memory and
+    the same point always returns the same value. The class is named GribJump as
+    Polytope picks its datacube backend by the class name of the handle.
+    """
+
+    def __init__(self, axes):
+        self._axes = {name: list(values) for name, values in axes.items()}
+        self.extract_calls = 0
+        self.extracted_values = 0
+        self.extracted_ranges = 0
+
+    def axes(self, request, ctx=None):
+        return {name: list(values) for name, values in self._axes.items()}
+
+    def extract(self, requests, ctx=None):
+        self.extract_calls += 1
+        results = []
+        for request, ranges, _grid_hash in requests:
+            self.extracted_ranges += len(ranges)
+            offset = sum(ord(c) for c in "".join(str(v) for v in request.values())) % 100
+            values = []
+            for start, end in ranges:
+                index = np.arange(start, end)
+                values.append(250.0 + offset + (index % O1280_POINTS) * 1e-5)
+                self.extracted_values += end - start
+            results.append(ExtractionResult(values))
+        return results
+
+
+# Axes served for surface and pressure level fields
+AXES = {
+    "sfc": {
+        "class": ["od"],
+        "stream": ["oper"],
+        "type": ["fc"],
+        "expver": ["0079"],
+        "levtype": ["sfc"],
+        "domain": ["g"],
+        "date": ["20240915"],
+        "time": ["1200"],
+        "param": ["167", "169"],
+        "step": [str(step) for step in range(0, 73)],
+    },
+    "pl": {
+        "class": ["od"],
+        "stream": ["oper"],
+        "type": ["fc"],
+        "expver": ["0079"],
+        "levtype": ["pl"],
+        "domain": ["g"],
+        "date": ["20240915"],
+        "time": ["1200"],
+        "param": ["130", "133"],
+        "step": ["0"],
+        "levelist": ["50", "100", "150", "200", "250", "300", "400", "500", "600", "700", "850", "925", "1000"],
+    },
+}
+
+
+def make_options(levtype):
+    axis_config = [
+        {"axis_name": "date", "transformations": [{"name": "merge", "other_axis": "time", "linkers": ["T", "00"]}]},
+        {
+            "axis_name": "values",
+            "transformations": [
+                {"name": "mapper", "type": "octahedral", "resolution": 1280, "axes": ["latitude", "longitude"]}
+            ],
+        },
+        {"axis_name": "latitude", "transformations": [{"name": "reverse", "is_reverse": True}]},
+        {"axis_name": "longitude", "transformations": [{"name": "cyclic", "range": [0, 360]}]},
+        {"axis_name": "step", "transformations": [{"name": "type_change", "type": "int"}]},
+        {"axis_name": "levelist", "transformations": [{"name": "type_change", "type": "int"}]},
+    ]
+    return {
+        "axis_config": axis_config,
+        "compressed_axes_config": [
+            "longitude",
+            "latitude",
+            "levtype",
+            "levelist",
+            "step",
+            "date",
+            "domain",
+            "expver",
+            "param",
+            "class",
+            "stream",
+            "type",
+        ],
+        "pre_path": {"class": "od", "expver": "0079", "levtype": levtype, "stream": "oper", "type": "fc"},
+    }
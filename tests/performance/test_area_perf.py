@@ -0,0 +1,85 @@
+import math
+import time
+
+import numpy as np
+import pytest
+from geographiclib.geodesic import Geodesic
+from geographiclib.polygonarea import PolygonArea
+from shapely.geometry import LineString, Polygon
+from shapely.ops import split
+
+from polytope_mars.utils.areas import area_cache, get_boundingbox_area, get_polygon_area
+
+pytestmark = pytest.mark.benchmark
+
+
+def loop_polygon_area(points):
+    """Area as computed before, splitting one meridian at a time and adding one vertex at a time."""
+    polygon = Polygon([(lon, lat) for lat, lon in points])
+    minx, _, maxx, _ = polygon.bounds
+    pieces = [polygon]
+    for lon in range(int(np.floor(minx / 90.0)) * 90, int(np.ceil(maxx / 90.0)) * 90 + 1, 90):
+        splitter = LineString([(lon, -90), (lon, 90)])
+        pieces = [geom for piece in pieces for geom in split(piece, splitter).geoms if geom.geom_type == "Polygon"]
+
+    total_area = 0.0
+    for piece in pieces:
+        polygon_area = PolygonArea(Geodesic.WGS84, False)
+        for lon, lat in piece.exterior.coords:
+            polygon_area.AddPoint(lat, lon)
+        total_area += abs(polygon_area.Compute(False, True)[2])
+    return total_area / 1e6
+
+
+def star_polygon(vertices, lat=10, lon=90, radius=60):
+    angles = np.linspace(0, 2 * math.pi, vertices, endpoint=False)
+    radii = radius * (0.75 + 0.25 * np.sin(7 * angles))
+    points = [[lat + r * math.sin(a), lon + r * math.cos(a)] for a, r in zip(angles, radii)]
+    return points + [points[0]]
+
+
+def measure(area, points, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = area(points)
+    return result, (time.perf_counter() - start) / repeats
+
+
+class TestAreaPerformance:
+    @pytest.mark.parametrize("vertices", [10, 100, 1000, 10000])
+    def test_polygon_area(self, vertices):
+        points = star_polygon(vertices)
+        loop_area, loop_time = measure(loop_polygon_area, points)
+
+        maxsize = area_cache.maxsize
+        area_cache.resize(0)
+        area, vectorised_time = measure(get_polygon_area, points)
+        area_cache.resize(maxsize)
+
+        get_polygon_area(points)
+        _, cached_time = measure(get_polygon_area, points)
+
+        print(
+            f"{vertices} vertices: loop {loop_time * 1e3:.1f}ms, vectorised {vectorised_time * 1e3:.1f}ms, "
+            f"cached {cached_time * 1e3:.2f}ms, relative difference {abs(area - loop_area) / loop_area:.1e}"
+        )
+        assert math.isclose(area, loop_area, rel_tol=2e-4)
+
+
+def split_boundingbox_area(points):
+    """Area as computed before, as a geodesic polygon split at every 90 degree meridian."""
+    (lat1, lon1), (lat2, lon2) = points
+    return loop_polygon_area([[lat1, lon1], [lat1, lon2], [lat2, lon2], [lat2, lon1], [lat1, lon1]])
+
+
+class TestBoundingBoxAreaPerformance:
+    @pytest.mark.parametrize("points", [[[38, -9.5], [39, -8.5]], [[35, -10], [45, 0]], [[-90, -180], [90, 180]]])
+    def test_boundingbox_area(self, points):
+        split_area, split_time = measure(split_boundingbox_area, points, repeats=100)
+        area, closed_form_time = measure(get_boundingbox_area, points, repeats=100)
+
+        print(
+            f"{points}: split geodesic polygon {split_time * 1e6:.0f}us, closed form {closed_form_time * 1e6:.0f}us, "
+            f"relative difference {abs(area - split_area) / split_area:.1e}"
+        )
+        assert closed_form_time < split_time
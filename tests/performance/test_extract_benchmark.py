@@ -0,0 +1,125 @@
+import copy
+import time
+import tracemalloc
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+# Run with `make benchmark`, every feature is extracted from synthetic O1280 fields
+# served by an in-memory GribJump so no datacube needs to be set up.
+
+REPEATS = 3
+
+BASE_REQUEST = {
+    "class": "od",
+    "stream": "oper",
+    "type": "fc",
+    "date": "20240915",
+    "time": "1200",
+    "expver": "0079",
+    "domain": "g",
+}
+
+SCENARIOS = {
+    "timeseries": (
+        "sfc",
+        {
+            "levtype": "sfc",
+            "param": "167/169",
+            "feature": {
+                "type": "timeseries",
+                "points": [[38, -9.5]],
+                "time_axis": "step",
+                "range": {"start": 0, "end": 72},
+            },
+        },
+    ),
+    "verticalprofile": (
+        "pl",
+        {
+            "levtype": "pl",
+            "param": "130/133",
+            "step": "0",
+            "levelist": "50/to/1000",
+            "feature": {"type": "verticalprofile", "points": [[38.9, -9.1]]},
+        },
+    ),
+    "boundingbox": (
+        "sfc",
+        {
+            "levtype": "sfc",
+            "param": "167/169",
+            "step": "0",
+            "feature": {"type": "boundingbox", "points": [[35, -10], [45, 0]]},
+        },
+    ),
+    "polygon": (
+        "sfc",
+        {
+            "levtype": "sfc",
+            "param": "167/169",
+            "step": "0",
+            "feature": {
+                "type": "polygon",
+                "shape": [[36, -9.5], [36, -6.5], [42, -6.5], [43.5, -8.5], [42, -9.5], [36, -9.5]],
+            },
+        },
+    ),
+    "trajectory": (
+        "sfc",
+        {
+            "levtype": "sfc",
+            "param": "167/169",
+            "step": "0",
+            "feature": {
+                "type": "trajectory",
+                "points": [[38, -9.5], [40, -7], [42, -4], [44, -1]],
+                "axes": ["latitude", "longitude"],
+                "inflate": "round",
+                "inflation": 0.1,
+            },
+        },
+    ),
+    "circle": (
+        "sfc",
+        {
+            "levtype": "sfc",
+            "param": "167/169",
+            "step": "0",
+            "feature": {"type": "circle", "center": [[38.5, -9]], "radius": 1},
+        },
+    ),
+}
+
+
+class TestExtractBenchmark:
+    @pytest.mark.parametrize("feature", SCENARIOS)
+    def test_extract(self, feature, fake_polytope_mars):
+        levtype, request = SCENARIOS[feature]
+        request = dict(BASE_REQUEST, **request)
+        polytope_mars, gribjump = fake_polytope_mars(levtype)
+
+        # The first extraction builds the Polytope engine, later ones reuse it
+        start = time.perf_counter()
+        polytope_mars.extract(copy.deepcopy(request))
+        first = time.perf_counter() - start
+
+        durations = {}
+        for _ in range(REPEATS):
+            polytope_mars.extract(copy.deepcopy(request))
+            for stage, seconds in polytope_mars.metrics.durations.items():
+                durations[stage] = durations.get(stage, 0.0) + seconds / REPEATS
+
+        tracemalloc.start()
+        polytope_mars.extract(copy.deepcopy(request))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stages = ", ".join(f"{stage} {seconds * 1e3:.1f}ms" for stage, seconds in durations.items())
+        print(
+            f"\n{feature}: {polytope_mars.metrics.points} points, first extract {first * 1e3:.1f}ms, "
+            f"peak memory {peak / 1e6:.1f}MB\n  {stages}"
+        )
+        assert polytope_mars.metrics.points > 0
+        assert gribjump.extract_calls == REPEATS + 2
@@ -0,0 +1,53 @@
+import copy
+import time
+
+import pytest
+
+pytestmark = pytest.mark.benchmark
+
+
+def make_request(lat, lon):
+    return {
+        "class": "od",
+        "stream": "oper",
+        "type": "fc",
+        "date": "20240915",
+        "time": "1200",
+        "levtype": "sfc",
+        "expver": "0079",
+        "domain": "g",
+        "param": "167/169",
+        "feature": {
+            "type": "timeseries",
+            "points": [[lat, lon]],
+            "time_axis": "step",
+            "range": {"start": 0, "end": 72},
+        },
+    }
+
+
+class TestExtractManyPerformance:
+    @pytest.mark.parametrize("requests", [10, 100])
+    def test_point_burst(self, requests, fake_polytope_mars):
+        burst = [make_request(30 + i * 0.25, -10 + i * 0.25) for i in range(requests)]
+
+        polytope_mars, gribjump = fake_polytope_mars()
+        polytope_mars.extract(copy.deepcopy(burst[0]))
+        start = time.perf_counter()
+        one_by_one = [polytope_mars.extract(copy.deepcopy(request)) for request in burst]
+        one_by_one_time = time.perf_counter() - start
+        one_by_one_calls = gribjump.extract_calls - 1
+
+        polytope_mars, gribjump = fake_polytope_mars()
+        polytope_mars.extract(copy.deepcopy(burst[0]))
+        start = time.perf_counter()
+        batched = polytope_mars.extract_many(burst)
+        batched_time = time.perf_counter() - start
+        batched_calls = gribjump.extract_calls - 1
+
+        print(
+            f"{requests} requests: extract {one_by_one_time * 1e3:.0f}ms with {one_by_one_calls} GribJump calls, "
+            f"extract_many {batched_time * 1e3:.0f}ms with {batched_calls} GribJump calls"
+        )
+        assert batched == one_by_one
+        assert batched_calls == 1
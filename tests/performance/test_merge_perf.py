@@ -0,0 +1,68 @@
+import copy
+import time
+import tracemalloc
+
+import pytest
+from covjsonkit.utils import merge_coverage_collections
+
+from polytope_mars.utils.coverage import merge_coverages
+
+pytestmark = pytest.mark.benchmark
+
+
+def make_collection(index, steps=4, points=100):
+    date = f"2024-01-01T00:00:00Z+{index}"
+    return {
+        "type": "CoverageCollection",
+        "domainType": "MultiPoint",
+        "coverages": [
+            {
+                "mars:metadata": {"class": "od", "Forecast date": date, "number": 0, "step": step},
+                "type": "Coverage",
+                "domain": {
+                    "type": "Domain",
+                    "axes": {
+                        "t": {"values": [date]},
+                        "composite": {"dataType": "tuple", "values": [[float(i), float(i), 0] for i in range(points)]},
+                    },
+                },
+                "ranges": {"2t": {"type": "NdArray", "values": [1.0] * points}},
+            }
+            for step in range(steps)
+        ],
+        "referencing": [],
+        "parameters": {"2t": {"type": "Parameter"}},
+    }
+
+
+def measure(merge, collections):
+    tracemalloc.start()
+    start = time.perf_counter()
+    merged = merge(collections)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return merged, elapsed, peak
+
+
+def fold(collections):
+    merged = {}
+    for collection in collections:
+        merged = merge_coverage_collections(merged, collection)
+    return merged
+
+
+class TestMergePerformance:
+    @pytest.mark.parametrize("subrequests", [1, 10, 100, 1000])
+    def test_merge_subrequests(self, subrequests):
+        collections = [make_collection(i) for i in range(subrequests)]
+
+        folded, fold_time, fold_peak = measure(fold, copy.deepcopy(collections))
+        merged, merge_time, merge_peak = measure(merge_coverages, collections)
+
+        print(
+            f"{subrequests} sub-requests: "
+            f"fold {fold_time:.4f}s {fold_peak / 1e6:.2f}MB, "
+            f"single pass {merge_time:.4f}s {merge_peak / 1e6:.2f}MB"
+        )
+        assert merged == folded
@@ -0,0 +1,36 @@
+import time
+
+import pytest
+from covjsonkit.param_db import get_param_ids
+
+from polytope_mars.config import CovjsonKitConfig
+from polytope_mars.utils.params import ParamResolver
+
+pytestmark = pytest.mark.benchmark
+
+PARAMS = "2t/10u/10v/tp/msl/sp/tcc/2d/skt/sd/cp/lsp/tcwv/sst/ci/lcc/mcc/hcc/100u/100v".split("/")
+
+
+class TestParamResolutionPerformance:
+    def test_resolve_20_params(self):
+        conf = CovjsonKitConfig()
+        repeats = 5
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            per_token = [get_param_ids(conf)[param] for param in PARAMS]
+        per_token_time = (time.perf_counter() - start) / repeats
+
+        resolver = ParamResolver(conf.param_db)
+        resolver.resolve(PARAMS)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            resolved = resolver.resolve(PARAMS)
+        resolver_time = (time.perf_counter() - start) / repeats
+
+        print(
+            f"{len(PARAMS)} params: loading the param db per token {per_token_time * 1e3:.2f}ms, "
+            f"shared resolver {resolver_time * 1e3:.4f}ms"
+        )
+        assert resolved == per_token
+        assert resolver_time < per_token_time
@@ -0,0 +1,73 @@
+import re
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import pytest
+
+from polytope_mars.utils.areas import field_area
+from polytope_mars.utils.datetimes import count_steps, from_range_to_list_date
+
+pytestmark = pytest.mark.benchmark
+
+
+def timedelta_range_count(step_string):
+    """Steps counted as before, by building a pandas timedelta range."""
+    parts = step_string.split("/")
+    start, end = parts[0], parts[2]
+    by = parts[4] if len(parts) == 5 else "1h"
+
+    def to_timedelta(step):
+        if step.isdigit():
+            return pd.Timedelta(hours=int(step))
+        return pd.Timedelta(re.sub(r"(\d+)d", r"\1D", re.sub(r"(\d+)m(?!in)", r"\1min", step)))
+
+    return len(pd.timedelta_range(start=to_timedelta(start), end=to_timedelta(end), freq=to_timedelta(by)))
+
+
+def day_by_day_dates(date_range):
+    """Dates expanded as before, one datetime at a time."""
+    start, end = (datetime.strptime(date, "%Y%m%d") for date in date_range.split("/to/"))
+    dates = []
+    while start <= end:
+        dates.append(start.strftime("%Y%m%d"))
+        start += timedelta(days=1)
+    return "/".join(dates)
+
+
+def measure(function, value, repeats=3):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(value)
+    return result, (time.perf_counter() - start) / repeats
+
+
+class TestRangeCountPerformance:
+    @pytest.mark.parametrize(
+        "steps", ["0/to/240/by/6", "0h/to/240h/by/15m", "0h/to/8760h/by/1m", "0h/to/87600h/by/10s"]
+    )
+    def test_count_steps(self, steps):
+        expected, pandas_time = measure(timedelta_range_count, steps, repeats=1)
+        count, count_time = measure(count_steps, steps, repeats=100)
+        print(f"{steps}: {count} steps, timedelta range {pandas_time * 1e3:.2f}ms, arithmetic {count_time * 1e6:.1f}us")
+        assert count == expected
+        assert count_time < pandas_time
+
+    @pytest.mark.parametrize("dates", ["20240101/to/20241231", "19500101/to/21001231"])
+    def test_expand_dates(self, dates):
+        expected, loop_time = measure(day_by_day_dates, dates)
+        result, range_time = measure(from_range_to_list_date, dates)
+        print(f"{dates}: day by day {loop_time * 1e3:.2f}ms, lazy range {range_time * 1e3:.2f}ms")
+        assert result == expected
+
+    def test_field_area(self):
+        request = {
+            "param": "167/168/169",
+            "step": "0h/to/8760h/by/1m",
+            "date": "19500101/to/21001231",
+            "time": "0000/to/2300",
+            "number": "1/to/50",
+        }
+        area, area_time = measure(lambda r: field_area(r, 1.0), request, repeats=100)
+        print(f"climate request of {area:.3g} fields: field_area {area_time * 1e6:.1f}us")
+        assert area_time < 0.01
@@ -0,0 +1,49 @@
+import logging
+import time
+
+import pytest
+from polytope_feature.datacube.datacube_axis import IntDatacubeAxis
+from polytope_feature.datacube.tensor_index_tree import TensorIndexTree
+
+from polytope_mars.utils.tree import format_tree, summarise_tree
+
+pytestmark = pytest.mark.benchmark
+
+
+def make_tree(steps, points):
+    step_axis = IntDatacubeAxis()
+    step_axis.name = "step"
+    values_axis = IntDatacubeAxis()
+    values_axis.name = "values"
+
+    tree = TensorIndexTree()
+    for step in range(steps):
+        _, step_node, _ = tree.create_child(step_axis, step, [])
+        for point in range(points):
+            _, leaf, _ = step_node.create_child(values_axis, point, [])
+            leaf.result = [float(point)]
+    return tree
+
+
+def measure(function, tree):
+    start = time.perf_counter()
+    function(tree)
+    return time.perf_counter() - start
+
+
+class TestResultTreePerformance:
+    @pytest.mark.parametrize("points", [1000, 10000, 100000])
+    def test_result_tree(self, points):
+        tree = make_tree(4, points // 4)
+
+        # What retrieve_data used to do for every request
+        pprint_time = measure(lambda t: print(t.pprint()), tree)
+        summary_time = measure(summarise_tree, tree)
+        dump_time = measure(lambda t: format_tree(t, 1000), tree)
+
+        print(
+            f"{points} points: pprint {pprint_time * 1e3:.1f}ms, summary {summary_time * 1e3:.1f}ms, "
+            f"capped dump {dump_time * 1e3:.1f}ms, off 0ms (debug logging "
+            f"{'on' if logging.getLogger().isEnabledFor(logging.DEBUG) else 'off'})"
+        )
+        assert summary_time < pprint_time
@@ -0,0 +1,49 @@
+import copy
+import json
+import time
+
+import pytest
+from test_simplify import wavy_polygon
+
+pytestmark = pytest.mark.benchmark
+
+# Run with `make benchmark`, compares extracting a polygon of 600 vertices with and
+# without simplification, the selected points must be the same.
+
+REQUEST = {
+    "class": "od",
+    "stream": "oper",
+    "type": "fc",
+    "date": "20240915",
+    "time": "1200",
+    "levtype": "sfc",
+    "expver": "0079",
+    "domain": "g",
+    "param": "167/169",
+    "step": "0",
+}
+
+
+class TestSimplifyBenchmark:
+    @pytest.mark.parametrize("vertices", [100, 600, 2000])
+    def test_simplify(self, vertices, fake_polytope_mars):
+        request = dict(REQUEST, feature={"type": "polygon", "shape": wavy_polygon(vertices)})
+
+        results = {}
+        for tolerance in (0.0, 2.0):
+            polytope_mars, _ = fake_polytope_mars(
+                config={"polygonrules": {"simplify_tolerance": tolerance, "max_points": 10000}}
+            )
+            polytope_mars.extract(copy.deepcopy(request))
+            start = time.perf_counter()
+            coverage = polytope_mars.extract(copy.deepcopy(request))
+            seconds = time.perf_counter() - start
+            _, _, feature = polytope_mars._prepare(copy.deepcopy(request))
+            results[tolerance] = (json.dumps(coverage, sort_keys=True), seconds, len(feature.simplified_shape()[0]))
+
+        (original, original_seconds, _), (simplified, simplified_seconds, kept) = results[0.0], results[2.0]
+        print(
+            f"\n{vertices} vertices: {original_seconds * 1e3:.0f}ms, simplified to {kept} vertices: "
+            f"{simplified_seconds * 1e3:.0f}ms"
+        )
+        assert simplified == original
@@ -0,0 +1,81 @@
+import asyncio
+import copy
+import threading
+import time
+
+from polytope_mars.api import PolytopeMars
+
+
+class SlowPolytopeMars(PolytopeMars):
+    """Answers each sub-request with its date after a delay, tracking how many run at once."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lock = threading.Lock()
+        self.started = []
+        self.running = {"now": 0, "max": 0}
+
+    def retrieve_data(self, request, feature_type, feature):
+        with self.lock:
+            self.started.append(request["date"])
+            self.running["now"] += 1
+            self.running["max"] = max(self.running["max"], self.running["now"])
+        time.sleep(0.05)
+        with self.lock:
+            self.running["now"] -= 1
+        return {"date": request["date"]}
+
+
+class TestAextract:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0",
+            "feature": {"type": "boundingbox", "points": [[38, -9.5], [38.2, -9.3]]},
+        }
+
+    def test_same_as_extract(self, fake_polytope_mars):
+        polytope_mars, _ = fake_polytope_mars()
+        result = asyncio.run(polytope_mars.aextract(copy.deepcopy(self.request)))
+        assert result == polytope_mars.extract(copy.deepcopy(self.request))
+        assert self.request["feature"]["type"] == "boundingbox"
+
+    def test_concurrency_limit(self):
+        polytope_mars = SlowPolytopeMars({"execution": {"max_concurrent_requests": 2}})
+
+        async def extract_all():
+            return await asyncio.gather(*[polytope_mars.aextract(self.request) for _ in range(6)])
+
+        results = asyncio.run(extract_all())
+        assert len(results) == 6
+        assert polytope_mars.running["max"] == 2
+
+    def test_cancel_between_subrequests(self):
+        self.request["date"] = "20240101/to/20240110"
+        self.request["feature"] = {
+            "type": "polygon",
+            "shape": [[38, -9.5], [38, -9.3], [38.2, -9.3], [38.2, -9.5], [38, -9.5]],
+        }
+        polytope_mars = SlowPolytopeMars({"polygonrules": {"max_area": 0}})
+
+        async def extract_and_cancel():
+            task = asyncio.ensure_future(polytope_mars.aextract(self.request))
+            await asyncio.sleep(0.08)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        assert asyncio.run(extract_and_cancel())
+        time.sleep(0.1)
+        assert 1 <= len(polytope_mars.started) < 10
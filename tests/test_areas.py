@@ -0,0 +1,178 @@
+import math
+
+import numpy as np
+import pytest
+from geographiclib.geodesic import Geodesic
+from geographiclib.polygonarea import PolygonArea
+from shapely.geometry import Polygon
+
+from polytope_mars.api import PolytopeMars
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.features.polygon import Polygons
+from polytope_mars.utils.areas import (
+    area_cache,
+    field_area,
+    geometry_key,
+    get_boundingbox_area,
+    get_pieces_area,
+    get_polygon_area,
+    request_cost,
+    split_polygon,
+)
+from polytope_mars.utils.cache import shared_cache
+
+
+def geodesic_area(points):
+    """Reference area in km², adding every vertex of the pieces to a geographiclib PolygonArea."""
+    total_area = 0.0
+    for piece in split_polygon(Polygon([(lon, lat) for lat, lon in points])):
+        polygon = PolygonArea(Geodesic.WGS84, False)
+        for lon, lat in piece.exterior.coords:
+            polygon.AddPoint(lat, lon)
+        total_area += abs(polygon.Compute(False, True)[2])
+    return total_area / 1e6
+
+
+def star_polygon(vertices, lat, lon, radius, seed=0):
+    rng = np.random.default_rng(seed)
+    angles = np.sort(rng.uniform(0, 2 * math.pi, vertices))
+    radii = radius * rng.uniform(0.5, 1, vertices)
+    points = [[lat + r * math.sin(a), lon + r * math.cos(a)] for a, r in zip(angles, radii)]
+    return points + [points[0]]
+
+
+class TestAreas:
+    @pytest.mark.parametrize("vertices", [10, 100, 1000])
+    @pytest.mark.parametrize("lat,lon,radius", [(45, 10, 5), (0, 0, 30), (-60, 170, 20), (70, -100, 15), (10, 90, 60)])
+    def test_polygon_area(self, vertices, lat, lon, radius):
+        points = star_polygon(vertices, lat, lon, radius)
+        assert math.isclose(get_polygon_area(points), geodesic_area(points), rel_tol=2e-4)
+
+    def test_square(self):
+        points = [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]]
+        assert math.isclose(get_polygon_area(points), 12308.778361469453, rel_tol=1e-5)
+
+    def test_split_polygon(self):
+        polygon = Polygon([(-100, 0), (100, 0), (100, 10), (-100, 10)])
+        pieces = split_polygon(polygon)
+        assert len(pieces) == 4
+        assert math.isclose(sum(piece.area for piece in pieces), polygon.area)
+
+    def test_invalid_polygon(self):
+        points = [[0, 0], [10, 100], [0, 100], [10, 0], [0, 0]]
+        assert math.isclose(get_polygon_area(points), geodesic_area(points), rel_tol=1e-3)
+
+    def test_empty(self):
+        assert get_pieces_area([]) == 0.0
+
+
+class TestAreaCache:
+    def setup_method(self):
+        self.square = [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]]
+        area_cache.clear()
+
+    def test_repeated_polygon(self):
+        area = get_polygon_area(self.square)
+        assert get_polygon_area([list(point) for point in self.square]) == area
+        assert area_cache.stats()["hits"] == 1
+        assert area_cache.stats()["misses"] == 1
+
+    def test_canonical_ring(self):
+        rotated = self.square[1:] + [self.square[1]]
+        reversed_ring = self.square[::-1]
+        unclosed = self.square[:-1]
+        key = geometry_key("polygon", self.square)
+        assert geometry_key("polygon", rotated) == key
+        assert geometry_key("polygon", reversed_ring) == key
+        assert geometry_key("polygon", unclosed) == key
+        assert geometry_key("polygon", [[0.0, 0.0], [0.0, 2.0], [1.0, 1.0], [1.0, 0.0]]) != key
+        assert geometry_key("boundingbox", self.square[:2]) != key
+
+    def test_shared_with_request_cost(self):
+        request = {
+            "param": "167",
+            "step": "0",
+            "feature": {"type": "polygon", "shape": self.square},
+        }
+        get_polygon_area(self.square[::-1])
+        request_cost(request)
+        assert area_cache.stats()["hits"] == 1
+
+    def test_disabled(self):
+        config = PolytopeMarsConfig(cache={"area_cache_size": 0})
+        for _ in range(2):
+            Polygons({"type": "polygon", "shape": self.square}, config)
+        cache = shared_cache("areas", 0)
+        assert cache.stats()["hits"] == 0
+        assert len(cache) == 0
+
+        # The default cache is neither used nor resized
+        PolytopeMars({"cache": {"area_cache_size": 0}})
+        assert area_cache.maxsize == 1024
+        assert area_cache.stats()["misses"] == 0
+
+
+class TestBoundingBoxArea:
+    @pytest.mark.parametrize(
+        "points", [[[0, 0], [1, 1]], [[38, -9.5], [39, -8.5]], [[-60.5, 120], [-59.5, 121]], [[70, -1], [71, 1]]]
+    )
+    def test_small_box(self, points):
+        # Geodesic edges hardly differ from parallels over a couple of degrees
+        (lat1, lon1), (lat2, lon2) = points
+        ring = [[lat1, lon1], [lat1, lon2], [lat2, lon2], [lat2, lon1], [lat1, lon1]]
+        assert math.isclose(get_boundingbox_area(points), geodesic_area(ring), rel_tol=1e-4)
+
+    def test_globe(self):
+        # Surface area of the WGS84 ellipsoid
+        assert math.isclose(get_boundingbox_area([[-90, -180], [90, 180]]), 510065621.7, rel_tol=1e-9)
+        assert get_boundingbox_area([[-100, -200], [100, 200]]) == get_boundingbox_area([[-90, -180], [90, 180]])
+
+    def test_hemispheres(self):
+        north = get_boundingbox_area([[0, 0], [90, 360]])
+        assert math.isclose(north, get_boundingbox_area([[-90, 0], [0, 360]]))
+        assert math.isclose(2 * north, get_boundingbox_area([[-90, 0], [90, 360]]))
+
+    def test_symmetric_about_equator(self):
+        assert math.isclose(get_boundingbox_area([[-10, 0], [10, 5]]), 2 * get_boundingbox_area([[0, 0], [10, 5]]))
+
+    def test_antimeridian(self):
+        assert math.isclose(get_boundingbox_area([[-5, 170], [5, 190]]), get_boundingbox_area([[-5, -10], [5, 10]]))
+        assert math.isclose(get_boundingbox_area([[5, 10], [-5, -10]]), get_boundingbox_area([[-5, -10], [5, 10]]))
+
+    def test_axes(self):
+        assert get_boundingbox_area([[-9.5, 38], [-8.5, 39]], ["longitude", "latitude"]) == get_boundingbox_area(
+            [[38, -9.5], [39, -8.5]]
+        )
+        assert get_boundingbox_area(
+            [[38, -9.5, 500], [39, -8.5, 1000]], ["latitude", "longitude", "levelist"]
+        ) == get_boundingbox_area([[38, -9.5], [39, -8.5]])
+
+
+class TestFieldArea:
+    @pytest.mark.parametrize(
+        "request_, expected",
+        [
+            (
+                {
+                    "param": "167/169",
+                    "step": "0/to/240/by/6",
+                    "number": "1/to/50",
+                    "date": "20240101/to/20240105",
+                    "time": "0000/to/1800",
+                },
+                2 * 41 * 50 * 4 * 18,
+            ),
+            ({"param": "167", "step": "1h/to/6h/by/30m", "levelist": "500/850", "time": "0000/1200"}, 11 * 2 * 2),
+            ({"param": "167", "month": "1/to/12", "year": "1990/to/2020"}, 12 * 31),
+            ({"param": "167", "step": "0d/to/7d/by/1d", "date": "20240101/to/20240110/by/2"}, 8 * 9),
+            ({"param": "167", "feature": {"range": {"start": 0, "end": 10}}}, 11),
+            ({"param": "167", "date": "20240101/to/20240101"}, 1),
+        ],
+    )
+    def test_counts(self, request_, expected):
+        assert field_area(request_, 2.0) == 2.0 * expected
+
+    def test_long_ranges(self):
+        # Multi-decade ranges of sub-hourly steps are counted without expanding them
+        request = {"param": "167", "step": "0h/to/87600h/by/1s", "date": "19500101/to/21001231", "time": "0000/to/2300"}
+        assert field_area(request, 1.0) == (87600 * 3600 + 1) * 55151 * 23
@@ -0,0 +1,63 @@
+from polytope_mars.api import PolytopeMars, shape_cache
+
+
+class TestBaseShapes:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "enfo",
+            "type": "pf",
+            "date": "20240101",
+            "time": "0000/1200",
+            "levtype": "sfc",
+            "expver": "0001",
+            "domain": "g",
+            "param": "2t/10u",
+            "number": "1/to/5",
+            "step": "0/to/12/by/6",
+        }
+        shape_cache.clear()
+
+    def shapes(self, polytope_mars, request):
+        return [repr(shape) for shape in polytope_mars._create_base_shapes(dict(request), "boundingbox")]
+
+    def test_cached_shapes_identical(self):
+        polytope_mars = PolytopeMars({})
+        first = self.shapes(polytope_mars, self.request)
+        assert shape_cache.stats()["hits"] == 0
+
+        second = self.shapes(PolytopeMars({}), self.request)
+        assert first == second
+        assert shape_cache.stats()["misses"] == len(self.request)
+        assert shape_cache.stats()["hits"] == len(self.request)
+
+    def test_near_identical_request(self):
+        polytope_mars = PolytopeMars({})
+        self.shapes(polytope_mars, self.request)
+        misses = shape_cache.stats()["misses"]
+
+        self.request["date"] = "20240102"
+        shapes = self.shapes(polytope_mars, self.request)
+        assert shape_cache.stats()["misses"] == misses + 1
+        assert "Timestamp('2024-01-02 12:00:00')" in shapes[3]
+
+    def test_param_names(self):
+        shapes = self.shapes(PolytopeMars({}), self.request)
+        assert shapes[7] == "Select in param with points ['165', '167']"
+
+    def test_relative_date_not_cached(self):
+        self.request["date"] = "-1"
+        self.shapes(PolytopeMars({}), self.request)
+        assert shape_cache.stats()["size"] == len(self.request) - 1
+
+    def test_cache_disabled(self):
+        polytope_mars = PolytopeMars({"cache": {"shape_cache_size": 0}})
+        self.shapes(polytope_mars, self.request)
+        self.shapes(polytope_mars, self.request)
+        assert polytope_mars.shape_cache.stats()["hits"] == 0
+        assert polytope_mars.shape_cache.stats()["size"] == 0
+
+        # Other instances keep the default cache and its size
+        assert PolytopeMars({}).shape_cache is shape_cache
+        assert shape_cache.maxsize == 1024
+        assert shape_cache.stats()["misses"] == 0
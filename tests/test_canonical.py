@@ -0,0 +1,195 @@
+import asyncio
+import copy
+import threading
+import time
+
+import pytest
+
+from polytope_mars.api import in_flight
+from polytope_mars.utils.canonical import (
+    canonical_request,
+    canonical_value,
+    canonicalise,
+    request_hash,
+)
+from polytope_mars.utils.inflight import InFlightRequests
+from polytope_mars.utils.params import param_resolver
+
+REQUEST = {
+    "class": "od",
+    "stream": "oper",
+    "type": "fc",
+    "date": "20240915",
+    "time": "1200",
+    "levtype": "sfc",
+    "expver": "0079",
+    "domain": "g",
+    "param": "167/169",
+    "step": "0/to/3",
+    "feature": {
+        "type": "timeseries",
+        "points": [[38.0, -9.5]],
+        "time_axis": "step",
+    },
+}
+
+
+class TestCanonical:
+    def setup_method(self):
+        self.request = copy.deepcopy(REQUEST)
+
+    @pytest.mark.parametrize(
+        "key, values",
+        [
+            ("step", ["0/to/6/by/2", "0/TO/6/BY/2", "00/to/06/by/02", " 0 / to / 6 / by / 2 "]),
+            ("step", ["0/2/4/6", "00/02/04/06"]),
+            ("time", ["0000", "00:00:00", "0", "00"]),
+            ("time", ["0000/to/1200/by/0600", "00:00:00/to/12:00:00/by/600", "0/to/12/by/0600"]),
+            ("time", ["00:00:00/06:00:00/12:00:00", "0/6/12"]),
+            ("date", ["2024-09-15", "20240915"]),
+            ("date", ["20240915/to/20240917", "2024-09-15/to/2024-09-17"]),
+            ("date", ["20240901/to/20240905/by/2", "2024-09-01/to/2024-09-05/by/02"]),
+            ("number", ["1/to/3", "01/to/03"]),
+            ("number", ["1/2/3", "01/02/03"]),
+            ("type", ["FC", "fc", " fc "]),
+        ],
+    )
+    def test_equivalent_values(self, key, values):
+        assert len({canonical_value(key, value) for value in values}) == 1
+
+    def test_ranges_not_expanded(self):
+        # Ranges may select other values than the lists they spell out, e.g. a step
+        # range with an interval leaves out its end
+        assert canonical_value("step", "0/to/12/by/3") == "0/to/12/by/3"
+        assert canonical_value("step", "0/to/12/by/3") != canonical_value("step", "0/3/6/9/12")
+        assert canonical_value("step", "0/to/3") != canonical_value("step", "0/1/2/3")
+        assert canonical_value("time", "0000/to/1200") != canonical_value("time", "0000/to/1200/by/1")
+        assert request_hash(dict(self.request, step="0/to/12/by/3")) != request_hash(
+            dict(self.request, step="0/3/6/9/12")
+        )
+
+    def test_order_kept(self):
+        assert canonical_value("step", "3/0") != canonical_value("step", "0/3")
+        assert canonical_value("param", "169/167") == "169/167"
+
+    def test_unparsed_values(self):
+        assert canonical_value("date", "-1") == "-1"
+        assert canonical_value("step", "0/to/1h30m/by/30m") == "0/to/1h30m/by/30m"
+        assert canonical_value("expver", "0079") == "0079"
+
+    def test_params(self):
+        params = param_resolver("ecmwf")
+        assert canonical_value("param", "2t/tp", params) == canonical_value("param", "167/228228", params)
+        assert canonical_value("param", "2t") == "2t"
+
+    def test_request(self):
+        request = copy.deepcopy(self.request)
+        request = dict(reversed(list(request.items())))
+        request.update(step="00/TO/3", time="12:00:00", date="2024-09-15", type="FC")
+        request["feature"]["points"] = [[38, -9.5000000001]]
+        assert canonical_request(request) == canonical_request(self.request)
+        assert request_hash(request) == request_hash(self.request)
+        assert request_hash(request, context="a") != request_hash(self.request, context="b")
+
+        request["feature"]["points"] = [[38.01, -9.5]]
+        assert canonical_request(request) != canonical_request(self.request)
+
+    def test_canonicalise(self):
+        canonical = canonicalise(self.request)
+        assert list(canonical) == sorted(self.request)
+        assert canonical["step"] == "0/to/3"
+        assert canonical["time"] == "12:00:00"
+        assert canonical["feature"] == self.request["feature"]
+        assert self.request["step"] == "0/to/3"
+
+
+class TestInFlight:
+    def setup_method(self):
+        self.request = copy.deepcopy(REQUEST)
+
+    def test_run(self):
+        calls = InFlightRequests()
+        started = threading.Event()
+        release = threading.Event()
+
+        def work():
+            started.set()
+            release.wait()
+            return {"value": [1]}
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(calls.run("a", work)))
+        leader.start()
+        started.wait()
+        followers = [threading.Thread(target=lambda: results.append(calls.run("a", work))) for _ in range(3)]
+        for thread in followers:
+            thread.start()
+        time.sleep(0.05)
+        release.set()
+        for thread in [leader] + followers:
+            thread.join()
+
+        assert sorted(leader for _, leader in results) == [False, False, False, True]
+        assert all(result == {"value": [1]} for result, _ in results)
+        assert len({id(result) for result, _ in results}) == 4
+        assert len(calls) == 0
+
+    def test_run_error(self):
+        calls = InFlightRequests()
+
+        def fail():
+            raise ValueError("failed")
+
+        with pytest.raises(ValueError):
+            calls.run("a", fail)
+        assert calls.run("a", lambda: 1) == (1, True)
+
+    def slow_extract(self, gribjump, delay=0.2):
+        extract = gribjump.extract
+
+        def slow(requests, ctx=None):
+            time.sleep(delay)
+            return extract(requests, ctx)
+
+        gribjump.extract = slow
+
+    def test_extract(self, fake_polytope_mars):
+        polytope_mars, gribjump = fake_polytope_mars(config={"execution": {"deduplicate": True}})
+        self.slow_extract(gribjump)
+        equivalent = dict(copy.deepcopy(self.request), step="00/TO/3", time="12:00:00")
+
+        coverages = []
+        threads = [
+            threading.Thread(target=lambda r=r: coverages.append(polytope_mars.extract(r)))
+            for r in [copy.deepcopy(self.request), equivalent]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert gribjump.extract_calls == 1
+        assert coverages[0] == coverages[1]
+        assert len(in_flight) == 0
+
+    def test_aextract(self, fake_polytope_mars):
+        polytope_mars, gribjump = fake_polytope_mars(config={"execution": {"deduplicate": True}})
+        self.slow_extract(gribjump)
+
+        async def extract_all():
+            return await asyncio.gather(*(polytope_mars.aextract(copy.deepcopy(self.request)) for _ in range(3)))
+
+        coverages = asyncio.run(extract_all())
+        assert gribjump.extract_calls == 1
+        assert coverages[0] == coverages[1] == coverages[2]
+        assert coverages[0] is not coverages[1]
+
+    def test_off(self, fake_polytope_mars):
+        polytope_mars, gribjump = fake_polytope_mars()
+        self.slow_extract(gribjump, 0.05)
+
+        async def extract_all():
+            return await asyncio.gather(*(polytope_mars.aextract(copy.deepcopy(self.request)) for _ in range(2)))
+
+        asyncio.run(extract_all())
+        assert gribjump.extract_calls == 2
@@ -0,0 +1,123 @@
+import copy
+import json
+
+import numpy as np
+from fake_gribjump import AXES
+from fake_gribjump import GribJump as FakeGribJump
+
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.engine import EnginePool
+from polytope_mars.utils import cells
+from polytope_mars.utils.cells import CellCache, cell_cache, field_key
+
+
+class TestCellCache:
+    def setup_method(self):
+        cell_cache.clear()
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0/to/72",
+            "feature": {"type": "timeseries", "points": [[38, -9.5]], "time_axis": "step"},
+        }
+
+    def test_cache(self):
+        cache = CellCache(maxsize=10)
+        key = field_key({"param": "167", "step": "0"}, "hash")
+        assert key == field_key({"step": "0", "param": "167"}, "hash")
+
+        cache.store(key, np.array([5, 1, 3]), np.array([50.0, 10.0, 30.0]))
+        found, values = cache.lookup(key, np.array([0, 1, 3, 4, 5, 9]))
+        assert found.tolist() == [False, True, True, False, True, False]
+        assert values[found].tolist() == [10.0, 30.0, 50.0]
+
+        # Least recently used fields are evicted past maxsize cells
+        other = field_key({"param": "169", "step": "0"}, "hash")
+        cache.store(other, np.arange(6), np.zeros(6))
+        cache.lookup(key, np.array([1]))
+        cache.store(other, np.arange(3, 8), np.ones(5))
+        assert cache.stats()["fields"] == 1
+        found, values = cache.lookup(other, np.arange(8))
+        assert found.all()
+        assert values.tolist() == [0, 0, 0, 1, 1, 1, 1, 1]
+
+        assert len(CellCache(maxsize=0)) == 0
+
+    def test_extract(self):
+        handle = FakeGribJump(AXES["sfc"])
+        cached = cells.GribJump(handle, CellCache(maxsize=1000))
+        request = {"param": "167", "step": "0"}
+
+        first = cached.extract([(request, [(10, 15), (30, 32)], "hash")])
+        assert handle.extracted_values == 7
+        expected = handle.extract([(request, [(12, 14), (28, 33)], "hash")])[0].values
+        handle.extracted_values = 0
+
+        # Only the missing cells 28, 29 and 32 are read
+        second = cached.extract([(request, [(12, 14), (28, 33)], "hash")])[0].values
+        assert handle.extracted_values == 3
+        assert [list(values) for values in second] == [list(values) for values in expected]
+        assert [len(values) for values in first[0].values] == [5, 2]
+
+        calls = handle.extract_calls
+        cached.extract([(request, [(10, 15)], "hash")])
+        assert handle.extract_calls == calls
+        assert cached.axes(request) == handle.axes(request)
+
+    def test_missing_field(self):
+        class EmptyGribJump(FakeGribJump):
+            def extract(self, requests, ctx=None):
+                self.extract_calls += 1
+                return [cells.ExtractionResult([]) for _ in requests]
+
+        handle = EmptyGribJump(AXES["sfc"])
+        cached = cells.GribJump(handle, CellCache(maxsize=1000))
+        for _ in range(2):
+            assert cached.extract([({"param": "167"}, [(0, 3)], "hash")])[0].values == []
+        assert handle.extract_calls == 2
+
+    def test_engine_pool(self):
+        pool = EnginePool(handle_factory=lambda: FakeGribJump(AXES["sfc"]))
+        plain = pool.handle(PolytopeMarsConfig())
+        wrapped = pool.handle(PolytopeMarsConfig(cache={"cell_cache_size": 100}))
+        assert isinstance(wrapped, cells.GribJump)
+        assert wrapped.handle is plain
+        assert pool.handle(PolytopeMarsConfig(cache={"cell_cache_size": 100})) is wrapped
+
+        # Handles with other sizes keep cells of their own
+        other = pool.handle(PolytopeMarsConfig(cache={"cell_cache_size": 200}))
+        assert other is not wrapped and other.cache is not wrapped.cache
+        assert (wrapped.cache.maxsize, other.cache.maxsize) == (100, 200)
+        assert pool.stats()["handles_created"] == 1
+
+    def test_overlapping_requests(self, fake_polytope_mars):
+        requests = [
+            self.request,
+            dict(self.request, step="0/to/36"),
+            dict(self.request, step="24/to/48"),
+            dict(self.request, step="0/to/72", param="167"),
+        ]
+        polytope_mars, _ = fake_polytope_mars()
+        expected = [polytope_mars.extract(copy.deepcopy(request)) for request in requests]
+
+        polytope_mars, gribjump = fake_polytope_mars(config={"cache": {"cell_cache_size": 10000}})
+        cache = polytope_mars.engine_pool.handle(polytope_mars.conf).cache
+        cache.clear()
+        coverages = [polytope_mars.extract(copy.deepcopy(requests[0]))]
+        assert gribjump.extract_calls == 1
+        coverages += [polytope_mars.extract(copy.deepcopy(request)) for request in requests[1:]]
+        assert gribjump.extract_calls == 1
+        assert json.dumps(coverages, sort_keys=True) == json.dumps(expected, sort_keys=True)
+        assert cache.stats()["hits"] == 74 + 50 + 73
+
+        # New steps only read the missing cells
+        polytope_mars.extract(dict(self.request, feature=dict(self.request["feature"], points=[[38, -9.5], [40, -5]])))
+        assert gribjump.extract_calls == 2
+        assert gribjump.extracted_values == 146 * 2
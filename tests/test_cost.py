@@ -0,0 +1,111 @@
+import copy
+
+import pytest
+from fake_gribjump import O1280_POINTS, make_options
+
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.utils.cost import axis_length, estimate_cost, get_grid_model
+
+
+class TestCost:
+    def setup_method(self):
+        self.options = PolytopeMarsConfig(options=make_options("sfc")).options
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0",
+        }
+        self.features = {
+            "boundingbox": {"type": "boundingbox", "points": [[35, -10], [45, 0]]},
+            "polygon": {
+                "type": "polygon",
+                "shape": [[36, -9.5], [36, -6.5], [42, -6.5], [43.5, -8.5], [42, -9.5], [36, -9.5]],
+            },
+            "circle": {"type": "circle", "center": [[38.5, -9]], "radius": 1},
+            "trajectory": {
+                "type": "trajectory",
+                "points": [[38, -9.5], [40, -7], [42, -4], [44, -1]],
+                "axes": ["latitude", "longitude"],
+                "inflate": "round",
+                "inflation": 0.1,
+            },
+        }
+
+    def test_grid_model(self):
+        grid = get_grid_model(self.options)
+        assert grid.points == O1280_POINTS
+        assert grid.rows(-90, 90) == 2 * 1280
+        assert grid.box_points(-90, 90, 0, 360) == O1280_POINTS
+        assert 0.07 < grid.max_spacing() < 0.11
+
+    def test_axis_length(self):
+        assert axis_length("param", "167/169") == 2
+        assert axis_length("step", "0/to/72") == 73
+        assert axis_length("step", "0/to/72/by/6") == 13
+        assert axis_length("number", "1/to/50") == 50
+        assert axis_length("date", "20240901/to/20240930") == 30
+        assert axis_length("date", "2024-09-01/to/2024-09-30/by/7") == 5
+        assert axis_length("time", "0000/to/1800/by/0600") == 4
+        assert axis_length("time", "0000/to/1800/by/6") == 181
+        assert axis_length("time", "0000/to/1800") == 19
+        assert axis_length("levelist", "500/to/1000", {"levtype": "pl"}) == 9
+        assert axis_length("levelist", "1/to/137", {"levtype": "ml"}) == 137
+
+    @pytest.mark.parametrize("time", ["0000/to/1800/by/0600", "0000/to/1800/by/6", "0/to/0130/by/0030"])
+    def test_time_range_matches_extraction(self, time, fake_polytope_mars):
+        polytope_mars, _ = fake_polytope_mars()
+        assert axis_length("time", time) == len(polytope_mars._expand_times(time))
+
+    def test_timeseries(self):
+        request = {key: value for key, value in self.request.items() if key != "step"}
+        request["feature"] = {
+            "type": "timeseries",
+            "points": [[38, -9.5], [51.5, 0.1]],
+            "time_axis": "step",
+            "range": {"start": 0, "end": 72},
+        }
+        cost = estimate_cost(request, self.options)
+        assert cost["points"] == 2
+        assert cost["fields"] == 2 * 73
+        assert cost["values"] == cost["reads"] == 2 * 2 * 73
+
+    @pytest.mark.parametrize("feature", ["boundingbox", "polygon", "circle", "trajectory"])
+    def test_matches_extraction(self, feature, fake_polytope_mars):
+        request = dict(self.request, feature=self.features[feature])
+        polytope_mars, gribjump = fake_polytope_mars(config={"metrics": {"output_bytes": True}})
+
+        cost = polytope_mars.estimate(copy.deepcopy(request))
+        polytope_mars.extract(copy.deepcopy(request))
+
+        assert cost["fields"] == 2
+        assert cost["values"] == pytest.approx(gribjump.extracted_values, rel=0.1)
+        assert cost["reads"] == pytest.approx(gribjump.extracted_ranges, rel=0.1)
+        assert cost["bytes"] == pytest.approx(polytope_mars.metrics.output_bytes, rel=0.2)
+
+    def test_max_values(self, fake_polytope_mars):
+        request = dict(self.request, feature=self.features["boundingbox"])
+        polytope_mars, gribjump = fake_polytope_mars(config={"cost": {"max_values": 10000}})
+
+        with pytest.raises(ValueError, match="exceeds the maximum"):
+            polytope_mars.extract(copy.deepcopy(request))
+        assert gribjump.extract_calls == 0
+
+        request["feature"]["points"] = [[35, -10], [36, -9]]
+        polytope_mars.extract(copy.deepcopy(request))
+        assert gribjump.extract_calls == 1
+
+    def test_validated_before_estimate(self, fake_polytope_mars):
+        request = dict(self.request, step="0/to/72", levellist="500")
+        request["feature"] = {"type": "timeseries", "points": [[38, -9.5]], "time_axis": "step"}
+        polytope_mars, gribjump = fake_polytope_mars(config={"cost": {"max_values": 10}})
+
+        with pytest.raises(KeyError, match="not compatible with feature Time Series"):
+            polytope_mars.extract(request)
+        assert gribjump.extract_calls == 0
@@ -0,0 +1,199 @@
+import copy
+import json
+
+import pytest
+from covjsonkit.utils import merge_coverage_collections
+
+from polytope_mars.utils.coverage import (
+    iter_coverage_collection_json,
+    merge_coverages,
+    split_point_coverages,
+    stitch_coverages,
+)
+
+
+def make_collection(date, params, number=0, points=3):
+    composite = [[float(i), float(i), 0] for i in range(points)]
+    return {
+        "type": "CoverageCollection",
+        "domainType": "MultiPoint",
+        "coverages": [
+            {
+                "mars:metadata": {"class": "od", "Forecast date": date, "number": number, "step": 0},
+                "type": "Coverage",
+                "domain": {
+                    "type": "Domain",
+                    "axes": {
+                        "t": {"values": [date]},
+                        "composite": {"dataType": "tuple", "values": composite},
+                    },
+                },
+                "ranges": {param: {"type": "NdArray", "values": [1.0] * points} for param in params},
+            }
+        ],
+        "referencing": [],
+        "parameters": {param: {"type": "Parameter"} for param in params},
+    }
+
+
+def make_point_collection(points, params, levels=None):
+    # A PointSeries collection with one coverage per point, sharing metadata and times
+    coverages = []
+    for lat, lon in points:
+        axes = {
+            "t": {"values": ["2024-01-01T00:00:00Z"]},
+            "latitude": {"values": [lat]},
+            "longitude": {"values": [lon]},
+        }
+        if levels is not None:
+            axes["levelist"] = {"values": levels}
+        coverages.append(
+            {
+                "mars:metadata": {"class": "od", "Forecast date": "20240101", "number": 0},
+                "type": "Coverage",
+                "domain": {"type": "Domain", "axes": axes},
+                "ranges": {param: {"type": "NdArray", "values": [lat + lon]} for param in params},
+            }
+        )
+    return {
+        "type": "CoverageCollection",
+        "domainType": "PointSeries",
+        "coverages": coverages,
+        "referencing": [],
+        "parameters": {param: {"type": "Parameter"} for param in params},
+    }
+
+
+def fold(collections):
+    merged = {}
+    for collection in collections:
+        merged = merge_coverage_collections(merged, collection)
+    return merged
+
+
+class TestMergeCoverages:
+    def test_matches_covjsonkit(self):
+        collections = [
+            make_collection("20240101", ["2t"]),
+            make_collection("20240102", ["2t"]),
+            make_collection("20240101", ["tp"]),
+            make_collection("20240101", ["2t"], number=1),
+            {},
+            make_collection("20240102", ["2t", "10u"]),
+        ]
+        expected = fold(copy.deepcopy(collections))
+        assert merge_coverages(copy.deepcopy(collections)) == expected
+        assert len(expected["coverages"]) == 3
+        assert set(expected["coverages"][0]["ranges"]) == {"2t", "tp"}
+        assert set(expected["coverages"][1]["ranges"]) == {"2t", "10u"}
+
+    def test_duplicate_coverage_appended(self):
+        collections = [make_collection("20240101", ["2t"]), make_collection("20240101", ["2t"])]
+        expected = fold(copy.deepcopy(collections))
+        assert merge_coverages(collections) == expected
+        assert len(expected["coverages"]) == 2
+
+    def test_empty(self):
+        assert merge_coverages([]) == {}
+        assert merge_coverages([{}, {}]) == {}
+
+    def test_single_collection_not_modified(self):
+        collection = make_collection("20240101", ["2t"])
+        merged = merge_coverages([collection, make_collection("20240102", ["2t"])])
+        assert len(merged["coverages"]) == 2
+        assert len(collection["coverages"]) == 1
+
+    def test_mismatched_domain_type(self):
+        other = make_collection("20240102", ["2t"])
+        other["domainType"] = "PointSeries"
+        with pytest.raises(ValueError):
+            merge_coverages([make_collection("20240101", ["2t"]), other])
+
+    def test_points_split_by_param(self):
+        # Coverages of different points share their metadata and times, each only
+        # gains the ranges of the coverage of the same point
+        points = [[38.0, -9.5], [40.0, -8.0]]
+        collections = [make_point_collection(points, ["2t"]), make_point_collection(points, ["tp"])]
+        merged = merge_coverages(copy.deepcopy(collections))
+        assert len(merged["coverages"]) == 2
+        for coverage, (lat, lon) in zip(merged["coverages"], points):
+            assert coverage["domain"]["axes"]["latitude"]["values"] == [lat]
+            assert set(coverage["ranges"]) == {"2t", "tp"}
+            assert coverage["ranges"]["tp"]["values"] == [lat + lon]
+
+    def test_levels_not_merged(self):
+        points = [[38.0, -9.5]]
+        collections = [
+            make_point_collection(points, ["t"], levels=[500]),
+            make_point_collection(points, ["q"], levels=[850]),
+        ]
+        merged = merge_coverages(collections)
+        assert len(merged["coverages"]) == 2
+        assert [set(c["ranges"]) for c in merged["coverages"]] == [{"t"}, {"q"}]
+
+    def test_unhashable_metadata(self):
+        collections = [make_collection("20240101", ["2t"]), make_collection("20240101", ["tp"])]
+        for collection in collections:
+            collection["coverages"][0]["mars:metadata"]["levelist"] = [500, 850]
+        merged = merge_coverages(collections)
+        assert len(merged["coverages"]) == 1
+        assert set(merged["coverages"][0]["ranges"]) == {"2t", "tp"}
+
+
+class TestCoverageCollectionJson:
+    def test_matches_merge(self):
+        collections = [
+            make_collection("20240101", ["2t"]),
+            {},
+            make_collection("20240102", ["2t", "tp"]),
+            make_collection("20240103", ["10u"]),
+        ]
+        chunks = list(iter_coverage_collection_json(copy.deepcopy(collections)))
+        assert len(chunks) == 5
+        assert json.loads("".join(chunks)) == merge_coverages(collections)
+
+    def test_empty(self):
+        assert json.loads("".join(iter_coverage_collection_json([]))) == {}
+        assert json.loads("".join(iter_coverage_collection_json([{}]))) == {}
+
+
+class TestSplitPointCoverages:
+    def test_nearest(self):
+        collection = make_point_collection([[38.0, -9.5], [40.0, -8.0]], ["2t"])
+        first, second = split_point_coverages(collection, [[[38.01, -9.49]], [[40.0, -8.0], [38.0, -9.5]]])
+        assert [c["ranges"]["2t"]["values"] for c in first["coverages"]] == [[28.5]]
+        assert len(second["coverages"]) == 2
+
+    def test_max_distance(self):
+        # A point without data of its own does not get the coverage of another point
+        collection = make_point_collection([[38.0, -9.5]], ["2t"])
+        near, far = split_point_coverages(collection, [[[38.05, -9.5]], [[39.0, -9.5]]], max_distance=0.1)
+        assert len(near["coverages"]) == 1
+        assert far["coverages"] == []
+        assert len(split_point_coverages(collection, [[[39.0, -9.5]]])[0]["coverages"]) == 1
+
+
+class TestStitchCoverages:
+    def test_stitch(self):
+        south = make_collection("20240101", ["2t", "tp"], points=2)
+        north = make_collection("20240101", ["2t", "tp"], points=3)
+        for coverage in north["coverages"]:
+            coverage["domain"]["axes"]["composite"]["values"] = [[10.0 + i, 0.0, 0] for i in range(3)]
+            coverage["ranges"]["2t"]["values"] = [2.0] * 3
+        other_date = make_collection("20240102", ["2t", "tp"], points=1)
+        collections = [south, {}, north, other_date]
+        original = copy.deepcopy(collections)
+
+        stitched = stitch_coverages(collections)
+        assert collections == original
+        assert len(stitched["coverages"]) == 2
+        coverage = stitched["coverages"][0]
+        assert coverage["domain"]["axes"]["composite"]["values"] == [[0.0, 0.0, 0], [1.0, 1.0, 0]] + [
+            [10.0 + i, 0.0, 0] for i in range(3)
+        ]
+        assert coverage["ranges"]["2t"]["values"] == [1.0, 1.0, 2.0, 2.0, 2.0]
+        assert coverage["ranges"]["tp"]["shape"] == [5]
+
+    def test_empty(self):
+        assert stitch_coverages([]) == {}
+        assert stitch_coverages([{}, {}]) == {}
@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.engine import EnginePool
+
+
+class GribJump:
+    """Minimal stand-in for pygribjump.GribJump, only used to discover the axes."""
+
+    def axes(self, request, ctx=None):
+        return {
+            "class": ["od"],
+            "stream": ["oper"],
+            "type": ["fc"],
+            "expver": ["0079"],
+            "levtype": ["sfc"],
+            "domain": ["g"],
+            "date": ["20240915"],
+            "time": ["0000"],
+            "param": ["167"],
+            "step": ["0", "1"],
+        }
+
+
+class TestEnginePool:
+    def setup_method(self):
+        self.options = {
+            "axis_config": [
+                {
+                    "axis_name": "date",
+                    "transformations": [{"name": "merge", "other_axis": "time", "linkers": ["T", "00"]}],
+                },
+                {
+                    "axis_name": "values",
+                    "transformations": [
+                        {
+                            "name": "mapper",
+                            "type": "octahedral",
+                            "resolution": 1280,
+                            "axes": ["latitude", "longitude"],
+                        }
+                    ],
+                },
+                {"axis_name": "latitude", "transformations": [{"name": "reverse", "is_reverse": True}]},
+                {"axis_name": "longitude", "transformations": [{"name": "cyclic", "range": [0, 360]}]},
+                {"axis_name": "step", "transformations": [{"name": "type_change", "type": "int"}]},
+            ],
+            "compressed_axes_config": ["longitude", "latitude", "step", "date", "param"],
+            "pre_path": {"class": "od", "expver": "0079", "levtype": "sfc", "stream": "oper", "type": "fc"},
+        }
+        self.conf = PolytopeMarsConfig.model_validate({"options": self.options})
+        self.pool = EnginePool(handle_factory=GribJump)
+
+    def test_engine_reused(self):
+        first = self.pool.engine(self.conf, {"id": "1"})
+        second = self.pool.engine(self.conf, {"id": "2"})
+
+        assert first is not second
+        assert first.datacube is not second.datacube
+        assert first.datacube.gj is second.datacube.gj
+        assert second.context == {"id": "2"}
+        assert first.context == {"id": "1"}
+
+        stats = self.pool.stats()
+        assert stats["handles_created"] == 1
+        assert stats["engines_built"] == 1
+        assert stats["engines_reused"] == 1
+        assert stats["engines_cached"] == 1
+        assert self.pool._key_locks == {}
+
+        # The template does not keep the context of the caller which built it
+        assert [template.context for template in self.pool._templates.values()] == [None]
+        assert self.pool.engine(self.conf).context is None
+
+    def test_engine_per_config(self):
+        self.pool.engine(self.conf)
+        options = dict(self.options, compressed_axes_config=["longitude", "latitude"])
+        self.pool.engine(PolytopeMarsConfig.model_validate({"options": options}))
+
+        stats = self.pool.stats()
+        assert stats["handles_created"] == 1
+        assert stats["engines_built"] == 2
+
+    def test_close(self):
+        self.pool.engine(self.conf)
+        self.pool.close()
+        assert self.pool.stats()["engines_cached"] == 0
+
+        self.pool.engine(self.conf)
+        assert self.pool.stats()["engines_built"] == 2
+
+    def test_close_while_building(self):
+        started = threading.Event()
+
+        def slow_axes(handle, request, ctx=None):
+            started.set()
+            time.sleep(0.1)
+            return GribJump.axes(handle, request, ctx)
+
+        # Polytope picks its datacube backend by the class name of the handle
+        pool = EnginePool(handle_factory=type("GribJump", (GribJump,), {"axes": slow_axes}))
+        builder = threading.Thread(target=pool.engine, args=(self.conf,))
+        builder.start()
+        assert started.wait(5)
+        pool.close()
+        pool.engine(self.conf)
+        builder.join()
+
+        assert pool.stats()["engines_built"] == 1
+        assert pool._key_locks == {}
+
+    def test_unknown_datacube(self):
+        conf = PolytopeMarsConfig.model_validate({"datacube": {"type": "xarray"}})
+        with pytest.raises(NotImplementedError):
+            self.pool.engine(conf)
@@ -0,0 +1,69 @@
+import copy
+
+
+class TestExtractMany:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "feature": {
+                "type": "timeseries",
+                "points": [[38, -9.5]],
+                "time_axis": "step",
+                "range": {"start": 0, "end": 6},
+            },
+        }
+
+    def with_points(self, points):
+        request = copy.deepcopy(self.request)
+        request["feature"]["points"] = points
+        return request
+
+    def test_grouped(self, fake_polytope_mars):
+        requests = [
+            self.with_points([[38, -9.5]]),
+            self.with_points([[51.5, 0.1], [10, 20]]),
+            self.with_points([[10, 20]]),
+        ]
+        polytope_mars, gribjump = fake_polytope_mars()
+
+        results = polytope_mars.extract_many(requests)
+        assert gribjump.extract_calls == 1
+        assert polytope_mars.metrics.subrequests == 1
+
+        for request, result in zip(requests, results):
+            assert result == polytope_mars.extract(copy.deepcopy(request))
+        assert [len(result["coverages"]) for result in results] == [1, 2, 1]
+
+    def test_longitude_first(self, fake_polytope_mars):
+        requests = [self.with_points([[-9.5, 38]]), self.with_points([[20, 10]])]
+        for request in requests:
+            request["feature"]["axes"] = ["longitude", "latitude"]
+        polytope_mars, gribjump = fake_polytope_mars()
+
+        results = polytope_mars.extract_many(requests)
+        assert gribjump.extract_calls == 1
+        for request, result in zip(requests, results):
+            assert result == polytope_mars.extract(copy.deepcopy(request))
+
+    def test_incompatible_requests(self, fake_polytope_mars):
+        other_param = self.with_points([[10, 20]])
+        other_param["param"] = "167"
+        boundingbox = self.with_points([[38, -9.5]])
+        boundingbox["step"] = "0"
+        boundingbox["feature"] = {"type": "boundingbox", "points": [[38, -9.5], [38.2, -9.3]]}
+        requests = [self.with_points([[38, -9.5]]), other_param, boundingbox, self.with_points([[10, 20]])]
+        polytope_mars, gribjump = fake_polytope_mars()
+
+        results = polytope_mars.extract_many(requests)
+        assert gribjump.extract_calls == 3
+        assert results[1] == polytope_mars.extract(copy.deepcopy(other_param))
+        assert results[2]["domainType"] != results[0]["domainType"]
+        assert requests[0]["feature"]["points"] == [[38, -9.5]]
@@ -0,0 +1,115 @@
+from polytope_mars.api import PolytopeMars, shape_cache
+from polytope_mars.utils.metrics import ExtractMetrics, MetricsRegistry
+
+
+class RecordingPolytopeMars(PolytopeMars):
+    """Answers each sub-request with a single point coverage and records it in the metrics."""
+
+    def retrieve_data(self, request, feature_type, feature):
+        self.metrics.count("subrequests")
+        with self.metrics.timer("polytope"):
+            coverage = {
+                "type": "CoverageCollection",
+                "domainType": "MultiPoint",
+                "coverages": [
+                    {
+                        "mars:metadata": {"date": request["date"]},
+                        "domain": {"axes": {"t": {"values": [request["date"]]}}},
+                        "ranges": {"2t": {"values": [1.0]}},
+                    }
+                ],
+            }
+        self.metrics.count("points", 1)
+        return coverage
+
+
+class TestMetrics:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "enfo",
+            "type": "pf",
+            "date": "20240101/to/20240103",
+            "time": "0000",
+            "levtype": "sfc",
+            "expver": "0001",
+            "domain": "g",
+            "param": "167",
+            "step": "0",
+            "feature": {
+                "type": "polygon",
+                "shape": [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]],
+            },
+        }
+
+    def test_extract_metrics(self):
+        observed = []
+        polytope_mars = RecordingPolytopeMars(
+            {"polygonrules": {"max_area": 1}, "metrics": {"output_bytes": True}}, metrics_hook=observed.append
+        )
+        polytope_mars.extract(self.request)
+
+        metrics = polytope_mars.metrics.as_dict()
+        assert observed == [polytope_mars.metrics]
+        assert metrics["subrequests"] == 3
+        assert metrics["points"] == 3
+        assert metrics["output_bytes"] > 0
+        assert {"prepare", "polytope", "merge", "total"} <= set(metrics["durations"])
+
+    def test_extract_json_iter_output_bytes(self):
+        polytope_mars = RecordingPolytopeMars({"polygonrules": {"max_area": 1}})
+        chunks = list(polytope_mars.extract_json_iter(self.request))
+        assert polytope_mars.metrics.output_bytes == len("".join(chunks).encode())
+
+    def test_failing_hook(self):
+        def hook(metrics):
+            raise RuntimeError("hook failed")
+
+        polytope_mars = RecordingPolytopeMars({"polygonrules": {"max_area": 1}}, metrics_hook=hook)
+        assert polytope_mars.extract(self.request)["coverages"]
+
+    def test_shape_cache_hits(self):
+        shape_cache.clear()
+        request = {k: v for k, v in self.request.items() if k != "feature"}
+        polytope_mars = PolytopeMars({})
+        polytope_mars._create_base_shapes(dict(request), "boundingbox")
+        assert polytope_mars.metrics.cache_hits == {}
+        polytope_mars._create_base_shapes(dict(request), "boundingbox")
+        assert polytope_mars.metrics.cache_hits["shapes"] == len(request)
+
+    def test_update(self):
+        metrics = ExtractMetrics()
+        metrics.add_duration("polytope", 1.0)
+        metrics.hit("shapes")
+        metrics.update({"durations": {"polytope": 0.5}, "subrequests": 1, "cache_hits": {"shapes": 2}})
+        assert metrics.durations == {"polytope": 1.5}
+        assert metrics.subrequests == 1
+        assert metrics.cache_hits == {"shapes": 3}
+
+
+class TestMetricsRegistry:
+    def test_observe(self):
+        registry = MetricsRegistry(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 5.0):
+            metrics = ExtractMetrics()
+            metrics.add_duration("polytope", seconds)
+            metrics.count("points", 10)
+            registry(metrics)
+
+        snapshot = registry.collect()
+        assert snapshot["histograms"]["polytope"]["buckets"] == {0.1: 1, 1.0: 2}
+        assert snapshot["histograms"]["polytope"]["count"] == 3
+        assert snapshot["counters"][("points", ())] == 30
+        assert snapshot["counters"][("extractions", ())] == 3
+
+    def test_render(self):
+        registry = MetricsRegistry(buckets=(1.0,))
+        metrics = ExtractMetrics()
+        metrics.add_duration("covjson", 0.5)
+        metrics.hit("shapes", 4)
+        registry.observe(metrics)
+
+        text = registry.render()
+        assert 'polytope_mars_stage_duration_seconds_bucket{stage="covjson",le="1.0"} 1' in text
+        assert 'polytope_mars_stage_duration_seconds_bucket{stage="covjson",le="+Inf"} 1' in text
+        assert 'polytope_mars_cache_hits_total{cache="shapes"} 4' in text
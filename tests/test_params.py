@@ -0,0 +1,27 @@
+import pytest
+
+from polytope_mars.api import PolytopeMars
+from polytope_mars.utils.params import ParamResolver, param_resolver
+
+
+class TestParamResolver:
+    def test_resolve_names(self):
+        resolver = ParamResolver("ecmwf")
+        assert resolver.resolve(["2t", "10u", "tp"]) == ["167", "165", "228228"]
+
+    def test_ids_not_loaded(self):
+        resolver = ParamResolver("ecmwf")
+        assert resolver.resolve(["167", "165"]) == ["167", "165"]
+        assert resolver.resolve(["ALL"]) == ["ALL"]
+        assert resolver._ids is None
+
+    def test_mixed_names_and_ids(self):
+        assert ParamResolver("ecmwf").resolve(["167", "10u"]) == ["167", "165"]
+
+    def test_unknown_name(self):
+        with pytest.raises(KeyError):
+            ParamResolver("ecmwf").resolve(["not_a_param"])
+
+    def test_shared_between_instances(self):
+        assert param_resolver("ecmwf") is param_resolver("ecmwf")
+        assert PolytopeMars({}).params is PolytopeMars({}).params
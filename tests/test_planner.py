@@ -0,0 +1,131 @@
+import copy
+import json
+
+import pytest
+
+from polytope_mars.utils.planner import plan_subrequests, request_values, split_value
+
+
+def sorted_coverages(collection):
+    return sorted(json.dumps(coverage, sort_keys=True) for coverage in collection["coverages"])
+
+
+class TestPlanner:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "enfo",
+            "type": "pf",
+            "date": "20240101/to/20240110",
+            "time": "0000",
+            "levtype": "sfc",
+            "expver": "0001",
+            "domain": "g",
+            "param": "167/168/169",
+            "number": "1/to/50",
+            "step": "0/to/23",
+        }
+
+    def test_split_value(self):
+        assert split_value("param", "167/168/169", 2) == ["167/168", "169"]
+        assert split_value("param", "167/168/169", 10) == ["167", "168", "169"]
+        assert split_value("step", "0/to/10", 3) == ["0/to/3", "4/to/7", "8/to/10"]
+        assert split_value("number", "1/to/2", 5) == ["1", "2"]
+        assert split_value("date", "20240130/to/20240202", 2) == ["20240130/to/20240131", "20240201/to/20240202"]
+        assert split_value("levelist", "500/to/1000", 3, {"levtype": "pl"}) == [
+            "500/to/799",
+            "800/to/924",
+            "925/to/1000",
+        ]
+        assert split_value("step", "0/to/12/by/6", 3) == ["0/to/12/by/6"]
+        assert split_value("step", "1h/to/6h", 3) == ["1h/to/6h"]
+        assert split_value("param", "167", 3) == ["167"]
+
+    def test_fits(self):
+        subrequests = plan_subrequests(self.request, 100, request_values(self.request, 100))
+        assert subrequests == [self.request]
+
+    def test_equal_cost(self):
+        total = request_values(self.request, 100)
+        target = total / 25
+        subrequests = plan_subrequests(self.request, 100, target)
+
+        costs = [request_values(subrequest, 100) for subrequest in subrequests]
+        assert max(costs) <= target
+        assert max(costs) <= 1.5 * min(costs)
+        assert sum(costs) == total
+        # Dates are split first and sub-requests are ordered by date
+        assert [subrequest["date"] for subrequest in subrequests[:2]] == ["20240101", "20240101"]
+        assert all(subrequest["param"] == "167/168/169" for subrequest in subrequests)
+
+    def test_fixed_axes(self):
+        request = dict(self.request, date="20240101", number="1")
+        subrequests = plan_subrequests(request, 100, 100 * 24, fixed_axes=["step"])
+        assert [subrequest["param"] for subrequest in subrequests] == ["167", "168", "169"]
+        assert all(subrequest["step"] == "0/to/23" for subrequest in subrequests)
+
+    def test_cannot_split(self):
+        request = dict(self.request, date="20240101", number="1", param="167")
+        assert plan_subrequests(request, 1000, 10, fixed_axes=["step"]) == [request]
+
+    @pytest.mark.parametrize(
+        "feature",
+        [
+            {
+                "type": "timeseries",
+                "points": [[38, -9.5], [40, -8]],
+                "time_axis": "step",
+                "range": {"start": 0, "end": 12},
+            },
+            {"type": "boundingbox", "points": [[38, -10], [40, -8]]},
+        ],
+    )
+    def test_extract(self, feature, fake_polytope_mars):
+        request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "feature": feature,
+        }
+        if feature["type"] == "boundingbox":
+            request["step"] = "0/to/5"
+        polytope_mars, _ = fake_polytope_mars()
+        expected = polytope_mars.extract(copy.deepcopy(request))
+
+        polytope_mars, gribjump = fake_polytope_mars(config={"cost": {"target_values": 20}})
+        coverage = polytope_mars.extract(copy.deepcopy(request))
+
+        assert polytope_mars.split_request
+        assert gribjump.extract_calls == polytope_mars.metrics.subrequests > 1
+        assert sorted_coverages(coverage) == sorted_coverages(expected)
+
+    def test_extract_json_iter(self, fake_polytope_mars):
+        request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0/1",
+            "feature": {"type": "polygon", "shape": [[38, -10], [40, -10], [40, -8], [38, -8], [38, -10]]},
+        }
+        config = {"cost": {"target_values": 100}}
+        polytope_mars, _ = fake_polytope_mars(config=config)
+        expected = polytope_mars.extract(copy.deepcopy(request))
+        assert polytope_mars.split_request
+
+        # Sub-requests split by param are merged before they are streamed, as in extract
+        polytope_mars, _ = fake_polytope_mars(config=config)
+        streamed = json.loads("".join(polytope_mars.extract_json_iter(copy.deepcopy(request))))
+        assert polytope_mars.metrics.subrequests > 2
+        assert streamed == expected
@@ -0,0 +1,66 @@
+import pytest
+
+from polytope_mars.utils.ranges import (
+    ValueRange,
+    date_range,
+    integer_range,
+    parse_value,
+    step_range,
+    time_range,
+)
+
+
+class TestRanges:
+    def test_parse_value(self):
+        value = parse_value("0/to/240/by/6")
+        assert value.is_range
+        assert (value.start, value.end, value.by) == ("0", "240", "6")
+
+        value = parse_value("20240101/to/20240131")
+        assert value.is_range and value.by is None
+
+        value = parse_value("0/6/12")
+        assert not value.is_range
+        assert value.elements == ("0", "6", "12")
+        assert parse_value(5).elements == ("5",)
+        assert not parse_value("0/to/6/12").is_range
+
+    def test_parse_value_cached(self):
+        assert parse_value("1/to/10") is parse_value("1/to/10")
+
+    def test_lazy_length(self):
+        steps = step_range("0h", "876000h", "1s")
+        assert len(steps) == 876000 * 3600 + 1
+        assert steps[1] == "0h0m"
+        assert steps[-1] == "876000h0m"
+
+        dates = date_range("19500101", "21001231")
+        assert len(dates) == 55152
+        assert dates[0] == "19500101"
+        assert dates[-1] == "21001231"
+
+    def test_expand(self):
+        assert list(integer_range("1", "10", "3")) == ["1", "4", "7", "10"]
+        assert list(date_range("2024-02-27", "20240302")) == [
+            "20240227",
+            "20240228",
+            "20240229",
+            "20240301",
+            "20240302",
+        ]
+        assert list(date_range("20240101", "20240110", "4")) == ["20240101", "20240105", "20240109"]
+        assert list(time_range("0000", "1800", "0600")) == ["00:00:00", "06:00:00", "12:00:00", "18:00:00"]
+        assert list(time_range("0", "0130", "0030")) == ["00:00:00", "00:30:00", "01:00:00", "01:30:00"]
+        assert list(time_range("00:00:00", "02:00:00")) == ["00:00:00", "01:00:00", "02:00:00"]
+        assert list(step_range("0", "12", "6")) == ["0", "6", "12"]
+        assert list(step_range("1h", "2h", "30m")) == ["1h0m", "1h30m", "2h0m"]
+
+    def test_empty_and_invalid(self):
+        assert len(integer_range("5", "1")) == 0
+        assert list(date_range("20240105", "20240101")) == []
+        with pytest.raises(ValueError):
+            ValueRange(0, 10, 0)
+        with pytest.raises(ValueError):
+            step_range("1x", "2h")
+        with pytest.raises(ValueError):
+            date_range("2024", "20240101")
@@ -0,0 +1,138 @@
+import asyncio
+import copy
+import json
+
+import pytest
+
+from polytope_mars.config import ResultCacheConfig
+from polytope_mars.utils import results
+from polytope_mars.utils.canonical import canonical_request
+from polytope_mars.utils.results import (
+    DiskResultStore,
+    MemoryResultStore,
+    ResultCache,
+    get_result_cache,
+    time_to_live,
+)
+
+
+class TestResultCache:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0/to/3",
+            "feature": {
+                "type": "timeseries",
+                "points": [[38.0, -9.5]],
+                "time_axis": "step",
+            },
+        }
+        get_result_cache(ResultCacheConfig(backend="memory")).clear()
+
+    def test_canonical_request(self):
+        request = json.loads(json.dumps(self.request))
+        request = dict(reversed(list(request.items())))
+        request["step"] = "0 / TO / 3"
+        request["feature"]["points"] = [[38, -9.5000000001]]
+        assert canonical_request(request) == canonical_request(self.request)
+
+        request["feature"]["points"] = [[38.01, -9.5]]
+        assert canonical_request(request) != canonical_request(self.request)
+
+    def test_time_to_live(self):
+        config = ResultCacheConfig(default_ttl=60, ttl={"climate-dt": 3600, "oper": 0})
+        assert time_to_live(self.request, config) == 0
+        assert time_to_live(dict(self.request, stream="enfo"), config) == 60
+        assert time_to_live(dict(self.request, dataset="climate-dt"), config) == 3600
+        assert time_to_live(dict(self.request, stream="enfo", date="-1"), config) == 0
+
+    @pytest.mark.parametrize("backend", ["memory", "disk"])
+    def test_store(self, backend, tmp_path, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(results.time, "time", lambda: now[0])
+        if backend == "disk":
+            store = DiskResultStore(str(tmp_path / "results.sqlite"), 2)
+        else:
+            store = MemoryResultStore(2)
+        cache = ResultCache(store)
+
+        cache.put("a", {"coverages": [1]}, 10)
+        cache.put("b", {"coverages": [2]}, 100)
+        cache.put("c", {"coverages": [3]}, 0)
+        assert cache.get("a") == {"coverages": [1]}
+        assert cache.get("a") is not cache.get("a")
+        assert cache.get("c") is None
+
+        # The least recently used result is evicted
+        now[0] += 1
+        cache.get("a")
+        now[0] += 1
+        cache.put("d", {"coverages": [4]}, 100)
+        assert cache.get("b") is None
+        assert len(store) == 2
+
+        # Results expire after their time to live
+        now[0] += 10
+        assert cache.get("a") is None
+        assert cache.get("d") == {"coverages": [4]}
+        assert cache.stats() == {"hits": 5, "misses": 3, "stores": 3, "size": 1}
+
+    def test_disk_shared(self, tmp_path):
+        path = str(tmp_path / "cache" / "results.sqlite")
+        ResultCache(DiskResultStore(path, 10)).put("a", {"coverages": [1]}, 100)
+        assert ResultCache(DiskResultStore(path, 10)).get("a") == {"coverages": [1]}
+
+    def test_extract(self, fake_polytope_mars):
+        config = {"results": {"backend": "memory"}}
+        polytope_mars, gribjump = fake_polytope_mars(config=config)
+        coverage = polytope_mars.extract(copy.deepcopy(self.request))
+        assert gribjump.extract_calls == 1
+
+        # Equivalent requests are answered from the cache by any instance alike
+        request = copy.deepcopy(self.request)
+        request["param"] = " 167/169"
+        polytope_mars, gribjump = fake_polytope_mars(config=config)
+        assert polytope_mars.extract(json.dumps(request)) == coverage
+        assert gribjump.extract_calls == 0
+        assert polytope_mars.metrics.cache_hits == {"results": 1}
+        assert polytope_mars.result_cache.stats()["hits"] == 1
+
+        assert asyncio.run(polytope_mars.aextract(copy.deepcopy(self.request))) == coverage
+        assert gribjump.extract_calls == 0
+
+        # Other requests and other configurations are not
+        polytope_mars.extract(dict(copy.deepcopy(self.request), param="167"))
+        assert gribjump.extract_calls == 1
+        polytope_mars, gribjump = fake_polytope_mars(config=dict(config, coverageconfig={"param_db": "other"}))
+        assert polytope_mars._result_context != fake_polytope_mars(config=config)[0]._result_context
+
+    def test_ranges_not_shared_with_lists(self, fake_polytope_mars):
+        # A step range with an interval leaves out its end, so it is not the list it spells out
+        polytope_mars, gribjump = fake_polytope_mars(config={"results": {"backend": "memory"}})
+        polytope_mars.extract(dict(copy.deepcopy(self.request), step="0/to/12/by/3"))
+        polytope_mars.extract(dict(copy.deepcopy(self.request), step="0/3/6/9/12"))
+        assert gribjump.extract_calls == 2
+        assert "results" not in polytope_mars.metrics.cache_hits
+
+    def test_ttl(self, fake_polytope_mars):
+        polytope_mars, gribjump = fake_polytope_mars(config={"results": {"backend": "memory", "ttl": {"oper": 0}}})
+        polytope_mars.extract(copy.deepcopy(self.request))
+        polytope_mars.extract(copy.deepcopy(self.request))
+        assert gribjump.extract_calls == 2
+        assert "results" not in polytope_mars.metrics.durations
+
+    def test_aextract_disk(self, fake_polytope_mars, tmp_path):
+        config = {"results": {"backend": "disk", "path": str(tmp_path / "results.sqlite")}}
+        polytope_mars, gribjump = fake_polytope_mars(config=config)
+        coverage = asyncio.run(polytope_mars.aextract(copy.deepcopy(self.request)))
+        assert asyncio.run(polytope_mars.aextract(copy.deepcopy(self.request))) == coverage
+        assert gribjump.extract_calls == 1
+        assert polytope_mars.metrics.cache_hits == {"results": 1}
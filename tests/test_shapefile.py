@@ -1,8 +1,20 @@
 import json
+import os
 
+import geopandas as gpd
+import numpy as np
 import pytest
+from shapely.geometry import MultiPolygon, Polygon
 
 from polytope_mars.api import PolytopeMars
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.features.shpfile import (
+    Shapefile,
+    get_coords,
+    load_shapefile,
+    select_geometries,
+    shapefile_cache,
+)
 
 # If using a local FDB need to set FDB_HOME and ECCODES_DEFINITIO_PATH
 
@@ -77,3 +89,87 @@ class TestFeatureFactory:
 
         coverage = PolytopeMars(self.config, self.options).extract(self.request)  # noqa: E501
         print(coverage)
+
+
+class TestShapefileCache:
+    def setup_method(self):
+        shapefile_cache.clear()
+        shapefile_cache.resize(16)
+        self.geometries = [
+            MultiPolygon([Polygon([(36, -9.5), (36, -6.5), (42, -6.5)]), Polygon([(43, -9), (44, -9), (44, -8)])]),
+            Polygon([(50, 0), (50, 2), (52, 2), (52, 0)]),
+        ]
+
+    def write(self, path, geometries):
+        gpd.GeoDataFrame(
+            {"name": [f"region{i}" for i in range(len(geometries))]}, geometry=geometries, crs="EPSG:4326"
+        ).to_file(path)
+        return str(path)
+
+    def test_polygons(self, tmp_path):
+        data = load_shapefile(self.write(tmp_path / "regions.shp", self.geometries))
+        assert len(data) == 2
+        for index, geometry in enumerate(data.df.geometry):
+            polygons = data.polygons(index)
+            assert all(isinstance(polygon, np.ndarray) for polygon in polygons)
+            assert [polygon.tolist() for polygon in polygons] == get_coords(geometry)
+
+    def test_cache(self, tmp_path):
+        path = self.write(tmp_path / "regions.shp", self.geometries)
+        data = load_shapefile(path)
+        assert load_shapefile(os.path.relpath(path)) is data
+        assert shapefile_cache.stats()["hits"] == 1
+
+        # Rewriting the file invalidates its entry
+        self.write(path, self.geometries[1:])
+        os.utime(path, ns=(0, data.stamp[0] + 10**9))
+        reloaded = load_shapefile(path)
+        assert reloaded is not data
+        assert len(reloaded) == 1
+        assert len(shapefile_cache) == 1
+
+        other = load_shapefile(self.write(tmp_path / "other.shp", self.geometries))
+        shapefile_cache.resize(1)
+        assert load_shapefile(path) is not reloaded
+        assert load_shapefile(path) is not other
+
+    def test_feature(self, tmp_path):
+        path = self.write(tmp_path / "regions.shp", self.geometries)
+        first = Shapefile({"type": "shapefile", "file": path}, PolytopeMarsConfig())
+        second = Shapefile({"type": "shapefile", "file": path}, PolytopeMarsConfig())
+        assert first.data is second.data
+        union = first.get_shapes()[0]
+        assert [polygon._points for polygon in union._shapes] == get_coords(first.df.geometry.iloc[0])
+
+    def test_select(self, tmp_path):
+        geometries = [Polygon([(i, j), (i + 1, j), (i + 1, j + 1), (i, j + 1)]) for i in range(50) for j in range(60)]
+        df = gpd.GeoDataFrame(
+            {"name": [f"region{i}" for i in range(3000)], "code": [i % 7 for i in range(3000)]},
+            geometry=geometries,
+            crs="EPSG:4326",
+        )
+        df.to_file(tmp_path / "grid.shp")
+        data = load_shapefile(str(tmp_path / "grid.shp"))
+
+        assert data.select({"name": "region1234"}).tolist() == [1234]
+        assert data.select({"name": ["region3", "region1"]}).tolist() == [1, 3]
+        assert data.select({"code": 3}).tolist() == data.select({"code": "3"}).tolist() == list(range(3, 3000, 7))
+        assert data.select({"code": 3, "name": ["region3", "region4"]}).tolist() == [3]
+        assert data.select(contains=[10.5, 20.5]).tolist() == [10 * 60 + 20]
+        assert data.select({"code": 0}, contains=[10.5, 20.5]).tolist() == []
+        assert data.select({"name": "missing"}).tolist() == []
+        with pytest.raises(ValueError):
+            data.select({"missing": 1})
+
+        assert select_geometries(data).tolist() == [0]
+        with pytest.raises(ValueError):
+            select_geometries(data, {"name": "missing"})
+
+        feature = Shapefile(
+            {"type": "shapefile", "file": str(tmp_path / "grid.shp"), "filter": {"name": ["region7", "region8"]}},
+            PolytopeMarsConfig(),
+        )
+        union = feature.get_shapes()[0]
+        assert [polygon._points for polygon in union._shapes] == [
+            coords for position in (7, 8) for coords in get_coords(data.df.geometry.iloc[position])
+        ]
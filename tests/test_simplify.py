@@ -0,0 +1,92 @@
+import copy
+import json
+
+import numpy as np
+import shapely
+from fake_gribjump import make_options
+from shapely.geometry import Polygon
+
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.utils.cost import GridModel, get_grid_model
+from polytope_mars.utils.simplify import grid_spacing, simplify_polygon
+
+
+def wavy_polygon(vertices=600, seed=0):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radius = 2 + 0.3 * np.sin(5 * angles) + rng.normal(0, 0.005, vertices)
+    shape = np.c_[40 + radius * np.sin(angles), -5 + radius * np.cos(angles)].tolist()
+    return shape + [shape[0]]
+
+
+class TestSimplify:
+    def setup_method(self):
+        self.grid = get_grid_model(PolytopeMarsConfig(options=make_options("sfc")).options)
+        self.shape = wavy_polygon()
+
+    def selected(self, shape, lat_index=0):
+        coords = np.asarray(shape)[:, [lat_index, 1 - lat_index]]
+        lats, lons = self.grid.box_coordinates(37, 43, -8, -2)
+        return np.flatnonzero(shapely.intersects_xy(Polygon(coords), lats, lons))
+
+    def test_box_coordinates(self):
+        lats, lons = self.grid.box_coordinates(35, 45, -10, 0)
+        assert len(lats) == len(lons)
+        assert abs(len(lats) - self.grid.box_points(35, 45, -10, 0)) < 100
+        assert lons.min() >= -10 and lons.max() <= 0
+        assert 35 <= lats.min() and lats.max() <= 45
+
+        # Without the mapper, rows are evenly spaced from the west edge of the grid
+        even = GridModel(self.grid.latitudes, self.grid.row_points)
+        even_lats, even_lons = even.box_coordinates(35, 45, 10.01, 19.99)
+        lats, lons = self.grid.box_coordinates(35, 45, 10.01, 19.99)
+        np.testing.assert_allclose(even_lats, lats)
+        np.testing.assert_allclose(even_lons, lons)
+
+    def test_grid_spacing(self):
+        spacing = grid_spacing(self.grid, 35, 45, -10, 0)
+        assert 0.05 < spacing < 0.08
+        assert grid_spacing(self.grid, 0, 0, -10, 0) > 0
+
+    def test_simplify(self):
+        simplified = simplify_polygon(self.shape, self.grid, 2.0)
+        assert len(simplified) < len(self.shape) / 10
+        assert simplified[0] == simplified[-1]
+        assert np.array_equal(self.selected(simplified), self.selected(self.shape))
+
+        # Longitude first
+        reversed_shape = [[lon, lat] for lat, lon in self.shape]
+        simplified = simplify_polygon(reversed_shape, self.grid, 2.0, lat_index=1)
+        assert len(simplified) < len(self.shape) / 10
+        assert np.array_equal(self.selected(simplified, 1), self.selected(reversed_shape, 1))
+
+    def test_unchanged(self):
+        assert simplify_polygon(self.shape, self.grid, 0) is self.shape
+        triangle = [[36, -9.5], [36, -6.5], [42, -6.5], [36, -9.5]]
+        assert simplify_polygon(triangle, self.grid, 2.0) is triangle
+        bowtie = [[36, -9], [40, -5], [40, -9], [38, -7.1], [36, -5], [36, -9]]
+        assert simplify_polygon(bowtie, self.grid, 2.0) is bowtie
+
+    def test_extract(self, fake_polytope_mars):
+        request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167",
+            "step": "0",
+            "feature": {"type": "polygon", "shape": self.shape},
+        }
+        polytope_mars, _ = fake_polytope_mars()
+        expected = polytope_mars.extract(copy.deepcopy(request))
+
+        polytope_mars, _ = fake_polytope_mars(config={"polygonrules": {"simplify_tolerance": 2.0}})
+        coverage = polytope_mars.extract(copy.deepcopy(request))
+        assert json.dumps(coverage, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+        _, _, feature = polytope_mars._prepare(copy.deepcopy(request))
+        assert len(feature.simplified_shape()[0]) < len(self.shape) / 10
@@ -102,6 +102,13 @@ class TestStepCounter:
         # Mixed step definitions
         assert count_steps("0/1/2/3/6/9/12/18/24") == 9
 
+    def test_long_ranges(self):
+        """Test that long ranges are counted without expanding them."""
+        assert count_steps("0/to/876000/by/1") == 876001  # 100 years of hourly steps
+        assert count_steps("0h/to/876000h/by/1s") == 876000 * 3600 + 1
+        assert count_steps("0d/to/36500d/by/1m") == 36500 * 1440 + 1
+        assert count_steps("0/to/6/by/4") == 2  # The end is not on a step
+
     def test_invalid_formats_gracefully_handled(self):
         """Test that the function handles unusual but parseable inputs."""
         # These should still work with our implementation
@@ -0,0 +1,69 @@
+import time
+
+from polytope_mars.api import PolytopeMars
+
+
+class DelayedPolytopeMars(PolytopeMars):
+    """Answers each sub-request with its date, later dates finishing first."""
+
+    def retrieve_data(self, request, feature_type, feature):
+        time.sleep((20240110 - int(request["date"])) * 0.01)
+        return {"date": request["date"], "number": request.get("number")}
+
+
+class TestSubrequests:
+    def setup_method(self):
+        self.request = {
+            "class": "od",
+            "stream": "enfo",
+            "type": "pf",
+            "date": "20240101/to/20240105",
+            "time": "0000",
+            "levtype": "sfc",
+            "expver": "0001",
+            "domain": "g",
+            "param": "167",
+            "step": "0",
+        }
+
+    def test_split_per_date(self):
+        subrequests = PolytopeMars({})._split_subrequests(self.request)
+        assert [r["date"] for r in subrequests] == ["20240101", "20240102", "20240103", "20240104", "20240105"]
+        assert self.request["date"] == "20240101/to/20240105"
+
+    def test_split_per_number(self):
+        self.request["date"] = "20240101/20240102"
+        self.request["number"] = "1/to/20"
+        subrequests = PolytopeMars({})._split_subrequests(self.request)
+        assert len(subrequests) == 40
+        assert (subrequests[0]["date"], subrequests[0]["number"]) == ("20240101", "1")
+        assert (subrequests[-1]["date"], subrequests[-1]["number"]) == ("20240102", "20")
+
+        self.request["number"] = "1/to/5"
+        subrequests = PolytopeMars({})._split_subrequests(self.request)
+        assert len(subrequests) == 2
+        assert subrequests[0]["number"] == "1/to/5"
+
+    def test_parallel_order(self):
+        polytope_mars = DelayedPolytopeMars({"execution": {"max_parallel_subrequests": 4}})
+        subrequests = polytope_mars._split_subrequests(self.request)
+        coverages = polytope_mars._retrieve_subrequests(subrequests, "polygon", None)
+        assert [c["date"] for c in coverages] == [r["date"] for r in subrequests]
+
+    def test_extract_iter(self):
+        self.request["feature"] = {
+            "type": "polygon",
+            "shape": [[0.0, 0.0], [0.0, 1.0], [1.0, 1.0], [1.0, 0.0], [0.0, 0.0]],
+        }
+        polytope_mars = DelayedPolytopeMars(
+            {"polygonrules": {"max_area": 1}, "execution": {"max_parallel_subrequests": 2}}
+        )
+        coverages = polytope_mars.extract_iter(self.request)
+        assert next(coverages)["date"] == "20240101"
+        assert [c["date"] for c in coverages] == ["20240102", "20240103", "20240104", "20240105"]
+
+    def test_serial_order(self):
+        polytope_mars = DelayedPolytopeMars({})
+        subrequests = polytope_mars._split_subrequests(self.request)
+        coverages = polytope_mars._retrieve_subrequests(subrequests, "polygon", None)
+        assert [c["date"] for c in coverages] == [r["date"] for r in subrequests]
@@ -0,0 +1,111 @@
+import asyncio
+import copy
+import json
+
+import numpy as np
+import pytest
+from fake_gribjump import make_options
+from shapely.geometry import Polygon
+
+from polytope_mars.config import PolytopeMarsConfig
+from polytope_mars.utils.cost import get_grid_model
+from polytope_mars.utils.tiles import band_edges, tile_feature
+
+
+class TestTiles:
+    def setup_method(self):
+        self.grid = get_grid_model(PolytopeMarsConfig(options=make_options("sfc")).options)
+        self.request = {
+            "class": "od",
+            "stream": "oper",
+            "type": "fc",
+            "date": "20240915",
+            "time": "1200",
+            "levtype": "sfc",
+            "expver": "0079",
+            "domain": "g",
+            "param": "167/169",
+            "step": "0",
+        }
+        self.features = {
+            "boundingbox": {"type": "boundingbox", "points": [[35, -10], [45, 0]]},
+            "polygon": {
+                "type": "polygon",
+                "shape": [[36, -9.5], [36, -6.5], [42, -6.5], [43.5, -8.5], [42, -9.5], [36, -9.5]],
+            },
+        }
+
+    def test_band_edges(self):
+        edges = band_edges(self.grid, 35, 45, -10, 0, 2000, 64)
+        assert edges[0] == 35 and edges[-1] == 45
+        assert edges == sorted(edges)
+
+        # Edges lie between rows and the bands hold roughly the same number of points
+        rows = self.grid.latitudes
+        for edge in edges[1:-1]:
+            assert np.min(np.abs(rows - edge)) > 0.01
+        points = [self.grid.box_points(lower, upper, -10, 0) for lower, upper in zip(edges[:-1], edges[1:])]
+        assert len(points) == 6
+        assert max(points) <= 1.2 * min(points)
+
+        assert band_edges(self.grid, 35, 45, -10, 0, 2000, 3) == band_edges(self.grid, 35, 45, -10, 0, 4000, 64)
+        assert band_edges(self.grid, 35, 45, -10, 0, 10**6, 64) == []
+
+    def test_tile_feature(self, fake_polytope_mars):
+        polytope_mars, _ = fake_polytope_mars()
+        request, feature_type, feature = polytope_mars._prepare(
+            dict(self.request, feature=copy.deepcopy(self.features["polygon"]))
+        )
+        tiles = tile_feature(feature_type, feature, self.grid, 1000)
+        assert len(tiles) == len(band_edges(self.grid, 36, 43.5, -9.5, -6.5, 1000, 64)) - 1 > 1
+        area = sum(Polygon(piece).area for tile in tiles for piece in tile.shape)
+        assert area == pytest.approx(Polygon(feature.shape[0]).area)
+        assert feature.shape[0][0] == [36, -9.5]
+        for tile in tiles:
+            lats = [point[0] for piece in tile.shape for point in piece]
+            assert 36 <= min(lats) and max(lats) <= 43.5
+
+        assert tile_feature("timeseries", feature, self.grid, 1000) == [feature]
+
+    @pytest.mark.parametrize("feature", ["boundingbox", "polygon"])
+    @pytest.mark.parametrize(
+        "config",
+        [
+            {"tiling": {"tile_points": 1000}},
+            {"tiling": {"tile_points": 1000}, "execution": {"max_parallel_subrequests": 3}},
+            {"tiling": {"tile_points": 1000}, "cost": {"target_values": 5000}},
+        ],
+    )
+    def test_extract(self, feature, config, fake_polytope_mars):
+        request = dict(self.request, feature=self.features[feature])
+        polytope_mars, _ = fake_polytope_mars()
+        expected = polytope_mars.extract(copy.deepcopy(request))
+
+        polytope_mars, gribjump = fake_polytope_mars(config=config)
+        coverage = polytope_mars.extract(copy.deepcopy(request))
+
+        assert len(polytope_mars.tiles) > 1
+        assert gribjump.extract_calls == polytope_mars.metrics.subrequests >= len(polytope_mars.tiles)
+        assert json.dumps(coverage, sort_keys=True) == json.dumps(expected, sort_keys=True)
+
+    def test_extract_iter(self, fake_polytope_mars):
+        request = dict(self.request, step="0/1", feature=self.features["boundingbox"])
+        polytope_mars, _ = fake_polytope_mars()
+        expected = polytope_mars.extract(copy.deepcopy(request))
+
+        polytope_mars, _ = fake_polytope_mars(
+            config={"tiling": {"tile_points": 2000}, "cost": {"target_values": 30000}}
+        )
+        coverages = list(polytope_mars.extract_iter(copy.deepcopy(request)))
+        assert len(coverages) == 2
+        assert [c["coverages"] for c in coverages] == [expected["coverages"][:1], expected["coverages"][1:]]
+
+    def test_aextract(self, fake_polytope_mars):
+        request = dict(self.request, feature=self.features["boundingbox"])
+        polytope_mars, _ = fake_polytope_mars()
+        expected = polytope_mars.extract(copy.deepcopy(request))
+
+        polytope_mars, gribjump = fake_polytope_mars(config={"tiling": {"tile_points": 2000}})
+        coverage = asyncio.run(polytope_mars.aextract(copy.deepcopy(request)))
+        assert gribjump.extract_calls == len(polytope_mars.tiles) > 1
+        assert coverage == expected
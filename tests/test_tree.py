@@ -0,0 +1,42 @@
+from polytope_feature.datacube.datacube_axis import IntDatacubeAxis
+from polytope_feature.datacube.tensor_index_tree import TensorIndexTree
+
+from polytope_mars.utils.tree import format_tree, summarise_tree
+
+
+def axis(name):
+    ax = IntDatacubeAxis()
+    ax.name = name
+    return ax
+
+
+def make_tree(steps, points):
+    tree = TensorIndexTree()
+    for step in range(steps):
+        _, step_node, _ = tree.create_child(axis("step"), step, [])
+        for point in range(points):
+            _, leaf, _ = step_node.create_child(axis("values"), point, [])
+            leaf.result = [float(point)]
+    return tree
+
+
+class TestTree:
+    def test_summarise_tree(self):
+        summary = summarise_tree(make_tree(3, 4))
+        assert summary == {"nodes": {"step": 3, "values": 12}, "leaves": 12, "values": 12}
+
+    def test_format_tree(self):
+        lines = format_tree(make_tree(1, 2)).split("\n")
+        assert lines == [
+            "↳root=()",
+            "\t↳step=(0,)",
+            "\t\t↳values=(0,)",
+            "\t\t\t↳[0.0]",
+            "\t\t↳values=(1,)",
+            "\t\t\t↳[1.0]",
+        ]
+
+    def test_format_tree_capped(self):
+        lines = format_tree(make_tree(2, 5), max_lines=3).split("\n")
+        assert len(lines) == 4
+        assert lines[-1] == "... 10 more nodes"